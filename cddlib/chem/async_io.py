@@ -0,0 +1,202 @@
+'''Read and write molecules on background threads.
+
+AsyncMolOutputStream wraps any molecule output stream, write_mol() only
+places the molecule on a bounded queue and a writer thread serializes,
+compresses and writes it, so that computation overlaps with output.
+
+    with get_mol_output_stream("out.sdf.gz", async_write=True) as out:
+        for mol in inf:
+            score(mol)
+            out.write_mol(mol)
+
+Molecules must not be modified after they were passed to write_mol().
+
+PrefetchMolInputStream reads and parses up to N molecules ahead of the
+consumer on a background thread:
+
+    with get_mol_input_stream("in.sdf.gz", prefetch=100) as inf:
+        ...
+'''
+
+import queue
+import threading
+
+from cddlib.chem.io import BaseMolInputStream
+from cddlib.chem.mol import BaseMol
+
+_STOP = object()
+
+
+class AsyncMolOutputStream(object):
+    """Molecule output stream writing on a background thread.
+
+       An exception raised by the writer thread is re-raised by all following
+       calls to write_mol() and flush() and by close() if it was not yet
+       reported, molecules queued after the error are discarded.
+    """
+
+    def __init__(self, out_stream, queue_size: int = 1000):
+        """
+        Parameters
+        ----------
+        out_stream
+            stream the molecules are written to, closed with this stream
+        queue_size
+            maximum number of molecules waiting to be written,
+            write_mol() blocks if the queue is full
+        """
+        self.file_path = getattr(out_stream, "file_path", None)
+        self._out = out_stream
+        self._queue = queue.Queue(queue_size)
+        self._error = None
+        self._reported = False
+        self._high_water_mark = 0
+        self._thread = threading.Thread(target=self._run, name="AsyncMolOutputStream",
+                                        daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            mol = self._queue.get()
+            try:
+                if mol is _STOP:
+                    return
+                if self._error is None:
+                    self._out.write_mol(mol)
+            except BaseException as e:
+                # remaining molecules are discarded
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _check_error(self):
+        if self._error is not None:
+            self._reported = True
+            raise self._error
+
+    @property
+    def high_water_mark(self) -> int:
+        """ maximum number of molecules that were waiting in the queue """
+        return self._high_water_mark
+
+    def write_mol(self, mol: BaseMol):
+        if self._thread is None:
+            raise ValueError("write to closed stream")
+        self._check_error()
+        self._queue.put(mol)
+        size = self._queue.qsize()
+        if size > self._high_water_mark:
+            self._high_water_mark = size
+
+    def flush(self):
+        """ wait until all molecules were written to the wrapped stream """
+        self._queue.join()
+        self._check_error()
+
+    def sync(self):
+        """ flush() and sync() the wrapped stream, returns its file position """
+        self.flush()
+        return self._out.sync()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        try:
+            self._out.close()
+        finally:
+            if not self._reported:
+                self._check_error()
+
+
+class PrefetchMolInputStream(BaseMolInputStream):
+    """Molecule input stream reading ahead on a background thread.
+
+       Exceptions raised while reading are re-raised by has_next() or
+       __next__() in the position in which they occurred.
+    """
+
+    def __init__(self, in_stream: BaseMolInputStream, prefetch: int = 100):
+        """
+        Parameters
+        ----------
+        in_stream
+            stream to read from, closed with this stream
+        prefetch
+            maximum number of molecules read ahead
+        """
+        BaseMolInputStream.__init__(self, in_stream.file_path)
+        self._in = in_stream
+        self._queue = queue.Queue(prefetch)
+        self._stopped = False
+        self._done = False
+        self.next_mol = None
+        self._thread = threading.Thread(target=self._run, name="PrefetchMolInputStream",
+                                        daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            for mol in self._in:
+                if self._stopped:
+                    return
+                self._queue.put(mol)
+            self._queue.put(_STOP)
+        except BaseException as e:
+            self._queue.put(_Error(e))
+
+    def has_next(self) -> bool:
+        if self.next_mol is not None:
+            return True
+        if self._done:
+            return False
+
+        item = self._queue.get()
+        if item is _STOP:
+            self._done = True
+            return False
+        if isinstance(item, _Error):
+            self._done = True
+            raise item.error
+        self.next_mol = item
+        return True
+
+    def __next__(self) -> BaseMol:
+        if not self.has_next():
+            raise StopIteration()
+
+        res = self.next_mol
+        self.next_mol = None
+        return res
+
+    def __len__(self) -> int:
+        return len(self._in)
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._stopped = True
+        # unblock the reader thread
+        while self._thread.is_alive():
+            try:
+                self._queue.get(timeout=0.01)
+            except queue.Empty:
+                pass
+        self._thread.join()
+        self._thread = None
+        self._in.close()
+
+
+class _Error(object):
+    """ exception raised by the reader thread """
+
+    def __init__(self, error: BaseException):
+        self.error = error
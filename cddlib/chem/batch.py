@@ -0,0 +1,130 @@
+'''Batches of molecules with their atom data concatenated into numpy arrays.'''
+
+from typing import Dict, Iterable, Iterator, List, Sequence
+
+import numpy as np
+
+from cddlib.chem.mol import BaseMol
+
+
+class MolBatch(object):
+    """A list of molecules plus numpy arrays covering all their atoms.
+
+    Attributes
+    ----------
+    mols
+        the molecules in this batch
+    coordinates
+        numpy [nTotalAtoms,3] coordinates of all molecules
+    atomic_nums
+        numpy [nTotalAtoms] atomic numbers of all molecules
+    atom_offsets
+        numpy [nMols+1], atoms of molecule i are in
+        atom_offsets[i]:atom_offsets[i+1]
+    tags
+        dictionary from requested sd tag to numpy object array [nMols] with
+        the tag values, None where a molecule does not have the tag.
+    """
+
+    def __init__(self, mols: List[BaseMol], coordinates: np.ndarray,
+                 atomic_nums: np.ndarray, atom_offsets: np.ndarray,
+                 tags: Dict[str, np.ndarray]):
+        self.mols = mols
+        self.coordinates = coordinates
+        self.atomic_nums = atomic_nums
+        self.atom_offsets = atom_offsets
+        self.tags = tags
+
+    @classmethod
+    def from_mols(cls, mols: Sequence[BaseMol], tags: Sequence[str] = ()) -> 'MolBatch':
+        """Create a batch from a list of molecules.
+
+        Parameters
+        ----------
+        mols
+            molecules in the batch
+        tags
+            names of sd tags to extract into MolBatch.tags
+        """
+        mols = list(mols)
+        counts = np.fromiter((mol.num_atoms for mol in mols), dtype=np.int64,
+                             count=len(mols))
+        atom_offsets = np.zeros(len(mols) + 1, dtype=np.int64)
+        np.cumsum(counts, out=atom_offsets[1:])
+
+        n_atoms = int(atom_offsets[-1])
+        coordinates = np.empty((n_atoms, 3), dtype=np.float64)
+        atomic_nums = np.empty(n_atoms, dtype=np.int32)
+        for mol, start, end in zip(mols, atom_offsets[:-1], atom_offsets[1:]):
+            if end > start:
+                mol.get_coordinates(out=coordinates[start:end])
+                atomic_nums[start:end] = mol.atom_types
+
+        tag_values = {}
+        for tag in tags:
+            vals = np.empty(len(mols), dtype=object)
+            for i, mol in enumerate(mols):
+                vals[i] = mol[tag] if tag in mol else None
+            tag_values[tag] = vals
+
+        return cls(mols, coordinates, atomic_nums, atom_offsets, tag_values)
+
+    def __len__(self) -> int:
+        return len(self.mols)
+
+    def __iter__(self) -> Iterator[BaseMol]:
+        return iter(self.mols)
+
+    @property
+    def num_atoms(self) -> np.ndarray:
+        """ numpy [nMols] number of atoms per molecule """
+        return np.diff(self.atom_offsets)
+
+    @property
+    def mol_index(self) -> np.ndarray:
+        """ numpy [nTotalAtoms] index of the molecule each atom belongs to """
+        return np.repeat(np.arange(len(self.mols)), self.num_atoms)
+
+    def mol_coordinates(self, i: int) -> np.ndarray:
+        """ view on the [nAtoms,3] coordinates of molecule i """
+        return self.coordinates[self.atom_offsets[i]:self.atom_offsets[i + 1]]
+
+    def tag_as_float(self, tag: str) -> np.ndarray:
+        """Return numpy [nMols] float values of tag, NaN where the tag is
+           missing or not numeric.
+        """
+        res = np.full(len(self.mols), np.nan)
+        for i, val in enumerate(self.tags[tag]):
+            if val is None:
+                continue
+            try:
+                res[i] = float(val)
+            except ValueError:
+                pass
+        return res
+
+
+def iter_batches(mols: Iterable[BaseMol], size: int,
+                 tags: Sequence[str] = ()) -> Iterator[MolBatch]:
+    """Group molecules into MolBatch objects of up to size molecules.
+
+    Parameters
+    ----------
+    mols
+        any iterable of molecules, eg. a molecule input stream
+    size
+        maximum number of molecules per batch
+    tags
+        names of sd tags to extract into MolBatch.tags
+    """
+    if size < 1:
+        raise ValueError(f"Invalid batch size: {size}")
+
+    batch = []
+    for mol in mols:
+        batch.append(mol)
+        if len(batch) == size:
+            yield MolBatch.from_mols(batch, tags)
+            batch = []
+    if batch:
+        yield MolBatch.from_mols(batch, tags)
@@ -0,0 +1,246 @@
+'''Binary molecule cache files (.cddb).
+
+Molecules are stored in the native binary serialization of the toolkit
+(RDKit ToBinary() with all properties or OpenEye oeb), which includes
+the title and the sd tags, so reading them back is much faster than
+parsing sd files. Files written with one toolkit can only be read with
+the same toolkit.
+
+File layout::
+
+    header   b"CDDB0001" + toolkit name padded to 16 bytes
+    records  uint32 length + molecule blob
+    table    uint64 offset of each record
+    footer   uint64 number of records, uint64 table offset, b"CDDBEND1"
+'''
+
+import io
+import os
+import struct
+from array import array
+
+from cddlib.chem.io import BaseMolInputStream
+from cddlib.chem.mol import BaseMol, _import_molmodule
+from cddlib.chem.toolkit import TOOLKIT
+
+CDDB_SUFFIX = ".cddb"
+_MAGIC = b"CDDB0001"
+_END_MAGIC = b"CDDBEND1"
+_HEADER = struct.Struct("<8s16s")
+_FOOTER = struct.Struct("<QQ8s")
+_LENGTH = struct.Struct("<I")
+
+
+def is_cddb_path(file_path: str) -> bool:
+    """ True if file_path has the .cddb extension """
+    return file_path.lower().endswith(CDDB_SUFFIX)
+
+
+def _check_header(in_s, file_path: str, toolkit: str):
+    magic, file_toolkit = _HEADER.unpack(in_s.read(_HEADER.size))
+    if magic != _MAGIC:
+        raise ValueError(f"Not a cddb file: {file_path}")
+    file_toolkit = file_toolkit.rstrip(b"\0").decode("ascii")
+    if file_toolkit != toolkit:
+        raise ValueError(f"{file_path} was written with {file_toolkit}"
+                         f" and can not be read with {toolkit}")
+
+
+class CDDBMolOutputStream(object):
+    """Write molecules to a .cddb file."""
+
+    def __init__(self, file_path: str, toolkit: str = TOOLKIT, append: bool = False):
+        """
+        Parameters
+        ----------
+        file_path
+            .cddb file to write
+        toolkit
+            openeye or rdkit
+        append
+            continue an existing file, its offset table and an incomplete
+            record at its end are removed first
+        """
+        self.file_path = file_path
+        self._mol_module = _import_molmodule(toolkit)
+        self._offsets = array("Q")
+        if append and os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+            self._pos = self._truncate(toolkit)
+            self._out = io.open(file_path, "ab")
+        else:
+            self._out = io.open(file_path, "wb")
+            self._out.write(_HEADER.pack(_MAGIC, toolkit.encode("ascii")))
+            self._pos = _HEADER.size
+
+    def _truncate(self, toolkit: str) -> int:
+        """ cut the file after its last complete record and load the offsets """
+        with io.open(self.file_path, "r+b") as f:
+            _check_header(f, self.file_path, toolkit)
+            size = os.fstat(f.fileno()).st_size
+            if size >= _HEADER.size + _FOOTER.size:
+                f.seek(-_FOOTER.size, io.SEEK_END)
+                count, table_pos, end_magic = _FOOTER.unpack(f.read(_FOOTER.size))
+                if end_magic == _END_MAGIC:
+                    f.seek(table_pos)
+                    self._offsets.frombytes(f.read(8 * count))
+                    f.truncate(table_pos)
+                    return table_pos
+
+            pos = _HEADER.size
+            f.seek(pos)
+            while pos + _LENGTH.size <= size:
+                (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+                if pos + _LENGTH.size + length > size:
+                    break
+                self._offsets.append(pos)
+                pos += _LENGTH.size + length
+                f.seek(pos)
+            f.truncate(pos)
+            return pos
+
+    def write_mol(self, mol: BaseMol):
+        self.write_binary(self._mol_module.to_binary(mol))
+
+    def write_binary(self, data: bytes):
+        """ Append a molecule already serialized with the toolkit to_binary() """
+        self._offsets.append(self._pos)
+        self._out.write(_LENGTH.pack(len(data)))
+        self._out.write(data)
+        self._pos += _LENGTH.size + len(data)
+
+    @property
+    def bytes_written(self) -> int:
+        return self._pos
+
+    def sync(self) -> int:
+        """ Write all molecules to the file and return the position following
+            the last record, the file can be truncated at this position and
+            continued with append=True.
+        """
+        self._out.flush()
+        return self._pos
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self._out is None:
+            return
+        self._out.write(self._offsets.tobytes())
+        self._out.write(_FOOTER.pack(len(self._offsets), self._pos, _END_MAGIC))
+        self._out.close()
+        self._out = None
+
+
+class CDDBMolInputStream(BaseMolInputStream):
+    """Read molecules from a .cddb file.
+
+       Supports len(), stream[i], slicing and seek() using the offset
+       table of the file.
+    """
+
+    def __init__(self, file_path: str, toolkit: str = TOOLKIT):
+        BaseMolInputStream.__init__(self, file_path)
+        self._mol_module = _import_molmodule(toolkit)
+        self._in = io.open(file_path, "rb")
+        _check_header(self._in, file_path, toolkit)
+
+        self._offsets = None
+        self._count = None
+        self._data_end = os.fstat(self._in.fileno()).st_size
+        if self._data_end >= _HEADER.size + _FOOTER.size:
+            self._in.seek(-_FOOTER.size, io.SEEK_END)
+            count, table_pos, end_magic = _FOOTER.unpack(self._in.read(_FOOTER.size))
+            if end_magic == _END_MAGIC:
+                self._data_end = table_pos
+                self._count = count
+            self._in.seek(_HEADER.size)
+        self.next_mol = None
+
+    def _read_binary(self) -> bytes:
+        """ next serialized molecule or None at the end of the data """
+        if self._in.tell() + _LENGTH.size > self._data_end:
+            return None
+        (length,) = _LENGTH.unpack(self._in.read(_LENGTH.size))
+        data = self._in.read(length)
+        if len(data) != length:
+            # incomplete file, eg. writer did not close
+            return None
+        return data
+
+    def has_next(self) -> bool:
+        if self.next_mol is not None:
+            return True
+
+        data = self._read_binary()
+        if data is None:
+            return False
+        self.next_mol = self._mol_module.from_binary(data)
+        return True
+
+    def __next__(self) -> BaseMol:
+        if not self.has_next():
+            raise StopIteration()
+
+        res = self.next_mol
+        self.next_mol = None
+        return res
+
+    @property
+    def bytes_read(self):
+        return None if self._in is None else self._in.tell()
+
+    @property
+    def offsets(self) -> array:
+        """ offset of each record, read from the table at the end of the file """
+        if self._offsets is None:
+            if self._data_end == os.fstat(self._in.fileno()).st_size:
+                raise ValueError(f"{self.file_path} has no offset table,"
+                                 " it was not closed properly")
+            self._offsets = array("Q")
+            with io.open(self.file_path, "rb") as in_s:
+                in_s.seek(self._data_end)
+                self._offsets.frombytes(in_s.read(8 * self._count))
+        return self._offsets
+
+    def open_index(self) -> 'CDDBMolInputStream':
+        self.offsets
+        return self
+
+    def __len__(self) -> int:
+        if self._count is None:
+            # TypeError so that list(stream) still works
+            raise TypeError(f"{self.file_path} has no offset table,"
+                            " it was not closed properly")
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        offsets = self.offsets
+        if i < 0:
+            i += len(offsets)
+        if not 0 <= i < len(offsets):
+            raise IndexError(f"record index out of range: {i}")
+
+        with io.open(self.file_path, "rb") as in_s:
+            in_s.seek(offsets[i])
+            (length,) = _LENGTH.unpack(in_s.read(_LENGTH.size))
+            return self._mol_module.from_binary(in_s.read(length))
+
+    def seek(self, i: int) -> None:
+        offsets = self.offsets
+        if i < 0:
+            i += len(offsets)
+        if not 0 <= i <= len(offsets):
+            raise IndexError(f"record index out of range: {i}")
+        self.next_mol = None
+        self._in.seek(offsets[i] if i < len(offsets) else self._data_end)
+
+    def close(self):
+        if self._in is not None:
+            self._in.close()
+        self._in = None
@@ -0,0 +1,188 @@
+'''Checkpoints allowing long running jobs to continue after they were stopped.
+
+A checkpoint stores the position of the next record of an input stream
+and the position following the last record written to an output stream.
+When the job is started again with the same arguments the input continues
+at the stored record and the output is truncated to the stored position
+and appended to, so no record is lost or written twice.
+
+    with CheckpointedRun("job.ckpt.json", "in.sdf.gz", "out.sdf.gz", every=10000) as run:
+        for mol in run:
+            ...
+            run.out_stream.write_mol(mol)
+
+The checkpoint is written every `every` molecules when the next molecule
+is requested, ie. after the previous molecules were processed, and removed
+when the run completes without an exception.
+
+Input files are sd files read with LazyMolInputStream, BGZF files continue
+at the compressed block of the stored position, other compressed files are
+decompressed from the start. Output files can be uncompressed or BGZF (.gz)
+sd and smiles files or .cddb files. With the openeye toolkit gz output is
+only written as BGZF with out_kwargs={"compress_threads": 2} or more.
+'''
+
+import json
+import os
+import tempfile
+from typing import Dict, Iterator, Optional, Union
+
+from cddlib.chem.io import BaseMolInputStream, get_mol_output_stream
+from cddlib.chem.mol import BaseMol
+from cddlib.chem.toolkit import TOOLKIT
+
+
+def checkpoint(path: str, in_stream: BaseMolInputStream, out_stream=None, **extra) -> Dict:
+    """Atomically write the positions of in_stream and out_stream to path.
+
+    Parameters
+    ----------
+    path
+        json file receiving the checkpoint
+    in_stream
+        input stream supporting position() and resume(), eg. LazyMolInputStream
+    out_stream
+        output stream supporting sync(), all molecules written so far are
+        flushed to the file
+    extra
+        additional json serializable values stored in the checkpoint
+
+    Returns
+    -------
+    dict
+        the checkpoint
+    """
+    _check_resumable(in_stream)
+    state = {"input": in_stream.position()}
+    if out_stream is not None:
+        sync = getattr(out_stream, "sync", None)
+        if sync is None:
+            raise ValueError(f"{out_stream.__class__.__name__} does not support checkpoints")
+        offset = sync()
+        if offset is None:
+            raise ValueError("Can not checkpoint output to stdout")
+        state["output"] = {"file_path": out_stream.file_path, "offset": offset}
+    state.update(extra)
+
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wt") as out:
+            json.dump(state, out)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return state
+
+
+def _check_resumable(in_stream: BaseMolInputStream):
+    if not in_stream.supports_resume:
+        raise ValueError(f"{in_stream.__class__.__name__} of {in_stream.file_path}"
+                         " does not support checkpoints")
+
+
+def load_checkpoint(path: str) -> Optional[Dict]:
+    """ checkpoint stored in path or None if path does not exist """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rt") as in_s:
+        return json.load(in_s)
+
+
+def truncate_output(file_path: str, offset: int) -> None:
+    """ remove the data written to file_path after a checkpoint at offset """
+    size = os.path.getsize(file_path)
+    if size < offset:
+        raise ValueError(f"{file_path} is shorter than at the checkpoint: {size} < {offset}")
+    os.truncate(file_path, offset)
+
+
+class CheckpointedRun(object):
+    """Iterate over the molecules of an sd file, continuing after the last
+       checkpoint of an earlier run with the same files.
+
+       Input streams that do not support resume(), eg. stdin, are rejected
+       with a ValueError when the run is created.
+    """
+
+    def __init__(self, checkpoint_path: str, in_path: Union[str, BaseMolInputStream],
+                 out_path: str = None, every: int = 10000, toolkit: str = TOOLKIT,
+                 in_kwargs: Dict = None, out_kwargs: Dict = None):
+        """
+        Parameters
+        ----------
+        checkpoint_path
+            json file storing the checkpoint
+        in_path
+            sd file to read or an input stream supporting resume(), the
+            stream is closed with the run
+        out_path
+            optional output file, available as out_stream
+        every
+            write a checkpoint every `every` molecules
+        toolkit
+            openeye or rdkit
+        in_kwargs
+            passed on to LazyMolInputStream if in_path is a file
+        out_kwargs
+            passed on to get_mol_output_stream()
+        """
+        from cddlib.chem.lazy_mol import LazyMolInputStream
+
+        if isinstance(in_path, BaseMolInputStream):
+            self.in_stream = in_path
+        else:
+            self.in_stream = LazyMolInputStream(in_path, toolkit, **(in_kwargs or {}))
+        self.checkpoint_path = checkpoint_path
+        self.every = max(1, every)
+        self.out_stream = None
+        self.resumed_at = 0
+        try:
+            _check_resumable(self.in_stream)
+            state = load_checkpoint(checkpoint_path)
+            if state is not None:
+                out_state = state.get("output", {})
+                if state["input"]["file_path"] != self.in_stream.file_path \
+                   or out_state.get("file_path") != out_path:
+                    raise ValueError(f"{checkpoint_path} was written for other files: "
+                                     f"{state['input']['file_path']}, {out_state.get('file_path')}")
+                self.in_stream.resume(state["input"])
+                self.resumed_at = state["input"]["records"]
+            if out_path is not None:
+                if state is not None:
+                    truncate_output(out_path, state["output"]["offset"])
+                self.out_stream = get_mol_output_stream(out_path, append=state is not None,
+                                                        **(out_kwargs or {}))
+        except BaseException:
+            self.in_stream.close()
+            raise
+
+    def save(self) -> Dict:
+        """ write a checkpoint now """
+        return checkpoint(self.checkpoint_path, self.in_stream, self.out_stream)
+
+    def __iter__(self) -> Iterator[BaseMol]:
+        n_since = 0
+        while self.in_stream.has_next():
+            yield next(self.in_stream)
+            n_since += 1
+            if n_since >= self.every:
+                self.save()
+                n_since = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        self.close(completed=exc_type is None)
+
+    def close(self, completed: bool = True):
+        """ close the streams, if completed the checkpoint is removed """
+        if self.in_stream is None:
+            return
+        self.in_stream.close()
+        self.in_stream = None
+        if self.out_stream is not None:
+            self.out_stream.close()
+        if completed and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
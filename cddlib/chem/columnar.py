@@ -0,0 +1,213 @@
+'''Export molecule streams to columnar Parquet or Arrow files.
+
+Rows are collected in row groups of bounded size and written with
+pyarrow, which is an optional dependency of cddlib (pip install pyarrow).
+
+    with get_mol_input_stream("lib.sdf.gz", lazy=True) as inf:
+        export_table(inf, "lib.parquet", smiles=False)
+'''
+
+import warnings
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from cddlib.chem.mol import BaseMol, to_molblock
+
+
+def export_table(mols: Iterable[BaseMol], file_path: str,
+                 tags: Sequence[str] = None, title: bool = True,
+                 smiles: bool = True, num_atoms: bool = True,
+                 molblock: bool = False, row_group_size: int = 100000,
+                 file_format: str = None, tag_prefix: str = "") -> int:
+    """Write molecules and their sd tags to a Parquet or Arrow file.
+
+    Parameters
+    ----------
+    mols
+        any molecule input stream or iterable of molecules
+    file_path
+        output file
+    tags
+        sd tags to export, default: all tags found in the first row group,
+        a warning lists tags first found in later row groups which are not
+        exported. Numeric tag columns are typed int64 or float64 if all
+        values of the first row group are numeric, values of later row
+        groups which can not be converted are stored as null.
+    title, smiles, num_atoms, molblock
+        include the title, canonical smiles, atom count and molfile columns
+    row_group_size
+        number of molecules held in memory and written per row group
+    file_format
+        parquet or arrow, default: derived from the file extension
+        (.arrow, .feather and .ipc are arrow files)
+    tag_prefix
+        prepended to the names of the tag columns, a ValueError is raised
+        if a tag column has the name of one of the columns above
+
+    Returns
+    -------
+    int
+        number of rows written
+    """
+    pa = _import_pyarrow()
+    if file_format is None:
+        file_format = "arrow" if file_path.lower().endswith((".arrow", ".feather", ".ipc")) \
+            else "parquet"
+    if file_format not in ("parquet", "arrow"):
+        raise ValueError(f"Unknown file format: {file_format}")
+
+    fixed = ["title"] * title + ["smiles"] * smiles + \
+        ["num_atoms"] * num_atoms + ["molblock"] * molblock
+    infer_tags = tags is None
+    tags = None if tags is None else list(tags)
+    schema = None
+    writer = None
+    n_rows = 0
+    skipped: Set[str] = set()
+    try:
+        rows = _RowGroup(fixed, tags)
+        for mol in mols:
+            rows.add(mol)
+            if len(rows) == row_group_size:
+                if schema is None:
+                    schema = _infer_schema(pa, fixed, rows, tag_prefix)
+                    tags = rows.tags
+                    writer = _open_writer(pa, file_path, file_format, schema)
+                n_rows += _write_group(pa, writer, file_format, schema, rows, tag_prefix)
+                rows = _RowGroup(fixed, tags, skipped if infer_tags else None)
+
+        if schema is None:
+            schema = _infer_schema(pa, fixed, rows, tag_prefix)
+            writer = _open_writer(pa, file_path, file_format, schema)
+        if len(rows):
+            n_rows += _write_group(pa, writer, file_format, schema, rows, tag_prefix)
+    finally:
+        if writer is not None:
+            writer.close()
+    if skipped:
+        warnings.warn(f"sd tags not found in the first row group were not exported to "
+                      f"{file_path}: {', '.join(sorted(skipped))}, pass tags to export them")
+    return n_rows
+
+
+class _RowGroup(object):
+    """ Column lists of the molecules of one row group """
+
+    def __init__(self, fixed: List[str], tags: Optional[List[str]],
+                 skipped: Set[str] = None):
+        """
+        Parameters
+        ----------
+        fixed
+            names of the title, smiles, atom count and molfile columns
+        tags
+            tags to collect, None to collect all tags
+        skipped
+            if given, receives the tags of the molecules which are not in tags
+        """
+        self.fixed = fixed
+        self.tags = tags
+        self.columns: Dict[str, list] = {name: [] for name in fixed}
+        self.tag_values: Dict[str, list] = {} if tags is None else {tag: [] for tag in tags}
+        self._tag_dicts = [] if tags is None else None
+        self._skipped = skipped
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def add(self, mol: BaseMol):
+        cols = self.columns
+        if "title" in cols:
+            cols["title"].append(mol.title)
+        if "smiles" in cols:
+            cols["smiles"].append(mol.canonical_smiles)
+        if "num_atoms" in cols:
+            cols["num_atoms"].append(mol.num_atoms)
+        if "molblock" in cols:
+            cols["molblock"].append(to_molblock(mol))
+
+        if self.tags is None:
+            # tags are not known yet, collect all
+            self._tag_dicts.append({kee: mol[kee] for kee in mol.keys()})
+        else:
+            for tag in self.tags:
+                self.tag_values[tag].append(mol[tag] if tag in mol else None)
+            if self._skipped is not None:
+                self._skipped.update(kee for kee in mol.keys() if kee not in self.tag_values)
+        self._len += 1
+
+    def tag_columns(self) -> Dict[str, list]:
+        if self.tags is None:
+            self.tags = list(dict.fromkeys(kee for d in self._tag_dicts for kee in d))
+            self.tag_values = {tag: [d.get(tag) for d in self._tag_dicts] for tag in self.tags}
+            self._tag_dicts = None
+        return self.tag_values
+
+
+def _infer_schema(pa, fixed: List[str], rows: _RowGroup, tag_prefix: str):
+    types = {"title": pa.string(), "smiles": pa.string(),
+             "num_atoms": pa.int32(), "molblock": pa.large_string()}
+    fields = [pa.field(name, types[name]) for name in fixed]
+    for tag, values in rows.tag_columns().items():
+        name = tag_prefix + tag
+        if name in fixed:
+            raise ValueError(f"sd tag {tag!r} has the name of the {name} column,"
+                             " use tag_prefix or disable the column")
+        fields.append(pa.field(name, _infer_type(pa, values)))
+    return pa.schema(fields)
+
+
+def _infer_type(pa, values: list):
+    present = [v for v in values if v is not None and v.strip() != ""]
+    if not present:
+        return pa.string()
+    for typ, conv in ((pa.int64(), int), (pa.float64(), float)):
+        try:
+            for v in present:
+                conv(v)
+            return typ
+        except ValueError:
+            pass
+    return pa.string()
+
+
+def _convert(values: list, conv) -> list:
+    res = []
+    for v in values:
+        try:
+            res.append(conv(v))
+        except (ValueError, TypeError):
+            res.append(None)
+    return res
+
+
+def _write_group(pa, writer, file_format: str, schema, rows: _RowGroup,
+                 tag_prefix: str) -> int:
+    columns = dict(rows.columns)
+    columns.update((tag_prefix + tag, values) for tag, values in rows.tag_columns().items())
+    arrays = []
+    for field in schema:
+        values = columns[field.name]
+        if field.type == pa.int64():
+            values = _convert(values, int)
+        elif field.type == pa.float64():
+            values = _convert(values, float)
+        arrays.append(pa.array(values, type=field.type))
+    table = pa.Table.from_arrays(arrays, schema=schema)
+    writer.write_table(table)
+    return len(rows)
+
+
+def _open_writer(pa, file_path: str, file_format: str, schema):
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(file_path, schema)
+    return pa.ipc.new_file(file_path, schema)
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ModuleNotFoundError:
+        raise ModuleNotFoundError("pyarrow is required for columnar export: pip install pyarrow")
+    return pyarrow
@@ -0,0 +1,126 @@
+'''Group consecutive conformers of a molecule into multi-conformer molecules.
+
+Conformer generators write one sd record per conformer. Records that follow
+each other and belong to the same molecule are merged into one molecule
+holding all conformers, coordinates are then available as one
+[nConf, nAtoms, 3] array from BaseMol.conformer_coordinates and the
+connection table, title and sd tags are stored only once. Assigning to
+conformer_coordinates replaces all conformers.
+
+    with get_mol_input_stream("confs.sdf.gz", group_conformers="title") as inf:
+        for mol in inf:
+            xyz = mol.conformer_coordinates
+            mol.conformer_coordinates = minimize(xyz)
+'''
+
+from typing import Callable, List
+
+from cddlib.chem.io import BaseMolInputStream
+from cddlib.chem.mol import BaseMol, _import_molmodule
+from cddlib.chem.toolkit import TOOLKIT
+
+GROUP_KEYS = ("title", "connection_table")
+
+
+def _title_key(mol: BaseMol):
+    return mol.title
+
+
+def _connection_table_key(mol: BaseMol):
+    return mol.canonical_smiles
+
+
+class ConformerGroupInputStream(BaseMolInputStream):
+    """Wrap a molecule input stream merging consecutive records with the
+       same title or connection table into one multi-conformer molecule.
+
+       The title and the sd tags of the first record of each group are kept.
+
+       Records are only merged if their atom types are identical as well.
+       Grouping by title otherwise trusts the titles, records with blank
+       titles are never merged. A record is only parsed when the following
+       record has the same key, so lazily read records which are not
+       conformers of their neighbours stay unparsed. Grouping by connection
+       table also requires the atoms to be in the same order.
+    """
+
+    def __init__(self, in_stream: BaseMolInputStream, group_by: str = "title",
+                 toolkit: str = TOOLKIT):
+        """
+        Parameters
+        ----------
+        in_stream
+            stream of single conformer molecules, closed with this stream
+        group_by
+            "title" or "connection_table", the latter compares canonical
+            smiles and is slower as every record needs to be parsed
+        toolkit
+            openeye or rdkit
+        """
+        BaseMolInputStream.__init__(self, in_stream.file_path)
+        if group_by == "title":
+            self._key: Callable[[BaseMol], object] = _title_key
+        elif group_by == "connection_table":
+            self._key = _connection_table_key
+        else:
+            raise ValueError(f"group_conformers must be one of {GROUP_KEYS}: {group_by}")
+        self._in = in_stream
+        self._mol_module = _import_molmodule(toolkit)
+        self._pending = None
+        self.next_mol = None
+
+    def _read(self) -> BaseMol:
+        if self._pending is not None:
+            mol = self._pending
+            self._pending = None
+            return mol
+        if self._in.has_next():
+            return self._in.__next__()
+        return None
+
+    def has_next(self) -> bool:
+        if self.next_mol is not None:
+            return True
+
+        first = self._read()
+        if first is None:
+            return False
+
+        group: List[BaseMol] = [first]
+        kee = self._key(first)
+        atom_types = None
+        while True:
+            mol = self._read()
+            if mol is None:
+                break
+            if kee == "" or self._key(mol) != kee:
+                self._pending = mol
+                break
+            if atom_types is None:
+                atom_types = first.atom_types
+            if mol.atom_types != atom_types:
+                self._pending = mol
+                break
+            group.append(mol)
+
+        if len(group) == 1:
+            self.next_mol = first
+        else:
+            self.next_mol = self._mol_module.merge_conformers(group)
+        return True
+
+    def __next__(self) -> BaseMol:
+        if not self.has_next():
+            raise StopIteration()
+
+        res = self.next_mol
+        self.next_mol = None
+        return res
+
+    def __len__(self) -> int:
+        raise TypeError("number of conformer groups is not known before reading")
+
+    def close(self):
+        if self._in is not None:
+            self._in.close()
+        self._in = None
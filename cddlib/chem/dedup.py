@@ -0,0 +1,358 @@
+'''Remove duplicate molecules from large molecule streams with bounded memory.
+
+Molecules are identified by a 128 (or 64) bit blake2b hash of their
+canonical smiles or of a key function, the memory needed per molecule is
+a few bytes instead of the smiles string. With 128 bit hashes collisions
+are not to be expected even for billions of molecules, 64 bit hashes have
+a noticeable collision probability above 10^9 molecules.
+
+policy="first" keeps the first occurrence and streams its output:
+
+    hashes are looked up in an optional bloom filter, in an in memory set
+    and in sorted runs of hashes which are written to disk whenever the
+    set exceeds the memory budget. Runs are memory mapped and searched
+    with a binary search. Whenever _MERGE_FANOUT runs of the same level
+    exist they are merged into one run of the next level, so the number
+    of runs searched grows with the logarithm of the number of molecules.
+
+policy="best" keeps the molecule with the lowest (or highest) value of a
+tag, ties are resolved by input order. It needs two passes:
+
+    molecules are spilled to a temporary .cddb file while (hash, score,
+    index) rows are partitioned into files by hash prefix. Each partition
+    is sorted with numpy to select the winners, the winners are then read
+    back from the spill file in input order.
+
+    with get_mol_input_stream("enum.smi.gz") as inf:
+        with DedupMolInputStream(inf, memory_bytes=1 << 30) as uniq:
+            for mol in uniq:
+                ...
+'''
+
+import hashlib
+import math
+import os
+import shutil
+import sys
+import tempfile
+from typing import Callable, Iterator, List, Tuple
+
+import numpy as np
+
+from cddlib.chem.io import BaseMolInputStream
+from cddlib.chem.mol import BaseMol
+from cddlib.chem.toolkit import TOOLKIT
+
+POLICIES = ("first", "best")
+
+_NUM_PARTITIONS = 256
+_MERGE_FANOUT = 8          # runs of one level merged into a run of the next level
+_MERGE_CHUNK = 1 << 16     # hashes read from each run per merge step
+
+
+def _canonical_smiles(mol: BaseMol) -> str:
+    return mol.canonical_smiles
+
+
+class BloomFilter(object):
+    """Bloom filter on hash digests, bit positions are derived from the
+       digest by double hashing.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """
+        Parameters
+        ----------
+        capacity
+            expected number of distinct items
+        error_rate
+            false positive rate at capacity
+        """
+        n_bits = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self._n_bits = n_bits
+        self._n_hashes = max(1, round(n_bits / capacity * math.log(2)))
+        self._bits = bytearray((n_bits + 7) // 8)
+
+    def _positions(self, digest: bytes):
+        half = len(digest) // 2
+        h1 = int.from_bytes(digest[:half], "little")
+        h2 = int.from_bytes(digest[half:], "little") | 1
+        for i in range(self._n_hashes):
+            yield (h1 + i * h2) % self._n_bits
+
+    def add(self, digest: bytes) -> bool:
+        """ add digest, return True if it might have been added before """
+        bits = self._bits
+        present = True
+        for pos in self._positions(digest):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                present = False
+                bits[pos >> 3] |= mask
+        return present
+
+
+def _merge_runs(runs: List[np.ndarray], path: str, chunk: int = _MERGE_CHUNK) -> None:
+    """Write the union of the sorted arrays in runs to the .npy file path.
+
+       The arrays are read in blocks of chunk elements, memory use is
+       about len(runs) * chunk elements.
+    """
+    total = sum(len(run) for run in runs)
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=runs[0].dtype, shape=(total,))
+    pos = [0] * len(runs)
+    n_out = 0
+    live = [i for i, run in enumerate(runs) if len(run) > 0]
+    while live:
+        # all values up to the smallest last value of the blocks are in the blocks
+        limit = min(runs[i][min(pos[i] + chunk, len(runs[i])) - 1] for i in live)
+        parts = []
+        for i in live:
+            block = runs[i][pos[i]:pos[i] + chunk]
+            n = int(np.searchsorted(block, limit, side="right"))
+            parts.append(block[:n])
+            pos[i] += n
+        merged = np.sort(np.concatenate(parts))
+        out[n_out:n_out + len(merged)] = merged
+        n_out += len(merged)
+        live = [i for i in live if pos[i] < len(runs[i])]
+    out.flush()
+    del out
+
+
+class _HashSet(object):
+    """Set of hash digests, spilled to sorted memory mapped runs on disk."""
+
+    def __init__(self, hash_bytes: int, memory_bytes: int, tmp_dir: str,
+                 bloom_capacity: int = None):
+        self._dtype = f"S{hash_bytes}"
+        self._memory_bytes = memory_bytes
+        self._digest_bytes = sys.getsizeof(bytes(hash_bytes))
+        self._tmp_dir = tmp_dir
+        self._hashes = set()
+        self._runs: List[Tuple[int, str, np.ndarray]] = []   # level, path, hashes
+        self._num_files = 0
+        self._bloom = BloomFilter(bloom_capacity) if bloom_capacity else None
+
+    def add(self, digest: bytes) -> bool:
+        """ add digest, return True if it was added before """
+        if self._bloom is not None and not self._bloom.add(digest):
+            self._insert(digest)
+            return False
+
+        if digest in self._hashes:
+            return True
+        key = np.array(digest, dtype=self._dtype)
+        for _, _, run in self._runs:
+            pos = np.searchsorted(run, key)
+            if pos < len(run) and run[pos] == key:
+                return True
+        self._insert(digest)
+        return False
+
+    @property
+    def memory_bytes(self) -> int:
+        """ memory used by the in memory set and its digests """
+        return sys.getsizeof(self._hashes) + len(self._hashes) * self._digest_bytes
+
+    def _insert(self, digest: bytes):
+        self._hashes.add(digest)
+        if self.memory_bytes >= self._memory_bytes:
+            self._spill()
+
+    def _new_path(self) -> str:
+        self._num_files += 1
+        return os.path.join(self._tmp_dir, f"run{self._num_files}.npy")
+
+    def _spill(self):
+        path = self._new_path()
+        np.save(path, np.array(sorted(self._hashes), dtype=self._dtype))
+        self._runs.append((0, path, np.load(path, mmap_mode="r")))
+        self._hashes = set()
+
+        level = 0
+        while True:
+            same = [r for r in self._runs if r[0] == level]
+            if len(same) < _MERGE_FANOUT:
+                break
+            path = self._new_path()
+            _merge_runs([run for _, _, run in same], path)
+            self._runs = [r for r in self._runs if r[0] != level]
+            self._runs.append((level + 1, path, np.load(path, mmap_mode="r")))
+            for _, old_path, _ in same:
+                os.remove(old_path)
+            level += 1
+
+    @property
+    def num_runs(self) -> int:
+        return len(self._runs)
+
+    def close(self):
+        self._runs = []
+        self._hashes = set()
+
+
+class DedupMolInputStream(BaseMolInputStream):
+    """Return the molecules of in_stream without duplicates."""
+
+    def __init__(self, in_stream, policy: str = "first",
+                 key: Callable[[BaseMol], str] = None,
+                 best_tag: str = None, best: str = "min", hash_bits: int = 128,
+                 memory_bytes: int = 1 << 30, bloom_capacity: int = None,
+                 tmp_dir: str = None, toolkit: str = TOOLKIT):
+        """
+        Parameters
+        ----------
+        in_stream
+            molecule input stream or iterable of molecules, a stream is
+            closed with this stream
+        policy
+            first: keep the first occurrence,
+            best: keep the molecule with the best value of best_tag
+        key
+            function returning the identity of a molecule, default: canonical smiles
+        best_tag
+            numeric tag compared by the best policy, molecules without a
+            numeric value are only kept if no other molecule has one
+        best
+            min or max
+        hash_bits
+            128 or 64
+        memory_bytes
+            memory for the in memory set of hashes of the first policy and
+            approximate memory for the partitions of the best policy
+        bloom_capacity
+            expected number of distinct molecules, if given the first
+            policy uses a bloom filter to avoid most lookups in spilled runs
+        tmp_dir
+            directory for temporary files, default: system temp directory
+        toolkit
+            openeye or rdkit, used for the spill file of the best policy
+        """
+        BaseMolInputStream.__init__(self, getattr(in_stream, "file_path", None))
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}: {policy}")
+        if policy == "best" and best_tag is None:
+            raise ValueError("best_tag is required for the best policy")
+        if best not in ("min", "max"):
+            raise ValueError(f"best must be min or max: {best}")
+        if hash_bits not in (64, 128):
+            raise ValueError(f"hash_bits must be 64 or 128: {hash_bits}")
+
+        self._in = in_stream
+        self._key = key or _canonical_smiles
+        self._hash_bytes = hash_bits // 8
+        self._tmp_dir = tempfile.mkdtemp(prefix="cddlib_dedup", dir=tmp_dir)
+        self._hash_set = None
+        self.num_read = 0
+        self.num_duplicates = 0
+        self.next_mol = None
+        if policy == "first":
+            self._hash_set = _HashSet(self._hash_bytes, memory_bytes,
+                                      self._tmp_dir, bloom_capacity)
+            self._mols = self._iter_first()
+        else:
+            self._mols = self._iter_best(best_tag, best == "max", memory_bytes, toolkit)
+
+    def _digest(self, mol: BaseMol) -> bytes:
+        return hashlib.blake2b(self._key(mol).encode("utf-8"),
+                               digest_size=self._hash_bytes).digest()
+
+    def _iter_first(self) -> Iterator[BaseMol]:
+        for mol in self._in:
+            self.num_read += 1
+            if self._hash_set.add(self._digest(mol)):
+                self.num_duplicates += 1
+            else:
+                yield mol
+
+    def _iter_best(self, best_tag: str, maximize: bool, memory_bytes: int,
+                   toolkit: str) -> Iterator[BaseMol]:
+        from cddlib.chem.cddb import CDDBMolInputStream, CDDBMolOutputStream
+
+        dtype = np.dtype([("h", f"S{self._hash_bytes}"), ("score", "<f8"), ("idx", "<u8")])
+        part_paths = [os.path.join(self._tmp_dir, f"part{i}.bin")
+                      for i in range(_NUM_PARTITIONS)]
+        part_files = [open(p, "wb") for p in part_paths]
+        buffers: List[list] = [[] for _ in range(_NUM_PARTITIONS)]
+        max_buffered = max(1, memory_bytes // (4 * dtype.itemsize * _NUM_PARTITIONS))
+        spill_path = os.path.join(self._tmp_dir, "mols.cddb")
+
+        try:
+            with CDDBMolOutputStream(spill_path, toolkit) as spill:
+                for idx, mol in enumerate(self._in):
+                    digest = self._digest(mol)
+                    score = _as_float(mol[best_tag]) if best_tag in mol else math.nan
+                    if maximize:
+                        score = -score
+                    part = digest[0]
+                    buffers[part].append((digest, score, idx))
+                    if len(buffers[part]) >= max_buffered:
+                        part_files[part].write(np.array(buffers[part], dtype=dtype).tobytes())
+                        buffers[part] = []
+                    spill.write_mol(mol)
+                    self.num_read += 1
+            for part, buf in enumerate(buffers):
+                if buf:
+                    part_files[part].write(np.array(buf, dtype=dtype).tobytes())
+        finally:
+            for out in part_files:
+                out.close()
+
+        keep = np.zeros(self.num_read, dtype=bool)
+        for path in part_paths:
+            rows = np.fromfile(path, dtype=dtype)
+            os.remove(path)
+            if len(rows) == 0:
+                continue
+            # NaN sorts last, ties are resolved by input order
+            rows = rows[np.argsort(rows, order=("h", "score", "idx"), kind="stable")]
+            first = np.ones(len(rows), dtype=bool)
+            first[1:] = rows["h"][1:] != rows["h"][:-1]
+            keep[rows["idx"][first].astype(np.int64)] = True
+        self.num_duplicates = self.num_read - int(keep.sum())
+
+        with CDDBMolInputStream(spill_path, toolkit) as spilled:
+            for idx, mol in enumerate(spilled):
+                if keep[idx]:
+                    yield mol
+
+    def has_next(self) -> bool:
+        if self.next_mol is not None:
+            return True
+        if self._mols is None:
+            return False
+        self.next_mol = next(self._mols, None)
+        return self.next_mol is not None
+
+    def __next__(self) -> BaseMol:
+        if not self.has_next():
+            raise StopIteration()
+
+        res = self.next_mol
+        self.next_mol = None
+        return res
+
+    def close(self):
+        if self._mols is None:
+            return
+        self._mols.close()
+        self._mols = None
+        if self._hash_set is not None:
+            self._hash_set.close()
+        if hasattr(self._in, "close"):
+            self._in.close()
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+
+def _as_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def dedup(mols, **kwargs) -> Iterator[BaseMol]:
+    """ Iterate over mols without duplicates, see DedupMolInputStream for kwargs """
+    with DedupMolInputStream(mols, **kwargs) as uniq:
+        yield from uniq
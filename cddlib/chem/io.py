@@ -10,8 +10,12 @@ from abc import ABCMeta
 from abc import abstractmethod
 from collections import deque
 from importlib import import_module
+import io
 import os
+from typing import Dict, Iterator, Optional, Sequence
+from cddlib.chem.batch import MolBatch, iter_batches
 from cddlib.chem.mol import BaseMol
+from cddlib.chem.sdf_index import SDFIndex
 from cddlib.chem.toolkit import TOOLKIT
         
 
@@ -19,21 +23,150 @@ from cddlib.chem.toolkit import TOOLKIT
 """
 
 
-def get_mol_input_stream(*args, **kwargs):
+def get_mol_input_stream(*args, workers: int = None, use_mmap: bool = False,
+                         lazy: bool = False, index: bool = False,
+                         group_conformers: str = None, prefetch: int = None,
+                         instrument=False, sample: int = None,
+                         sample_fraction: float = None, seed=None, **kwargs):
     """ create an input stream for molecules.
         Depending on the TOOLKIT variable this will be either rdkit or openeye.
+
+        workers: if > 1 sd files are parsed in a pool of worker processes,
+                 molecules are still returned in file order.
+        use_mmap: read uncompressed sd files through a memory map
+        lazy: return LazyMol objects which answer title and sd tag queries
+              from the sd text and are only parsed when needed.
+        index: open the record index of an uncompressed sd file, this
+               enables len(), see BaseMolInputStream.index
+        group_conformers: "title" or "connection_table", merge consecutive
+               records of the same molecule into multi-conformer molecules,
+               see cddlib.chem.conformers
+        prefetch: read and parse up to prefetch molecules ahead on a
+               background thread, see cddlib.chem.async_io
+        instrument: count records and sample the parse time, available
+               from stats(). True or a dict of arguments for StreamStats,
+               see cddlib.chem.stream_stats
+        sample: return a random sample of sample molecules in file order
+        sample_fraction: return each molecule with probability sample_fraction
+        seed: seed for sample and sample_fraction, indexed sd and .cddb
+               files are sampled by random access, other sd files without
+               parsing the records which are not selected,
+               see cddlib.chem.sample
+
+        Files with the .cddb extension are read with the binary molecule
+        cache reader, see cddlib.chem.cddb.
+
+        workers, use_mmap and lazy select alternative readers and exclude
+        each other, they can not be combined with .cddb files or with
+        sample and sample_fraction (sampled sd files return LazyMol
+        objects). A ValueError is raised for such combinations.
+
+        The workers and use_mmap readers raise a ValueError for records
+        that can not be parsed. The default reader returns what the toolkit
+        returns for such records (rdkit: a Mol wrapping None).
     """
-    
+    _check_reader_options(args, kwargs, workers, use_mmap, lazy,
+                          sample is not None or sample_fraction is not None)
+
+    if group_conformers is not None:
+        conformers = import_module("cddlib.chem.conformers")
+        in_stream = get_mol_input_stream(*args, workers=workers, use_mmap=use_mmap,
+                                         lazy=lazy, index=index, prefetch=prefetch,
+                                         instrument=instrument, sample=sample,
+                                         sample_fraction=sample_fraction, seed=seed,
+                                         **kwargs)
+        return conformers.ConformerGroupInputStream(in_stream, group_conformers,
+                                                    toolkit=TOOLKIT)
+
+    if prefetch:
+        async_io = import_module("cddlib.chem.async_io")
+        in_stream = get_mol_input_stream(*args, workers=workers, use_mmap=use_mmap,
+                                         lazy=lazy, index=index, instrument=instrument,
+                                         sample=sample, sample_fraction=sample_fraction,
+                                         seed=seed, **kwargs)
+        return async_io.PrefetchMolInputStream(in_stream, prefetch)
+
+    if instrument:
+        stream_stats = import_module("cddlib.chem.stream_stats")
+        in_stream = get_mol_input_stream(*args, workers=workers, use_mmap=use_mmap,
+                                         lazy=lazy, index=index, sample=sample,
+                                         sample_fraction=sample_fraction, seed=seed,
+                                         **kwargs)
+        return stream_stats.InstrumentedMolInputStream(
+            in_stream, **(instrument if isinstance(instrument, dict) else {}))
+
+    if sample is not None or sample_fraction is not None:
+        sample_module = import_module("cddlib.chem.sample")
+        return sample_module.SampledMolInputStream(*args, size=sample,
+                                                   fraction=sample_fraction, seed=seed,
+                                                   index=index, toolkit=TOOLKIT, **kwargs)
+
+    if index:
+        return get_mol_input_stream(*args, workers=workers, use_mmap=use_mmap,
+                                    lazy=lazy, **kwargs).open_index()
+
+    if _is_cddb(args, kwargs):
+        cddb = import_module("cddlib.chem.cddb")
+        return cddb.CDDBMolInputStream(*args, toolkit=TOOLKIT, **kwargs)
+
+    if lazy:
+        lazy_mol = import_module("cddlib.chem.lazy_mol")
+        return lazy_mol.LazyMolInputStream(*args, toolkit=TOOLKIT, **kwargs)
+
+    if use_mmap:
+        mmap_io = import_module("cddlib.chem.mmap_io")
+        return mmap_io.MmapMolInputStream(*args, toolkit=TOOLKIT, **kwargs)
+
+    if workers is not None and workers > 1:
+        parallel = import_module("cddlib.chem.parallel")
+        return parallel.ParallelMolInputStream(*args, workers=workers,
+                                               toolkit=TOOLKIT, **kwargs)
+
     io_module = _import_iomodule(TOOLKIT)
     instance = io_module.MolInputStream(*args, **kwargs)
     return instance
 
 
-def get_mol_output_stream(*args, **kwargs):
+def get_mol_output_stream(*args, async_write: bool = False, queue_size: int = 1000,
+                          instrument=False, **kwargs):
     """ create an ouptu stream for molecules.
         Depending on the TOOLKIT variable this will be either rdkit or openeye.
+        Files with the .cddb extension are written in the binary format of
+        the toolkit, see cddlib.chem.cddb.
+
+        async_write: write on a background thread with a queue of at most
+                     queue_size molecules, see cddlib.chem.async_io
+        instrument: count records and sample the serialization time,
+                     see get_mol_input_stream()
+        append: (passed on to the stream) continue an existing sd, smiles
+                     or .cddb file after its last complete record, the
+                     position returned by sync() can be used for
+                     checkpoints, see cddlib.chem.checkpoint
+
+        A file path with a {shard} field (eg. "out.{shard:04d}.sdf.gz")
+        writes multiple files, see cddlib.chem.sharded.ShardedMolOutputStream
+        for the additional arguments.
     """
     
+    if async_write:
+        async_io = import_module("cddlib.chem.async_io")
+        return async_io.AsyncMolOutputStream(
+            get_mol_output_stream(*args, instrument=instrument, **kwargs), queue_size)
+
+    if instrument:
+        stream_stats = import_module("cddlib.chem.stream_stats")
+        return stream_stats.InstrumentedMolOutputStream(
+            get_mol_output_stream(*args, **kwargs),
+            **(instrument if isinstance(instrument, dict) else {}))
+
+    if _is_sharded(args, kwargs):
+        sharded = import_module("cddlib.chem.sharded")
+        return sharded.ShardedMolOutputStream(*args, toolkit=TOOLKIT, **kwargs)
+
+    if _is_cddb(args, kwargs):
+        cddb = import_module("cddlib.chem.cddb")
+        return cddb.CDDBMolOutputStream(*args, toolkit=TOOLKIT, **kwargs)
+
     io_module = _import_iomodule(TOOLKIT)
     instance = io_module.MolOutputStream(*args, **kwargs)
     return instance
@@ -45,6 +178,7 @@ class BaseMolInputStream(metaclass=ABCMeta):
     """
     def __init__(self, file_path: str):
         self.file_path = file_path
+        self._index = None
 
     def __enter__(self):
         return self
@@ -67,13 +201,125 @@ class BaseMolInputStream(metaclass=ABCMeta):
     def close(self):
         pass
 
+    def batches(self, size: int, tags: Sequence[str] = ()) -> Iterator[MolBatch]:
+        """ Iterate over the remaining molecules in MolBatch objects holding
+            up to size molecules and their atom data as numpy arrays.
+
+            tags: names of sd tags to extract into MolBatch.tags
+        """
+        return iter_batches(self, size, tags)
+
+    @property
+    def bytes_read(self) -> Optional[int]:
+        """ Position in the input file (compressed bytes for compressed
+            files) or None if not known, eg. for stdin.
+        """
+        return None
+
+    @property
+    def index(self) -> SDFIndex:
+        """Index of the record offsets in file_path.
+
+        The index is loaded from the sidecar file (file_path + ".cddidx")
+        or built and saved there on first access. Only uncompressed sd
+        files can be indexed.
+        """
+        if self._index is None:
+            self._index = SDFIndex.open(self.file_path)
+        return self._index
+
+    def open_index(self) -> 'BaseMolInputStream':
+        """ Load or build the record index, this enables len() """
+        self.index
+        return self
+
+    def __len__(self) -> int:
+        """ Number of records in file, requires that the index was opened
+            eg. with open_index() or get_mol_input_stream(..., index=True).
+
+            The index is not built implicitly because len() is also
+            called eg. by list(stream).
+        """
+        if self._index is None:
+            raise TypeError(f"len() of {self.__class__.__name__} requires the record index,"
+                            " call open_index() first")
+        return len(self._index)
+
+    def __getitem__(self, i):
+        """ Random access to molecules by record number, requires the index.
+
+            stream[i] returns one molecule, stream[i:j] a list of molecules.
+            This does not change the position of the sequential iterator.
+        """
+        index = self.index
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(index))
+            if step != 1:
+                return [self[j] for j in range(start, stop, step)]
+            if start >= stop:
+                return []
+            return list(self._mols_from_sdf_bytes(index.read(start, stop)))
+
+        if i < 0:
+            i += len(index)
+        if not 0 <= i < len(index):
+            raise IndexError(f"record index out of range: {i}")
+        return next(iter(self._mols_from_sdf_bytes(index.read(i, i + 1))))
+
+    def seek(self, i: int) -> None:
+        """ Position the stream so that the next molecule returned is record i,
+            requires the index.
+        """
+        index = self.index
+        if i < 0:
+            i += len(index)
+        if not 0 <= i <= len(index):
+            raise IndexError(f"record index out of range: {i}")
+        if not index.is_valid():
+            raise ValueError(f"{self.file_path} was modified after it was indexed")
+        self._seek_bytes(int(index.offsets[i]))
+
+    @property
+    def supports_resume(self) -> bool:
+        """ True if position() and resume() are supported """
+        return False
+
+    def position(self) -> Dict:
+        """ json serializable position of the next molecule which can be
+            passed to resume() of a new stream on the same file, see
+            cddlib.chem.checkpoint.
+
+            Raises io.UnsupportedOperation when supports_resume is False,
+            LazyMolInputStream supports it.
+        """
+        raise io.UnsupportedOperation(f"{self.__class__.__name__} does not support resuming")
+
+    def resume(self, position: Dict) -> None:
+        """ Continue reading at a position returned by position().
+
+            Raises io.UnsupportedOperation unless the stream supports resuming.
+        """
+        raise io.UnsupportedOperation(f"{self.__class__.__name__} does not support resuming")
+
+    def _mols_from_sdf_bytes(self, data: bytes):
+        """ Parse the text of sd records, overridden by the streams
+            supporting random access, raises io.UnsupportedOperation otherwise.
+        """
+        raise io.UnsupportedOperation(f"{self.__class__.__name__} does not support random access")
+
+    def _seek_bytes(self, offset: int) -> None:
+        """ Continue reading at byte offset, overridden by the streams
+            supporting seek(), raises io.UnsupportedOperation otherwise.
+        """
+        raise io.UnsupportedOperation(f"{self.__class__.__name__} does not support seek")
+
 
 class MemMolStream(object):
     '''
     Mol Stream that holds a list of molecules in memory
     '''
 
-    def __init__(self, init_list: list = []):
+    def __init__(self, init_list: list = None):
         '''
         Initialize this in memory MolStream
 
@@ -83,8 +329,12 @@ class MemMolStream(object):
             list of Mol's to be in the stream, you may also use add_mol
             later.
 
+        The molecules are removed while iterating, see
+        cddlib.chem.mol_store.MolStore for a compact store which can be
+        indexed and iterated repeatedly and cddlib.chem.spill.SpillingMolStream
+        for a stream with a memory budget.
         '''
-        self._mols = deque(init_list)
+        self._mols = deque(init_list if init_list is not None else ())
 
     def add_mol(self, mol:BaseMol) -> None:
         """Add molecule to the internal list.
@@ -145,6 +395,31 @@ class MemMolStream(object):
         self._mols = None
 
 
+def _check_reader_options(args, kwargs, workers: Optional[int], use_mmap: bool,
+                          lazy: bool, sampled: bool) -> None:
+    """ raise ValueError for reader options of get_mol_input_stream()
+        which can not be honored together
+    """
+    readers = [name for name, value in (("workers", workers is not None and workers > 1),
+                                        ("use_mmap", use_mmap), ("lazy", lazy)) if value]
+    if len(readers) > 1:
+        raise ValueError(f"{' and '.join(readers)} can not be combined")
+    if readers and sampled:
+        raise ValueError(f"{readers[0]} can not be combined with sample or sample_fraction")
+    if readers and _is_cddb(args, kwargs):
+        raise ValueError(f"{readers[0]} is not supported for .cddb files")
+
+
+def _is_cddb(args, kwargs) -> bool:
+    file_path = args[0] if args else kwargs.get("file_path")
+    return isinstance(file_path, str) and file_path.lower().endswith(".cddb")
+
+
+def _is_sharded(args, kwargs) -> bool:
+    file_path = args[0] if args else kwargs.get("path_template")
+    return isinstance(file_path, str) and "{shard" in file_path
+
+
 def _import_iomodule(TOOLKIT: str):
     if TOOLKIT == "openeye":
         io_module = import_module("cddlib.chem.oechem.io")
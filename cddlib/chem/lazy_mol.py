@@ -0,0 +1,342 @@
+'''Molecules that keep the text of their sd record and parse it on demand.
+
+The title and the sd tags of a LazyMol are read from the text, the
+toolkit molecule is only created when structural information (atoms,
+coordinates, smiles, ...) is requested.
+'''
+
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, Dict, List, Optional
+
+import numpy as np
+
+from cddlib.chem.atom import BaseAtom
+from cddlib.chem.io import BaseMolInputStream, _import_iomodule
+from cddlib.chem.mol import BaseMol
+from cddlib.chem.sdf import (format_sd_data, is_stdin_path, iter_records, molblock_end,
+                             open_input, parse_sd_data, record_title, sdfRE, split_records)
+from cddlib.chem.toolkit import TOOLKIT
+from cddlib.util import bgzf, compress
+from cddlib.util.compress import compression_of
+
+
+class LazyMol(BaseMol):
+    """Molecule backed by the text of an sd record."""
+
+    def __init__(self, record: bytes, toolkit: str = TOOLKIT,
+                 isomeric_smiles=True, **parser_args):
+        """
+        Parameters
+        ----------
+        record
+            text of one sd record
+        toolkit
+            openeye or rdkit, used to parse the record on demand
+        isomeric_smiles
+            Flag for whether to generate isomeric SMILES when
+            canonical_smiles is called
+        parser_args
+            passed on to the toolkit parser
+        """
+        # BaseMol.__init__ is not called as the native molecule is created on demand
+        self._record = bytes(record)
+        self._toolkit = toolkit
+        self._parser_args = parser_args
+        self._isomeric_smiles = isomeric_smiles
+        self._data = None               # OrderedDict of sd tags
+        self._data_modified = False
+        self._parsed = None             # toolkit Mol once parsed
+        self._structure_modified = False
+
+    @property
+    def is_parsed(self) -> bool:
+        """ True if the record was parsed into a toolkit molecule """
+        return self._parsed is not None
+
+    def _structure(self) -> BaseMol:
+        if self._parsed is None:
+            mol = _get_parser(self._toolkit, self._parser_args).parse(self._record)
+            if mol is None:
+                raise ValueError(f"Could not parse molecule: {self.title}")
+            if self._data_modified:
+                for kee, value in self._data.items():
+                    mol[kee] = value
+            self._parsed = mol
+        return self._parsed
+
+    def _sd_data(self) -> OrderedDict:
+        if self._data is None:
+            self._data = OrderedDict(parse_sd_data(self._record))
+        return self._data
+
+    @property
+    def _mol(self):
+        """ native toolkit molecule, access marks the structure as modified """
+        native = self._structure()._mol
+        self._structure_modified = True
+        return native
+
+    @property
+    def num_atoms(self) -> int:
+        return self._structure().num_atoms
+
+    @property
+    def num_bonds(self) -> int:
+        return self._structure().num_bonds
+
+    @property
+    def coordinates(self) -> np.ndarray:
+        return self._structure().coordinates
+
+    @coordinates.setter
+    def coordinates(self, positions: np.ndarray):
+        self.set_coordinates(positions)
+
+    def get_coordinates(self, dtype=np.float64, out: np.ndarray = None) -> np.ndarray:
+        return self._structure().get_coordinates(dtype, out)
+
+    def set_coordinates(self, positions: np.ndarray) -> None:
+        self._structure().set_coordinates(positions)
+        self._structure_modified = True
+
+    @property
+    def num_conformers(self) -> int:
+        return self._structure().num_conformers
+
+    def get_conformer_coordinates(self, dtype=np.float64, out: np.ndarray = None) -> np.ndarray:
+        return self._structure().get_conformer_coordinates(dtype, out)
+
+    def set_conformer_coordinates(self, positions: np.ndarray) -> None:
+        self._structure().set_conformer_coordinates(positions)
+        self._structure_modified = True
+
+    @property
+    def atoms(self) -> List[BaseAtom]:
+        return self._structure().atoms
+
+    @property
+    def atom_symbols(self) -> List[str]:
+        return self._structure().atom_symbols
+
+    @property
+    def atom_types(self) -> List[int]:
+        return self._structure().atom_types
+
+    @property
+    def canonical_smiles(self) -> str:
+        mol = self._structure()
+        mol.isomeric_smiles = self.isomeric_smiles
+        return mol.canonical_smiles
+
+    @property
+    def title(self) -> str:
+        if self._structure_modified:
+            return self._parsed.title
+        return record_title(self._record)
+
+    def __contains__(self, kee: str) -> bool:
+        if self._structure_modified:
+            return kee in self._parsed
+        return kee in self._sd_data()
+
+    def __getitem__(self, kee: str):
+        if self._structure_modified:
+            return self._parsed[kee]
+        data = self._sd_data()
+        if kee in data:
+            return data[kee]
+        raise KeyError("{} has no key {!r}".
+                       format(self.__class__.__name__, kee))
+
+    def __setitem__(self, kee, value):
+        self._sd_data()[kee] = str(value)
+        self._data_modified = True
+        if self._parsed is not None:
+            self._parsed[kee] = value
+
+    def keys(self):
+        if self._structure_modified:
+            return self._parsed.keys()
+        return tuple(self._sd_data().keys())
+
+    def items(self):
+        if self._structure_modified:
+            return self._parsed.items()
+        return self._sd_data().items()
+
+    def sdf_record(self) -> Optional[bytes]:
+        if self._structure_modified:
+            return None
+        if not self._data_modified:
+            return self._record
+
+        end = molblock_end(self._record)
+        if end < 0:
+            return None
+        return b"".join((self._record[:end], format_sd_data(self._data.items()), b"$$$$\n"))
+
+
+class LazyMolInputStream(BaseMolInputStream):
+    """Read an sd file returning LazyMol objects.
+
+       Only the record boundaries are located while reading, molecules are
+       parsed when their structure is accessed.
+    """
+
+    def __init__(self, file_path: str, toolkit: str = TOOLKIT,
+                 decompress_threads: int = None, **kwargs):
+        """
+        Parameters
+        ----------
+        file_path
+            sd file to read, may be gzipped, ".sdf" or ".sdf.gz" reads stdin
+        toolkit
+            openeye or rdkit
+        decompress_threads
+            number of threads used to decompress BGZF files
+        kwargs
+            passed on to the toolkit parser
+        """
+        BaseMolInputStream.__init__(self, file_path)
+        if sdfRE.search(file_path) is None:
+            raise ValueError("Unknown file format: " + file_path)
+        self._toolkit = toolkit
+        self._kwargs = kwargs
+        self._decompress_threads = decompress_threads
+        self._in = open_input(file_path, decompress_threads)
+        self._records = iter_records(self._in)
+        self.next_mol = None
+        self._next_size = 0
+        self._num_read = 0
+        self._offset = 0    # uncompressed offset of the next record
+        self._base = 0      # uncompressed offset at which self._in starts
+
+    def has_next(self) -> bool:
+        if self.next_mol is not None:
+            return True
+
+        record = next(self._records, None)
+        if record is None:
+            return False
+        self.next_mol = LazyMol(record, self._toolkit, **self._kwargs)
+        self._next_size = len(record)
+        return True
+
+    def __next__(self) -> LazyMol:
+        if not self.has_next():
+            raise StopIteration()
+
+        res = self.next_mol
+        self.next_mol = None
+        self._offset += self._next_size
+        self._num_read += 1
+        return res
+
+    @property
+    def supports_resume(self) -> bool:
+        return not is_stdin_path(self.file_path)
+
+    def position(self) -> Dict:
+        """Position of the next molecule.
+
+        Returns
+        -------
+        dict with
+            records: number of molecules returned so far,
+            offset: uncompressed byte offset of the next record,
+            block, block_offset: for BGZF files the compressed offset of
+            the block containing the next record and the offset within it,
+            file_path and size: to verify that the file did not change
+        """
+        if is_stdin_path(self.file_path):
+            raise ValueError("Can not resume reading from stdin")
+        pos = {"file_path": self.file_path, "size": os.path.getsize(self.file_path),
+               "records": self._num_read, "offset": self._offset}
+        reader = getattr(self._in, "raw", None)
+        if isinstance(reader, bgzf.BlockGzipReader):
+            pos["block"], pos["block_offset"] = reader.block_offset(self._offset - self._base)
+        return pos
+
+    def resume(self, position: Dict) -> None:
+        """Continue reading at a position returned by position().
+
+           Uncompressed files are positioned with seek(), BGZF files are
+           decompressed from the block containing the position, other
+           compressed files are decompressed from the start.
+        """
+        if position.get("size") != os.path.getsize(self.file_path):
+            raise ValueError(f"{self.file_path} changed since the position was taken")
+
+        offset = position["offset"]
+        compression = compression_of(self.file_path)
+        self._base = 0
+        if compression is None:
+            self._in.seek(offset)
+        else:
+            self._in.close()
+            self._in = None
+            raw = io.open(self.file_path, "rb")
+            skip = offset
+            if "block" in position:
+                raw.seek(position["block"])
+                skip = position["block_offset"]
+                self._base = offset - skip
+            self._in = compress.open_input(raw, compression, self._decompress_threads)
+            _skip_bytes(self._in, skip)
+
+        self.next_mol = None
+        self._offset = offset
+        self._num_read = position["records"]
+        self._records = iter_records(self._in)
+
+    @property
+    def bytes_read(self) -> Optional[int]:
+        if self._in is None or is_stdin_path(self.file_path) \
+           or compression_of(self.file_path) is not None:
+            return None
+        return self._in.tell()
+
+    def _mols_from_sdf_bytes(self, data: bytes):
+        return [LazyMol(rec, self._toolkit, **self._kwargs) for rec in split_records(data)]
+
+    def seek(self, i: int) -> None:
+        BaseMolInputStream.seek(self, i)
+        self._num_read = i if i >= 0 else i + len(self.index)
+
+    def _seek_bytes(self, offset: int) -> None:
+        self.next_mol = None
+        self._in.seek(offset)
+        self._offset = offset
+        self._records = iter_records(self._in)
+
+    def close(self):
+        if self._in is not None:
+            self._in.close()
+        self._in = None
+        self._records = None
+
+
+def _skip_bytes(in_s: BinaryIO, n_bytes: int):
+    while n_bytes > 0:
+        n_read = len(in_s.read(min(n_bytes, 1 << 20)))
+        if n_read == 0:
+            raise ValueError("position is beyond the end of the file")
+        n_bytes -= n_read
+
+
+_parsers = threading.local()
+
+
+def _get_parser(toolkit: str, parser_args: dict):
+    """ SDRecordParser of toolkit for the current thread """
+    kee = (toolkit, tuple(sorted(parser_args.items())))
+    cache = getattr(_parsers, "cache", None)
+    if cache is None:
+        cache = _parsers.cache = {}
+    parser = cache.get(kee)
+    if parser is None:
+        parser = cache[kee] = _import_iomodule(toolkit).SDRecordParser(**parser_args)
+    return parser
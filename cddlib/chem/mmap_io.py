@@ -0,0 +1,76 @@
+'''Molecule input stream reading uncompressed sd files through a memory map.'''
+
+from cddlib.chem.io import BaseMolInputStream, _import_iomodule
+from cddlib.chem.mol import BaseMol
+from cddlib.chem.sdf import SDFileMap
+from cddlib.chem.toolkit import TOOLKIT
+
+
+class MmapMolInputStream(BaseMolInputStream):
+    """Read an uncompressed sd file via mmap.
+
+       The mapped file is cut at record boundaries into slices of about
+       chunk_bytes and each slice is parsed with a single toolkit supplier.
+       This avoids the python level buffered reads for files that are in
+       the page cache without paying the supplier setup for every record.
+    """
+
+    def __init__(self, file_path: str, toolkit: str = TOOLKIT,
+                 chunk_bytes: int = 1 << 20, **kwargs):
+        """
+        Parameters
+        ----------
+        file_path
+            uncompressed sd file
+        toolkit
+            openeye or rdkit
+        chunk_bytes
+            approximate size of the slices handed to the parser
+        kwargs
+            passed on to the toolkit parser
+        """
+        BaseMolInputStream.__init__(self, file_path)
+        self._io_module = _import_iomodule(toolkit)
+        self._kwargs = kwargs
+        self._parser = self._io_module.SDRecordParser(**kwargs)
+        self._chunk_bytes = chunk_bytes
+        self._map = SDFileMap(file_path)
+        self._mols = self._iter_mols(0)
+        self.next_mol = None
+
+    def _iter_mols(self, offset: int):
+        for chunk in self._map.chunks(offset, self._chunk_bytes):
+            for mol in self._parser.parse_records(chunk):
+                if mol is None:
+                    raise ValueError(
+                        f"Could not parse record in chunk at byte {offset}")
+                yield mol
+            offset += len(chunk)
+
+    def has_next(self) -> bool:
+        if self.next_mol is not None:
+            return True
+
+        self.next_mol = next(self._mols, None)
+        return self.next_mol is not None
+
+    def __next__(self) -> BaseMol:
+        if not self.has_next():
+            raise StopIteration()
+
+        res = self.next_mol
+        self.next_mol = None
+        return res
+
+    def _mols_from_sdf_bytes(self, data: bytes):
+        return self._io_module.mols_from_sdf_bytes(data, **self._kwargs)
+
+    def _seek_bytes(self, offset: int) -> None:
+        self.next_mol = None
+        self._mols = self._iter_mols(offset)
+
+    def close(self):
+        if self._map is not None:
+            self._mols = None
+            self._map.close()
+        self._map = None
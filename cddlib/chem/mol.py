@@ -7,7 +7,8 @@ from abc import abstractmethod
 from importlib import import_module
 import numpy as np
 from cddlib.chem.atom import BaseAtom
-from typing import List
+from cddlib.chem.sdf import molblock_end
+from typing import List, Optional
 from cddlib.chem.toolkit import TOOLKIT
 
 
@@ -69,6 +70,82 @@ class BaseMol(metaclass=ABCMeta):
     def coordinates(self, positions:np.ndarray):
         pass
 
+    def get_coordinates(self, dtype=np.float64, out:np.ndarray=None) -> np.ndarray:
+        """Return the atomic coordinates with one call into the toolkit.
+
+        Parameters
+        ----------
+        dtype
+            np.float64 or np.float32, ignored if out is given
+        out
+            optional [nAtoms,3] array receiving the coordinates, eg. a
+            slice of a larger buffer
+
+        returns
+        -------
+        numpy [nAtoms,3], out if given
+        """
+        return coordinates_as(self.coordinates, dtype, out)
+
+    def set_coordinates(self, positions:np.ndarray) -> None:
+        """Set the atomic coordinates from a [nAtoms,3] array with one call
+           into the toolkit.
+        """
+        self.coordinates = positions
+
+    @property
+    def num_conformers(self) -> int:
+        """Number of conformers, molecules read from single conformer
+           formats have one conformer.
+        """
+        return 1
+
+    @property
+    def conformer_coordinates(self) -> np.ndarray:
+        """Return the coordinates of all conformers.
+
+        returns
+        -------
+        numpy [nConf,nAtoms,3]
+        """
+        return self.get_conformer_coordinates()
+
+    @conformer_coordinates.setter
+    def conformer_coordinates(self, positions:np.ndarray):
+        self.set_conformer_coordinates(positions)
+
+    def get_conformer_coordinates(self, dtype=np.float64, out:np.ndarray=None) -> np.ndarray:
+        """Return the coordinates of all conformers with one call into the
+           toolkit per conformer.
+
+        Parameters
+        ----------
+        dtype
+            np.float64 or np.float32, ignored if out is given
+        out
+            optional [nConf,nAtoms,3] array receiving the coordinates
+
+        returns
+        -------
+        numpy [nConf,nAtoms,3], out if given
+        """
+        if out is not None:
+            if out.shape[0] != 1:
+                raise ValueError(f"out has shape {out.shape}, expected (1, {self.num_atoms}, 3)")
+            self.get_coordinates(out=out[0])
+            return out
+        return self.get_coordinates(dtype)[np.newaxis]
+
+    def set_conformer_coordinates(self, positions:np.ndarray) -> None:
+        """Replace all conformers by conformers with the [nConf,nAtoms,3]
+           positions, molecules which can only hold one conformer raise a
+           ValueError if nConf != 1.
+        """
+        if len(positions) != 1:
+            raise ValueError(f"{self.__class__.__name__} holds exactly one conformer,"
+                             f" got {len(positions)}")
+        self.set_coordinates(positions[0])
+
     @property
     @abstractmethod
     def atoms(self) -> List[BaseAtom]:
@@ -131,14 +208,76 @@ class BaseMol(metaclass=ABCMeta):
     def items(self):
         pass
 
+    def sdf_record(self) -> Optional[bytes]:
+        """ Text of the sd record this molecule was read from if it still
+            represents the molecule, None otherwise.
+
+            Output streams write this text unchanged instead of
+            regenerating it with the toolkit.
+        """
+        return None
+
+
+def coordinates_as(coords:np.ndarray, dtype=np.float64, out:np.ndarray=None) -> np.ndarray:
+    """ coords converted to dtype or copied into out, see BaseMol.get_coordinates() """
+    if out is None:
+        return coords if coords.dtype == dtype else coords.astype(dtype)
+    if out.shape != coords.shape:
+        raise ValueError(f"out has shape {out.shape}, expected {coords.shape}")
+    np.copyto(out, coords)
+    return out
+
+
+def check_positions(positions:np.ndarray, n_atoms:int, n_conf:int=None) -> np.ndarray:
+    """ positions as C contiguous float64 [n_atoms,3] array or, if n_conf
+        is given, [n_conf,n_atoms,3] array. n_conf=-1 accepts any number
+        of conformers.
+    """
+    positions = np.ascontiguousarray(positions, dtype=np.float64)
+    shape = (n_atoms, 3) if n_conf is None else (n_conf, n_atoms, 3)
+    if positions.shape != shape and \
+       not (n_conf == -1 and positions.ndim == 3 and positions.shape[1:] == shape[1:]):
+        raise ValueError(f"positions have shape {positions.shape}, expected {shape}")
+    return positions
+
 
 def from_smiles(smi:str) -> BaseMol:
-    if TOOLKIT.lower() == "openeye":
+    return _import_molmodule(TOOLKIT).from_smiles(smi)
+
+
+def merge_conformers(mols:List[BaseMol]) -> BaseMol:
+    """ Combine molecules with identical connection tables into one
+        multi-conformer molecule, the title and sd tags are taken from mols[0].
+    """
+    return _import_molmodule(TOOLKIT).merge_conformers(mols)
+
+
+def to_molblock(mol:BaseMol) -> str:
+    """ Return the mdl molfile text of mol """
+    record = mol.sdf_record()
+    if record is not None:
+        end = molblock_end(record)
+        if end >= 0:
+            return record[:end].decode("utf-8", "replace")
+    return _import_molmodule(TOOLKIT).to_molblock(mol)
+
+
+def to_binary(mol:BaseMol) -> bytes:
+    """ Serialize mol including its sd tags into the native binary format of the toolkit """
+    return _import_molmodule(TOOLKIT).to_binary(mol)
+
+
+def from_binary(data:bytes) -> BaseMol:
+    """ Create a molecule from the output of to_binary() """
+    return _import_molmodule(TOOLKIT).from_binary(data)
+
+
+def _import_molmodule(toolkit:str):
+    if toolkit.lower() == "openeye":
         mol_module = import_module("cddlib.chem.oechem.mol")
-    elif TOOLKIT.lower() == "rdkit":
+    elif toolkit.lower() == "rdkit":
         mol_module = import_module("cddlib.chem.rdkit.mol")
     else:
         raise ValueError("TOOLKIT not recognized."
                          " Expected values are openeye or rdkit")
-
-    return mol_module.from_smiles(smi)
+    return mol_module
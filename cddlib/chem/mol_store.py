@@ -0,0 +1,126 @@
+'''Compact in memory storage of many molecules.
+
+A MolStore keeps each molecule as a binary blob in one contiguous buffer
+with an array of offsets instead of keeping toolkit molecule objects.
+Molecules that still carry their sd record text (eg. LazyMol) are stored
+as that text, all others in the binary format of the toolkit. Molecules
+are only created when they are accessed.
+
+    store = MolStore(get_mol_input_stream("lib.sdf.gz"))
+    len(store), store[10], store[100:200]
+    active = store[np.array([float(m["IC50"]) < 1 for m in store])]
+    for mol in active:
+        ...
+
+Unlike MemMolStream a MolStore can be iterated repeatedly and indexed.
+'''
+
+from array import array
+from typing import Iterable, Iterator, Sequence, Union
+
+import numpy as np
+
+from cddlib.chem.mol import BaseMol, _import_molmodule
+from cddlib.chem.toolkit import TOOLKIT
+
+
+class MolStore(object):
+    """Sequence of molecules stored as binary blobs."""
+
+    def __init__(self, mols: Iterable[BaseMol] = None, toolkit: str = TOOLKIT):
+        """
+        Parameters
+        ----------
+        mols
+            molecules to add, eg. an input stream
+        toolkit
+            openeye or rdkit, the toolkit of the molecules
+        """
+        self._toolkit = toolkit
+        self._mol_module = _import_molmodule(toolkit)
+        self._buf = bytearray()
+        self._offsets = array("Q", [0])
+        self._is_sdf = array("B")
+        if mols is not None:
+            self.extend(mols)
+
+    def add_mol(self, mol: BaseMol) -> None:
+        """ Append a copy of mol """
+        record = mol.sdf_record()
+        if record is not None:
+            self._append(record, True)
+        else:
+            self._append(self._mol_module.to_binary(mol), False)
+
+    def _append(self, data: bytes, is_sdf: bool):
+        self._buf += data
+        self._offsets.append(len(self._buf))
+        self._is_sdf.append(is_sdf)
+
+    def extend(self, mols: Iterable[BaseMol]) -> None:
+        for mol in mols:
+            self.add_mol(mol)
+
+    @property
+    def nbytes(self) -> int:
+        """ memory used by the blobs and the offsets """
+        return len(self._buf) + self._offsets.itemsize * len(self._offsets) + len(self._is_sdf)
+
+    def __len__(self) -> int:
+        return len(self._is_sdf)
+
+    def _mol(self, i: int) -> BaseMol:
+        with memoryview(self._buf) as buf:
+            data = bytes(buf[self._offsets[i]:self._offsets[i + 1]])
+        if self._is_sdf[i]:
+            from cddlib.chem.lazy_mol import LazyMol
+            return LazyMol(data, self._toolkit)
+        return self._mol_module.from_binary(data)
+
+    def __getitem__(self, i: Union[int, slice, Sequence]) -> Union[BaseMol, 'MolStore']:
+        """ store[i] returns a molecule, store[i:j], store[bool_mask] and
+            store[list_of_positions] return a new MolStore
+        """
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                return self._take(range(start, stop, step))
+            res = MolStore(toolkit=self._toolkit)
+            if start < stop:
+                first = self._offsets[start]
+                res._buf = self._buf[first:self._offsets[stop]]
+                res._offsets = array("Q", (off - first for off in self._offsets[start:stop + 1]))
+                res._is_sdf = self._is_sdf[start:stop]
+            return res
+
+        if isinstance(i, (int, np.integer)):
+            if i < 0:
+                i += len(self)
+            if not 0 <= i < len(self):
+                raise IndexError(f"MolStore index out of range: {i}")
+            return self._mol(i)
+
+        positions = np.asarray(i)
+        if positions.dtype == bool:
+            if len(positions) != len(self):
+                raise IndexError(f"boolean mask of length {len(positions)}"
+                                 f" for MolStore of length {len(self)}")
+            positions = np.flatnonzero(positions)
+        return self._take(positions)
+
+    def _take(self, positions: Iterable[int]) -> 'MolStore':
+        res = MolStore(toolkit=self._toolkit)
+        n = len(self)
+        with memoryview(self._buf) as buf:
+            for i in positions:
+                i = int(i)
+                if i < 0:
+                    i += n
+                if not 0 <= i < n:
+                    raise IndexError(f"MolStore index out of range: {i}")
+                res._append(buf[self._offsets[i]:self._offsets[i + 1]], self._is_sdf[i])
+        return res
+
+    def __iter__(self) -> Iterator[BaseMol]:
+        for i in range(len(self)):
+            yield self._mol(i)
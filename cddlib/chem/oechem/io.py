@@ -6,9 +6,17 @@ Created on Jul 1, 2018
 @author: albertgo
 """
 
+import io
+import os
+import sys
+from typing import Iterator
+
 from openeye import oechem
 
 from ..io import BaseMolInputStream
+from ..sdf import is_stdin_path, iter_record_chunks, open_input, sdfRE, \
+    truncate_after_last_record
+from cddlib.util import compress
 from cddlib.chem.oechem.mol import Mol
 
 
@@ -18,15 +26,37 @@ class MolInputStream(BaseMolInputStream):
        @TODO specify format?
     """
 
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, decompress_threads: int = None):
+        """
+        Parameters
+        ----------
+        file_path
+            file to read, if only an extension is given (eg. ".sdf") stdin is read
+        decompress_threads
+            number of threads used to decompress BGZF files in the zst and
+            lz4 code path, gz files are read by oemolistream
+        """
         BaseMolInputStream.__init__(self, file_path)
-        self.ifs = oechem.oemolistream(file_path)
         self.next_mol = None
+        if compress.compression_of(file_path) in ("zst", "lz4"):
+            # not supported by oemolistream, decompress in python and
+            # parse chunks of text
+            self.ifs = None
+            self._in = open_input(file_path, decompress_threads)
+            self._mols = _iter_chunk_mols(self._in, compress.strip_compression(file_path))
+        else:
+            self.ifs = oechem.oemolistream(file_path)
+            self._in = None
+            self._mols = None
 
     def has_next(self) -> bool:
         if self.next_mol is not None:
             return True
 
+        if self._mols is not None:
+            self.next_mol = next(self._mols, None)
+            return self.next_mol is not None
+
         mol = oechem.OEGraphMol()
         if oechem.OEReadMolecule(self.ifs, mol):
             self.next_mol = Mol(mol)
@@ -42,11 +72,89 @@ class MolInputStream(BaseMolInputStream):
         self.next_mol = None
         return res
 
+    def _mols_from_sdf_bytes(self, data):
+        return mols_from_sdf_bytes(data)
+
+    def _seek_bytes(self, offset):
+        if self.ifs is None:
+            raise ValueError(f"Only uncompressed sd files support seek: {self.file_path}")
+        self.next_mol = None
+        if not self.ifs.GetOEIStream().seek(offset):
+            raise ValueError(f"Could not seek to {offset} in {self.file_path}")
+
     def close(self):
         if self.ifs is not None:
             self.ifs.close()
         self.ifs = None
+        if self._in is not None:
+            self._in.close()
+        self._in = None
+        self._mols = None
+
+
+def _iter_chunk_mols(in_s, file_path: str):
+    """ Parse the molecules of the uncompressed stream in_s in chunks """
+    ifs = oechem.oemolistream()
+    if not ifs.SetFormat(oechem.OEGetFileType(oechem.OEGetFileExtension(file_path))):
+        raise ValueError("Unknown file format: " + file_path)
+    if sdfRE.search(file_path) is not None:
+        chunks = iter_record_chunks(in_s)
+    else:
+        # line based formats, eg. smiles
+        chunks = iter(lambda: b"".join(in_s.readlines(1 << 20)), b"")
+    for chunk in chunks:
+        ifs.openstring(bytes(chunk))
+        mol = oechem.OEGraphMol()
+        while oechem.OEReadMolecule(ifs, mol):
+            yield Mol(mol)
+            mol = oechem.OEGraphMol()
+        ifs.close()
+
+
+
+def mols_from_sdf_bytes(data: bytes):
+    """Parse the molecules contained in the text of an sd file.
+
+    Parameters
+    ----------
+    data
+        content of an sd file, eg. a chunk of complete records
+
+    Returns
+    -------
+    Iterator[Mol]
+        Mol for each record.
+    """
+    ifs = oechem.oemolistream()
+    ifs.SetFormat(oechem.OEFormat_SDF)
+    ifs.openstring(bytes(data))
+    mol = oechem.OEGraphMol()
+    while oechem.OEReadMolecule(ifs, mol):
+        yield Mol(mol)
+        mol = oechem.OEGraphMol()
+    ifs.close()
+
+
+class SDRecordParser(object):
+    """Parse single sd records, eg. memoryview slices of a memory mapped file.
+
+       Instances are not thread safe.
+    """
+    def __init__(self):
+        self._ifs = oechem.oemolistream()
+        self._ifs.SetFormat(oechem.OEFormat_SDF)
+
+    def parse(self, record) -> Mol:
+        """ return Mol for record or None if it can not be parsed """
+        self._ifs.openstring(bytes(record))
+        mol = oechem.OEGraphMol()
+        ok = oechem.OEReadMolecule(self._ifs, mol)
+        self._ifs.close()
+        return Mol(mol) if ok else None
 
+    def parse_records(self, records) -> Iterator[Mol]:
+        """ Parse a buffer of consecutive records with one oemolistream """
+        return mols_from_sdf_bytes(records)
 
 
 class MolOutputStream(object):
@@ -54,12 +162,92 @@ class MolOutputStream(object):
 
        @TODO specify format?
     """
-    def __init__(self, file_path):
+    def __init__(self, file_path, compress_level=None, compress_threads=None,
+                 append=False):
+        """
+        Parameters
+        ----------
+        file_path
+            file to write, if only an extension is given (eg. ".sdf") stdout is used
+        compress_level
+            compression level for gz, zst and lz4 files
+        compress_threads
+            number of threads compressing gz and zst files, default: number of cpus.
+            gz files are written by oemolostream unless compress_threads,
+            compress_level or append are given, they are then written in the
+            BGZF (block gzip) format, see cddlib.util.compress
+        append
+            continue an existing file, an incomplete record at its end is
+            removed first. Only for uncompressed and gz files, see
+            cddlib.chem.sdf.truncate_after_last_record
+        """
         self.file_path = file_path
-        self.ofs = oechem.oemolostream(file_path)
+        self._raw = None
+        compression = compress.compression_of(file_path)
+        native_gz = compression == "gz" and compress_level is None and \
+            compress_threads is None
+        if (compression is not None and not native_gz) or append:
+            # compress on multiple threads in python instead of in oemolostream
+            self.ofs = None
+            self._format = "." + compress.strip_compression(file_path).rsplit(".", 1)[-1]
+            tail = b""
+            if is_stdin_path(file_path):
+                out = io.open(sys.stdout.fileno(), "wb", closefd=False)
+            else:
+                if append and os.path.exists(file_path):
+                    tail = truncate_after_last_record(file_path)
+                out = io.open(file_path, "ab" if append else "wb")
+            self._raw = out
+            if compression is not None:
+                self._out = compress.open_output(out, compression, compress_level,
+                                                 compress_threads, close_fileobj=False)
+            else:
+                self._out = out
+            self._out.write(tail)
+            self._is_sdf = self._format.lower() == ".sdf"
+        else:
+            self.ofs = oechem.oemolostream(file_path)
+            self._out = None
+            self._is_sdf = self.ofs.GetFormat() == oechem.OEFormat_SDF
 
     def write_mol(self, mol):
-        oechem.OEWriteMolecule(self.ofs, mol._mol)
+        record = mol.sdf_record() if self._is_sdf else None
+        if record is not None:
+            # unchanged record, copy the original text
+            self.write_sdf_record(record)
+        elif self.ofs is not None:
+            oechem.OEWriteMolecule(self.ofs, mol._mol)
+        else:
+            self._out.write(oechem.OEWriteMolToBytes(self._format, mol._mol))
+
+    def write_sdf_record(self, record: bytes):
+        """ Write the text of an sd record verbatim to an sd file """
+        if not self._is_sdf:
+            raise ValueError(f"Not an sd file: {self.file_path}")
+        if self.ofs is not None:
+            self.ofs.GetOEOStream().write(record)
+        else:
+            self._out.write(record)
+
+    def sync(self):
+        """ Write all molecules to the file, ending the current compressed block.
+
+            Returns the file position following the last record (compressed
+            bytes for gz files) or None for stdout. The file can be
+            truncated at this position and continued with append=True.
+        """
+        if self.ofs is not None:
+            if compress.compression_of(self.file_path) is not None:
+                raise ValueError("sync() of gz files requires the BGZF writer, eg."
+                                 f" compress_threads=1: {self.file_path}")
+            self.ofs.flush()
+            return None if is_stdin_path(self.file_path) else os.path.getsize(self.file_path)
+        if self._out is not self._raw:
+            if not hasattr(self._out, "sync"):
+                raise ValueError(f"sync() is only supported for gz compression: {self.file_path}")
+            self._out.sync()
+        self._raw.flush()
+        return None if is_stdin_path(self.file_path) else self._raw.tell()
 
     def __enter__(self):
         return self
@@ -68,6 +256,11 @@ class MolOutputStream(object):
         self.close()
 
     def close(self):
-        self.ofs.close()
+        if self.ofs is not None:
+            self.ofs.close()
+        if self._out is not None:
+            self._out.close()
+        if self._raw is not None:
+            self._raw.close()
     
 
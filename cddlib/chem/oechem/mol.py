@@ -10,7 +10,7 @@ import numpy as np
 
 from openeye import oechem
 from .atom import Atom
-from ..mol import BaseMol
+from ..mol import BaseMol, check_positions, coordinates_as
 
 
 class Mol(BaseMol):
@@ -35,11 +35,7 @@ class Mol(BaseMol):
         -------
         numpy [nAtoms,3]
         """
-        ret = np.empty([self._mol.NumAtoms(), 3])
-        coords_dict = self._mol.GetCoords()
-        for i, at in enumerate(self._mol.GetAtoms()):
-            ret[i] = coords_dict[at.GetIdx()]
-        return ret
+        return self.get_coordinates()
 
     @coordinates.setter
     def coordinates(self, positions):
@@ -48,10 +44,45 @@ class Mol(BaseMol):
         --------
         positions; numpy [natoms,3] 
         """
-        oe_coords = np.empty((self._mol.GetMaxAtomIdx(), 3))
-        for i, at in enumerate(self._mol.GetAtoms()):
-            oe_coords[at.GetIdx()] = positions[i] 
-        self._mol.SetCoords(oe_coords.reshape(-1))
+        self.set_coordinates(positions)
+
+    def get_coordinates(self, dtype=np.float64, out=None) -> np.ndarray:
+        return coordinates_as(_get_coords(self._mol), dtype, out)
+
+    def set_coordinates(self, positions) -> None:
+        mol = self._mol
+        positions = check_positions(positions, mol.NumAtoms())
+        mol.SetCoords(_oe_coords(mol, positions))
+
+    @property
+    def num_conformers(self) -> int:
+        if isinstance(self._mol, oechem.OEMCMolBase):
+            return self._mol.NumConfs()
+        return 1
+
+    def get_conformer_coordinates(self, dtype=np.float64, out=None) -> np.ndarray:
+        if not isinstance(self._mol, oechem.OEMCMolBase):
+            return BaseMol.get_conformer_coordinates(self, dtype, out)
+
+        shape = (self._mol.NumConfs(), self._mol.NumAtoms(), 3)
+        if out is None:
+            out = np.empty(shape, dtype=dtype)
+        elif out.shape != shape:
+            raise ValueError(f"out has shape {out.shape}, expected {shape}")
+        for i, conf in enumerate(self._mol.GetConfs()):
+            out[i] = _get_coords(conf)
+        return out
+
+    def set_conformer_coordinates(self, positions) -> None:
+        if not isinstance(self._mol, oechem.OEMCMolBase):
+            BaseMol.set_conformer_coordinates(self, positions)
+            return
+
+        mol = self._mol
+        positions = check_positions(positions, mol.NumAtoms(), -1)
+        mol.DeleteConfs()
+        for xyz in positions:
+            mol.NewConf(_oe_coords(mol, xyz))
 
     @property
     def atom_types(self):
@@ -125,6 +156,78 @@ def from_smiles(smi:str) -> Mol:
     mol = oechem.OEGraphMol()
 
     oechem.OESmilesToMol(mol, smi)
-    return Mol(mol) 
+    return Mol(mol)
+
+
+def _atom_indices(mol) -> np.ndarray:
+    """ atom indices in GetAtoms() order or None if they are 0..nAtoms-1 """
+    if mol.GetMaxAtomIdx() == mol.NumAtoms():
+        # no deleted atoms, atoms are iterated in index order
+        return None
+    return np.fromiter((at.GetIdx() for at in mol.GetAtoms()), dtype=np.int64,
+                       count=mol.NumAtoms())
+
+
+def _oe_coords(mol, positions:np.ndarray) -> np.ndarray:
+    """ flat coordinate array indexed by atom index for SetCoords() and NewConf() """
+    idx = _atom_indices(mol)
+    if idx is not None:
+        oe_coords = np.zeros((mol.GetMaxAtomIdx(), 3))
+        oe_coords[idx] = positions
+        positions = oe_coords
+    return positions.reshape(-1)
+
+
+def _get_coords(mol_or_conf) -> np.ndarray:
+    """ [nAtoms,3] coordinates of a molecule or conformer with one toolkit call """
+    n_idx = mol_or_conf.GetMaxAtomIdx()
+    oe_coords = oechem.OEDoubleArray(3 * n_idx)
+    mol_or_conf.GetCoords(oe_coords)
+    try:
+        coords = np.frombuffer(oe_coords, dtype=np.float64).reshape(n_idx, 3).copy()
+    except (TypeError, ValueError):
+        coords = np.fromiter(oe_coords, dtype=np.float64, count=3 * n_idx).reshape(n_idx, 3)
+    idx = _atom_indices(mol_or_conf)
+    return coords if idx is None else coords[idx]
+
+
+def merge_conformers(mols) -> Mol:
+    """ Combine molecules with identical connection tables into one
+        multi-conformer OEMol, the title and sd tags are taken from mols[0].
+    """
+    res = oechem.OEMol(mols[0]._mol)
+    for data_pair in oechem.OEGetSDDataPairs(mols[0]._mol):
+        oechem.OESetSDData(res, data_pair.GetTag(), data_pair.GetValue())
+    for mol in mols[1:]:
+        res.NewConf(mol._mol)
+    return Mol(res)
+
+
+def to_molblock(mol:Mol) -> str:
+    """ Return the mdl molfile text of mol """
+    return oechem.OEWriteMolToBytes(".mol", mol._mol).decode("utf-8")
+
+
+def to_binary(mol:Mol) -> bytes:
+    """ Serialize mol including its title and sd tags into the oeb format """
+    return oechem.OEWriteMolToBytes(".oeb", mol._mol)
+
+
+def from_binary(data:bytes) -> Mol:
+    """ Create a molecule object from the output of to_binary(),
+        multi-conformer molecules are returned as OEMol, others as OEGraphMol
+    """
+    mol = oechem.OEMol()
+    if not oechem.OEReadMolFromBytes(mol, ".oeb", bytes(data)):
+        raise ValueError("Invalid oeb molecule data")
+    if mol.NumConfs() > 1:
+        return Mol(mol)
+
+    res = oechem.OEGraphMol(mol)
+    res.SetTitle(mol.GetTitle())
+    if not oechem.OEHasSDData(res):
+        for data_pair in oechem.OEGetSDDataPairs(mol):
+            oechem.OEAddSDData(res, data_pair.GetTag(), data_pair.GetValue())
+    return Mol(res)
 
         
@@ -0,0 +1,117 @@
+'''Molecule input stream parsing sd files on multiple processes.'''
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from cddlib.chem.io import BaseMolInputStream, _import_iomodule
+from cddlib.chem.mol import BaseMol, _import_molmodule
+from cddlib.chem.sdf import sdfRE, open_input, iter_record_chunks
+from cddlib.chem.toolkit import TOOLKIT
+
+
+class ParallelMolInputStream(BaseMolInputStream):
+    """Read an sd file by splitting it into chunks of records which are
+       parsed in a process pool. Molecules are returned in file order.
+
+       Unlike the default reader a ValueError with the record number is
+       raised for records that can not be parsed.
+    """
+
+    def __init__(self, file_path: str, workers: int,
+                 chunk_bytes: int = 1 << 20, toolkit: str = TOOLKIT, **kwargs):
+        """
+        Parameters
+        ----------
+        file_path
+            sd file to read, may be gzipped, ".sdf" or ".sdf.gz" reads stdin
+        workers
+            number of parsing processes
+        chunk_bytes
+            approximate number of bytes of sd text sent to a worker at once
+        toolkit
+            openeye or rdkit
+        kwargs
+            passed on to the toolkit parser
+        """
+        BaseMolInputStream.__init__(self, file_path)
+        if sdfRE.search(file_path) is None:
+            raise ValueError("Unknown file format: " + file_path)
+
+        self._toolkit = toolkit
+        self._kwargs = kwargs
+        self._mol_module = _import_molmodule(toolkit)
+        self._in = open_input(file_path)
+        self._chunk_bytes = chunk_bytes
+        self._chunks = iter_record_chunks(self._in, chunk_bytes)
+        self._pool = ProcessPoolExecutor(workers)
+        self._max_pending = 2 * workers
+        self._pending = deque()     # futures in file order
+        self._mols = deque()        # serialized molecules of current chunk
+        self._count = 0
+        self._submit_chunks()
+
+    def _submit_chunks(self):
+        while self._chunks is not None and len(self._pending) < self._max_pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._chunks = None
+                break
+            self._pending.append(
+                self._pool.submit(_parse_chunk, self._toolkit, chunk, self._kwargs))
+
+    def has_next(self) -> bool:
+        while not self._mols:
+            if not self._pending:
+                return False
+            self._mols.extend(self._pending.popleft().result())
+            self._submit_chunks()
+        return True
+
+    def __next__(self) -> BaseMol:
+        if not self.has_next():
+            raise StopIteration()
+
+        data = self._mols.popleft()
+        self._count += 1
+        if data is None:
+            raise ValueError(f"Could not parse record {self._count} of {self.file_path}")
+        return self._mol_module.from_binary(data)
+
+    def _mols_from_sdf_bytes(self, data: bytes):
+        return _import_iomodule(self._toolkit).mols_from_sdf_bytes(data, **self._kwargs)
+
+    def seek(self, i: int) -> None:
+        BaseMolInputStream.seek(self, i)
+        self._count = i if i >= 0 else i + len(self.index)
+
+    def _seek_bytes(self, offset: int) -> None:
+        self._discard_pending()
+        self._in.seek(offset)
+        self._chunks = iter_record_chunks(self._in, self._chunk_bytes)
+        self._submit_chunks()
+
+    def _discard_pending(self):
+        for fut in self._pending:
+            fut.cancel()
+        self._pending.clear()
+        self._mols.clear()
+        self._chunks = None
+
+    def close(self):
+        if self._pool is None:
+            return
+        self._discard_pending()
+        self._pool.shutdown(wait=True)
+        self._pool = None
+        self._in.close()
+
+
+def _parse_chunk(toolkit: str, data: bytes, kwargs: dict) -> List[Optional[bytes]]:
+    """ Executed in the worker processes: parse data and return the
+        molecules in the toolkit binary format.
+    """
+    io_module = _import_iomodule(toolkit)
+    mol_module = _import_molmodule(toolkit)
+    return [None if mol is None else mol_module.to_binary(mol)
+            for mol in io_module.mols_from_sdf_bytes(data, **kwargs)]
@@ -0,0 +1,163 @@
+'''Apply a function to all molecules of a stream in a pool of processes.
+
+    def add_mw(mol):
+        mol["MW"] = compute_mw(mol)
+        return mol
+
+    with get_mol_input_stream("in.sdf.gz") as inf, \\
+         get_mol_output_stream("out.sdf.gz") as out:
+        parallel_map(add_mw, inf, out, workers=8)
+
+fn must be picklable, ie. a module level function, and may return None, a
+molecule or an iterable of molecules. Molecules are sent to the workers in
+chunks, unchanged sd records as text so that parsing happens in the
+workers, and the results are written in input order.
+'''
+
+import os
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, List, Tuple, Union
+
+from cddlib.chem.io import _import_iomodule
+from cddlib.chem.mol import BaseMol, _import_molmodule
+from cddlib.chem.toolkit import TOOLKIT
+
+MapFunction = Callable[[BaseMol], Union[None, BaseMol, Iterable[BaseMol]]]
+
+
+class WorkerError(RuntimeError):
+    """Raised by parallel_map() if fn failed on a molecule."""
+
+    def __init__(self, record_index: int, message: str):
+        RuntimeError.__init__(self, f"failed on record {record_index}:\n{message}")
+        self.record_index = record_index
+        self.message = message
+
+    def __reduce__(self):
+        return (WorkerError, (self.record_index, self.message))
+
+
+def parallel_map(fn: MapFunction, in_stream: Iterable[BaseMol], out_stream,
+                 workers: int = None, chunk: int = 100,
+                 toolkit: str = TOOLKIT) -> int:
+    """Apply fn to the molecules of in_stream and write the results to out_stream.
+
+    Parameters
+    ----------
+    fn
+        picklable function returning None, a molecule or an iterable of molecules
+    in_stream
+        molecule input stream or iterable of molecules
+    out_stream
+        molecule output stream, results are written in input order
+    workers
+        number of worker processes, default: number of cpus,
+        1 runs fn in the calling process
+    chunk
+        number of molecules sent to a worker at once, at most 2*workers
+        chunks are in flight
+    toolkit
+        openeye or rdkit
+
+    Returns
+    -------
+    int
+        number of molecules written
+
+    Raises
+    ------
+    WorkerError
+        if fn raised an exception, record_index is the 0 based index of the
+        input molecule
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    n_written = 0
+    if workers <= 1:
+        for i, mol in enumerate(in_stream):
+            try:
+                res = _as_list(fn(mol))
+            except Exception:
+                raise WorkerError(i, traceback.format_exc())
+            for out_mol in res:
+                out_stream.write_mol(out_mol)
+                n_written += 1
+        return n_written
+
+    mol_module = _import_molmodule(toolkit)
+    pending = deque()
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(fn, toolkit)) as pool:
+        try:
+            first = 0
+            items = []
+            for mol in in_stream:
+                items.append(_serialize(mol_module, mol))
+                if len(items) == chunk:
+                    pending.append(pool.submit(_map_chunk, first, items))
+                    first += len(items)
+                    items = []
+                    while len(pending) >= 2 * workers:
+                        n_written += _write_results(mol_module, pending.popleft(), out_stream)
+            if items:
+                pending.append(pool.submit(_map_chunk, first, items))
+            while pending:
+                n_written += _write_results(mol_module, pending.popleft(), out_stream)
+        finally:
+            for fut in pending:
+                fut.cancel()
+    return n_written
+
+
+def _as_list(res) -> list:
+    if res is None:
+        return []
+    if isinstance(res, BaseMol):
+        return [res]
+    return list(res)
+
+
+def _serialize(mol_module, mol: BaseMol) -> Tuple[bool, bytes]:
+    """ (True, sd record text) for unchanged records, else (False, toolkit binary) """
+    record = mol.sdf_record()
+    if record is not None:
+        return True, record
+    return False, mol_module.to_binary(mol)
+
+
+def _write_results(mol_module, future, out_stream) -> int:
+    results = future.result()
+    for data in results:
+        out_stream.write_mol(mol_module.from_binary(data))
+    return len(results)
+
+
+_worker = {}
+
+
+def _init_worker(fn: MapFunction, toolkit: str):
+    _worker["fn"] = fn
+    _worker["mol_module"] = _import_molmodule(toolkit)
+    _worker["parser"] = _import_iomodule(toolkit).SDRecordParser()
+
+
+def _map_chunk(first: int, items: List[Tuple[bool, bytes]]) -> List[bytes]:
+    """ Executed in the worker processes: apply fn to the molecules of items """
+    fn = _worker["fn"]
+    mol_module = _worker["mol_module"]
+    res = []
+    for i, (is_sdf, data) in enumerate(items, first):
+        try:
+            if is_sdf:
+                mol = _worker["parser"].parse(data)
+                if mol is None:
+                    raise ValueError("Could not parse sd record")
+            else:
+                mol = mol_module.from_binary(data)
+            res.extend(mol_module.to_binary(out_mol) for out_mol in _as_list(fn(mol)))
+        except Exception:
+            raise WorkerError(i, traceback.format_exc())
+    return res
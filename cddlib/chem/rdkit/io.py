@@ -7,27 +7,44 @@ Created on Jul 1, 2018
 @author: albertgo
 """
 import io
-import gzip
 import sys
 import re
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
 
 from rdkit import Chem
 from cddlib.chem.rdkit.mol import Mol
+from ..io import BaseMolInputStream
+from cddlib.chem import sdf
+from cddlib.util import bgzf, compress
 
 
-class MolInputStream:
+class MolInputStream(BaseMolInputStream):
     """Provide an iterator for reading molecules using RDKit
 
        @TODO specify format?
     """
-    sdfRE = re.compile(".sdf(.gz)?$", re.I)
-    smiRE = re.compile(".smi(.gz)?$", re.I)
-
-    def __init__(self, file_path, **kwargs):
-
-        self.file_path = file_path
+    sdfRE = re.compile(".sdf(.gz|.zst|.lz4)?$", re.I)
+    smiRE = re.compile(".smi(.gz|.zst|.lz4)?$", re.I)
+
+    def __init__(self, file_path, decompress_threads=None, **kwargs):
+        """
+        Parameters
+        ----------
+        file_path
+            file to read, if only an extension is given (eg. ".sdf") stdin is read
+        decompress_threads
+            number of threads used to decompress BGZF (block gzip) files,
+            gz, zst and lz4 files are decompressed, see cddlib.util.compress
+        kwargs
+            passed on to the rdkit ForwardSDMolSupplier or the SmilesSupplier
+        """
+
+        BaseMolInputStream.__init__(self, file_path)
         self.next_mol = None
+        self._supplier_args = kwargs
 
         if MolInputStream.sdfRE.match(file_path) is not None or \
            MolInputStream.smiRE.match(file_path) is not None:
@@ -37,29 +54,22 @@ class MolInputStream:
             in_s = io.open(self.file_path, "rb")
             self._in1 = in_s
 
-        if self.file_path.endswith("gz"):
-            in_s = gzip.open(in_s, mode="rb")
+        compression = compress.compression_of(self.file_path)
+        if compression is not None:
+            in_s = compress.open_input(in_s, compression, decompress_threads,
+                                       close_fileobj=False)
             self._in2 = in_s
         else:
             self._in2 = None
 
         if MolInputStream.sdfRE.search(self.file_path) is not None:
-            if kwargs is None: kwargs = { }
-            if "removeHs" not in kwargs:
-                kwargs['removeHs'] = False
-            if "sanitize" not in kwargs:
-                kwargs['sanitize'] = False   # this is more oelike
+            self._in3 = Chem.ForwardSDMolSupplier(in_s, **_sd_supplier_args(kwargs))
             
-            self._in3 = Chem.ForwardSDMolSupplier(in_s, **kwargs)
-            
-        #elif MolInputStream.smiRE.search(self.file_path) is not None:
-        #   self._in3 = Chem.SmilesMolSupplier(self._in2)
+        elif MolInputStream.smiRE.search(self.file_path) is not None:
+            self._in3 = SmilesSupplier(in_s, file_path, **kwargs)
         else:
             raise Exception("Unknown file format: " + self.file_path)
 
-    def __enter__(self):
-        return self
-
     def has_next(self):
         if self.next_mol is not None:
             return True
@@ -70,9 +80,6 @@ class MolInputStream:
         except StopIteration:
             return False
 
-    def __iter__(self):
-        return self
-
     def __next__(self):
         if self.next_mol is not None:
             res = self.next_mol
@@ -81,53 +88,298 @@ class MolInputStream:
 
         return Mol(self._in3.__next__())
 
-    def __exit__(self, *args):
-        self.close()
+    @property
+    def bytes_read(self):
+        return None if self._in1 is None or self._in1.closed else self._in1.tell()
+
+    def _mols_from_sdf_bytes(self, data):
+        return mols_from_sdf_bytes(data, **self._supplier_args)
+
+    def _seek_bytes(self, offset):
+        if self._in2 is not None or self._in1 is None or \
+           isinstance(self._in3, SmilesSupplier):
+            raise ValueError(f"Only uncompressed sd files support seek: {self.file_path}")
+        self.next_mol = None
+        self._in1.seek(offset)
+        self._in3 = Chem.ForwardSDMolSupplier(self._in1, **_sd_supplier_args(self._supplier_args))
 
     def close(self):
-        #self._in3.close()
+        if isinstance(self._in3, SmilesSupplier):
+            self._in3.close()
         if self._in2 is not None:
             self._in2.close()
         if self._in1 is not None: 
             self._in1.close()
 
 
+def _sd_supplier_args(kwargs: dict) -> dict:
+    """ Default arguments for the rdkit SDMolSuppliers """
+    if kwargs is None: kwargs = { }
+    if "removeHs" not in kwargs:
+        kwargs['removeHs'] = False
+    if "sanitize" not in kwargs:
+        kwargs['sanitize'] = False   # this is more oelike
+    return kwargs
+
+
+def mols_from_sdf_bytes(data: bytes, **kwargs):
+    """Parse the molecules contained in the text of an sd file.
+
+    Parameters
+    ----------
+    data
+        content of an sd file, eg. a chunk of complete records
+    kwargs
+        passed on to the rdkit ForwardSDMolSupplier
+
+    Returns
+    -------
+    Iterator[Mol]
+        Mol for each record, None for records that could not be parsed.
+    """
+    for mol in Chem.ForwardSDMolSupplier(io.BytesIO(data), **_sd_supplier_args(kwargs)):
+        yield None if mol is None else Mol(mol)
+
+
+class SDRecordParser(object):
+    """Parse single sd records, eg. memoryview slices of a memory mapped file.
+
+       Instances are not thread safe.
+    """
+    def __init__(self, **kwargs):
+        self._args = _sd_supplier_args(kwargs)
+        self._supplier = Chem.SDMolSupplier()
+
+    def parse(self, record) -> Mol:
+        """ return Mol for record or None if it can not be parsed """
+        self._supplier.SetData(str(record, "utf-8", "replace"), **self._args)
+        mol = next(iter(self._supplier), None)
+        return None if mol is None else Mol(mol)
+
+    def parse_records(self, records) -> Iterator[Optional[Mol]]:
+        """ Parse a buffer of consecutive records with one supplier,
+            yields None for records that can not be parsed
+        """
+        supplier = Chem.SDMolSupplier()
+        supplier.SetData(str(records, "utf-8", "replace"), **self._args)
+        for mol in supplier:
+            yield None if mol is None else Mol(mol)
+
+
+class SmilesSupplier(object):
+    """Parse smiles files on a pool of threads, the rdkit smiles parser
+       releases the GIL.
+
+       Each line holds a smiles, optionally followed by the title and further
+       columns which are stored as tags. Molecules are returned in file order.
+    """
+
+    def __init__(self, in_s, file_path: str = None, parse_threads: int = None,
+                 title_line: bool = None, delimiter: str = None,
+                 chunk_bytes: int = 1 << 18, sanitize: bool = True,
+                 removeHs: bool = False):
+        """
+        Parameters
+        ----------
+        in_s
+            binary input stream, not closed by this supplier
+        file_path
+            used in error messages
+        parse_threads
+            number of parser threads, default: number of cpus
+        title_line
+            if True the first line contains the column names, otherwise
+            columns after the title are named col2, col3, ...
+            By default a first line starting with "SMILES" (as written by
+            the rdkit SmilesWriter) is read as column names.
+        delimiter
+            column delimiter, default: any whitespace
+        chunk_bytes
+            approximate size of the blocks of lines passed to the threads
+        sanitize, removeHs
+            passed on to the rdkit smiles parser
+        """
+        self._in = in_s
+        self._file_path = file_path
+        self._delimiter = delimiter
+        self._chunk_bytes = chunk_bytes
+        self._params = Chem.SmilesParserParams()
+        self._params.sanitize = sanitize
+        self._params.removeHs = removeHs
+        self._columns = None
+        self._line_no = 0
+        self._pending = []
+        if title_line is None or title_line:
+            header = in_s.readline()
+            cols = header.decode("utf-8", "replace").split(delimiter)
+            if title_line or (cols and cols[0].strip().upper() == "SMILES"):
+                self._line_no = 1
+                self._columns = cols
+            elif header:
+                self._pending.append(header)
+
+        self._threads = parse_threads or bgzf.default_threads()
+        self._executor = ThreadPoolExecutor(self._threads)
+        self._futures = deque()
+        self._mols = iter(())
+        self._eof = False
+
+    def _submit(self) -> None:
+        while not self._eof and len(self._futures) < 2 * self._threads:
+            lines = self._pending + self._in.readlines(self._chunk_bytes)
+            self._pending = []
+            if not lines:
+                self._eof = True
+                break
+            self._futures.append(self._executor.submit(
+                self._parse_lines, lines, self._line_no + 1))
+            self._line_no += len(lines)
+
+    def _parse_lines(self, lines, first_line_no: int) -> list:
+        mols = []
+        for line_no, line in enumerate(lines, first_line_no):
+            cols = line.decode("utf-8", "replace").split(self._delimiter)
+            if not cols or cols[0].strip() == "":
+                continue
+            mol = Chem.MolFromSmiles(cols[0].strip(), self._params)
+            if mol is None:
+                raise ValueError(f"{self._file_path}:{line_no}: invalid smiles: {cols[0]}")
+            if len(cols) > 1:
+                mol.SetProp("_Name", cols[1].strip())
+            for i in range(2, len(cols)):
+                name = self._columns[i].strip() if self._columns is not None \
+                    and i < len(self._columns) else f"col{i}"
+                mol.SetProp(name, cols[i].strip())
+            mols.append(mol)
+        return mols
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            mol = next(self._mols, None)
+            if mol is not None:
+                return mol
+            self._submit()
+            if not self._futures:
+                raise StopIteration()
+            self._mols = iter(self._futures.popleft().result())
+
+    def close(self):
+        for fut in self._futures:
+            fut.cancel()
+        self._futures.clear()
+        self._executor.shutdown()
+
+
 class MolOutputStream(object):
     """
         Stream for writing molecules using the rdkit toolkit.
     """
-    def __init__(self, file_path):
+    def __init__(self, file_path, compress_level=None, compress_threads=None,
+                 append=False):
+        """
+        Parameters
+        ----------
+        file_path
+            file to write, if only an extension is given (eg. ".sdf") stdout is used
+        compress_level
+            compression level for gz, zst and lz4 files
+        compress_threads
+            number of threads compressing gz and zst files, default: number of cpus
+            gz files are written in the BGZF (block gzip) format, see cddlib.util.compress
+        append
+            continue an existing file, an incomplete record at its end is
+            removed first. Only for uncompressed and gz files, see
+            cddlib.chem.sdf.truncate_after_last_record
+        """
         self.file_path = file_path
-
-        if self.file_path.endswith("gz"):
-            if self.file_path.startswith(".sdf") or self.file_path.startswith(".smi"):
+        to_stdout = self.file_path.startswith(".sdf") or self.file_path.startswith(".smi")
+        tail = b""
+        continued = False
+        if append and not to_stdout and os.path.exists(self.file_path):
+            tail = sdf.truncate_after_last_record(self.file_path)
+            continued = os.path.getsize(self.file_path) > 0 or len(tail) > 0
+
+        compression = compress.compression_of(self.file_path)
+        self._compressed = None
+        if compression is not None:
+            if to_stdout:
                 out = os.fdopen(sys.stdout.fileno(), "wb", closefd=False)
                 self._out1 = None
             else:
-                out = io.open(self.file_path, "wb")
+                out = io.open(self.file_path, "ab" if append else "wb")
                 self._out1 = out
 
-            out = gzip.open(out, mode = 'wt')
+            self._compressed = compress.open_output(out, compression, compress_level,
+                                                    compress_threads, close_fileobj=False)
+            self._compressed.write(tail)
+            out = io.TextIOWrapper(self._compressed)
             self._out2 = out
         else:
-            if self.file_path.startswith(".sdf") or self.file_path.startswith(".smi"):
+            if to_stdout:
                 out = sys.stdout
                 self._out1 = None
             else:
-                out = io.open(self.file_path, 'wt')
+                out = io.open(self.file_path, 'at' if append else 'wt')
                 self._out1 = out
 
             self._out2 = None
             
-        if MolInputStream.sdfRE.search(self.file_path) is not None:
+        self._text_out = out
+        self._is_sdf = MolInputStream.sdfRE.search(self.file_path) is not None
+        if self._is_sdf:
             self._out3 = Chem.SDWriter(out)
         elif MolInputStream.smiRE.search(self.file_path) is not None:
-            self._out3 = Chem.SmilesWriter(out)
+            self._out3 = Chem.SmilesWriter(out, includeHeader=not continued)
         else:
             raise Exception("Unknown file format: " + self.file_path)
 
     def write_mol(self, mol):
-        self._out3.write(mol._mol)
+        record = mol.sdf_record() if self._is_sdf else None
+        if record is not None:
+            # unchanged record, copy the original text
+            self.write_sdf_record(record)
+        else:
+            self._out3.write(mol._mol)
+
+    @property
+    def bytes_written(self):
+        """ bytes written to the file (compressed bytes for compressed files),
+            None for stdout
+        """
+        if self._out1 is None:
+            return None
+        if self._out1.closed:
+            return self._bytes_written
+        return self._out1.tell()
+
+    def write_sdf_record(self, record: bytes):
+        """ Write the text of an sd record verbatim to an sd file """
+        if not self._is_sdf:
+            raise ValueError(f"Not an sd file: {self.file_path}")
+        self._out3.flush()
+        self._text_out.flush()
+        self._text_out.buffer.write(record)
+
+    def sync(self):
+        """ Write all molecules to the file, ending the current compressed block.
+
+            Returns the file position following the last record (compressed
+            bytes for gz files) or None for stdout. The file can be
+            truncated at this position and continued with append=True.
+        """
+        self._out3.flush()
+        self._text_out.flush()
+        if self._compressed is not None:
+            if not hasattr(self._compressed, "sync"):
+                raise ValueError(f"sync() is only supported for gz compression: {self.file_path}")
+            self._compressed.sync()
+        if self._out1 is None:
+            return None
+        self._out1.flush()
+        return self._out1.tell()
 
     def __enter__(self):
         return self
@@ -139,7 +391,8 @@ class MolOutputStream(object):
         self._out3.close()
         if self._out2 is not None:
             self._out2.close()
-        if self._out1 is not None:
+        if self._out1 is not None and not self._out1.closed:
+            self._bytes_written = self._out1.tell()
             self._out1.close()
 
 
@@ -11,7 +11,7 @@ from rdkit import Chem
 from rdkit.Geometry.rdGeometry import Point3D
 
 from .atom import Atom
-from ..mol import BaseMol
+from ..mol import BaseMol, check_positions, coordinates_as
 
 
 class Mol(BaseMol):
@@ -45,10 +45,38 @@ class Mol(BaseMol):
         --------
         positions; numpy [natoms,3]
         """
-        conf = self._mol.GetConformer()
-        for i, p in enumerate(positions.astype(np.float64)):
-            p3d = Point3D(p[0], p[1], p[2])
-            conf.SetAtomPosition(i, p3d)
+        self.set_coordinates(positions)
+
+    def get_coordinates(self, dtype=np.float64, out=None) -> np.ndarray:
+        return coordinates_as(self._mol.GetConformer().GetPositions(), dtype, out)
+
+    def set_coordinates(self, positions) -> None:
+        _set_positions(self._mol.GetConformer(), check_positions(positions, self.num_atoms))
+
+    @property
+    def num_conformers(self) -> int:
+        return self._mol.GetNumConformers()
+
+    def get_conformer_coordinates(self, dtype=np.float64, out=None) -> np.ndarray:
+        shape = (self._mol.GetNumConformers(), self._mol.GetNumAtoms(), 3)
+        if out is None:
+            out = np.empty(shape, dtype=dtype)
+        elif out.shape != shape:
+            raise ValueError(f"out has shape {out.shape}, expected {shape}")
+        for i, conf in enumerate(self._mol.GetConformers()):
+            out[i] = conf.GetPositions()
+        return out
+
+    def set_conformer_coordinates(self, positions) -> None:
+        n_atoms = self._mol.GetNumAtoms()
+        positions = check_positions(positions, n_atoms, -1)
+        is_3d = self._mol.GetNumConformers() == 0 or self._mol.GetConformer().Is3D()
+        self._mol.RemoveAllConformers()
+        for xyz in positions:
+            conf = Chem.Conformer(n_atoms)
+            _set_positions(conf, xyz)
+            conf.Set3D(is_3d)
+            self._mol.AddConformer(conf, assignId=True)
 
     @property
     def atom_types(self):
@@ -108,3 +136,38 @@ def from_smiles(smi:str) -> Mol:
     return Mol( Chem.MolFromSmiles(smi) )
 
 
+def _set_positions(conf, positions:np.ndarray):
+    """ positions: C contiguous float64 [nAtoms,3] """
+    if hasattr(conf, "SetPositions"):
+        conf.SetPositions(positions)
+        return
+    # older rdkit versions
+    for i, p in enumerate(positions):
+        conf.SetAtomPosition(i, Point3D(p[0], p[1], p[2]))
+
+
+def merge_conformers(mols) -> Mol:
+    """ Combine molecules with identical connection tables into one
+        multi-conformer molecule, the title and sd tags are taken from mols[0].
+    """
+    res = Chem.Mol(mols[0]._mol)
+    for mol in mols[1:]:
+        res.AddConformer(Chem.Conformer(mol._mol.GetConformer()), assignId=True)
+    return Mol(res)
+
+
+def to_molblock(mol:Mol) -> str:
+    """ Return the mdl molfile text of mol """
+    return Chem.MolToMolBlock(mol._mol)
+
+
+def to_binary(mol:Mol) -> bytes:
+    """ Serialize mol including its title and sd tags into the rdkit binary format """
+    return mol._mol.ToBinary(Chem.PropertyPickleOptions.AllProps)
+
+
+def from_binary(data:bytes) -> Mol:
+    """ Create a molecule object from the output of to_binary() """
+    return Mol( Chem.Mol(bytes(data)) )
+
+
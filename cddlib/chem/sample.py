@@ -0,0 +1,217 @@
+'''Random samples of molecule files.
+
+Two kinds of samples are supported:
+
+    size       reservoir sample of exactly size molecules (or all molecules
+               if the file is smaller)
+    fraction   Bernoulli sample, each molecule is selected independently
+               with probability fraction
+
+Samples are returned in file order and are reproducible for a given seed.
+Depending on the input the sample is taken by:
+
+    random access   files with a record index (uncompressed sd files with
+                    an up to date .cddidx sidecar or index=True) and .cddb
+                    files, only the selected records are read
+    record scan     other sd files, the records are located in the text
+                    without parsing, only the selected records are
+                    returned as LazyMol objects
+    molecule scan   other formats, all molecules are parsed
+
+    with get_mol_input_stream("lib.sdf.gz", sample=10000, seed=42) as inf:
+        for mol in inf:
+            ...
+'''
+
+import itertools
+import math
+import random
+from typing import Iterable, Iterator, List, Tuple, TypeVar
+
+from cddlib.chem.io import BaseMolInputStream
+from cddlib.chem.mol import BaseMol
+from cddlib.chem.sdf import is_stdin_path, iter_records, open_input, sdfRE
+from cddlib.chem.sdf_index import INDEX_SUFFIX, SDFIndex
+from cddlib.chem.toolkit import TOOLKIT
+from cddlib.util.compress import compression_of
+
+T = TypeVar("T")
+
+
+def reservoir_sample(items: Iterable[T], size: int, rng: random.Random) -> List[Tuple[int, T]]:
+    """Select size items with equal probability in one pass.
+
+       Uses Algorithm L (Li 1994) which draws random numbers only for the
+       items entering the reservoir and skips over all others.
+
+    Returns
+    -------
+    List[Tuple[int, T]]
+        (position, item) of the selected items in input order
+    """
+    it = enumerate(items)
+    reservoir = list(itertools.islice(it, size))
+    if len(reservoir) < size or size == 0:
+        return reservoir
+
+    # 1 - random() is in (0, 1]
+    w = math.exp(math.log(1. - rng.random()) / size)
+    while True:
+        skip = math.floor(math.log(1. - rng.random()) / math.log1p(-w)) if w < 1 else 0
+        entry = next(itertools.islice(it, skip, None), None)
+        if entry is None:
+            break
+        reservoir[rng.randrange(size)] = entry
+        w *= math.exp(math.log(1. - rng.random()) / size)
+    reservoir.sort(key=lambda entry: entry[0])
+    return reservoir
+
+
+def bernoulli_positions(fraction: float, rng: random.Random) -> Iterator[int]:
+    """ increasing positions each selected with probability fraction,
+        the gaps between them are drawn from a geometric distribution
+    """
+    if fraction <= 0:
+        return
+    pos = -1
+    log_q = math.log1p(-fraction) if fraction < 1 else None
+    while True:
+        if log_q is None:
+            pos += 1
+        else:
+            pos += 1 + math.floor(math.log(1. - rng.random()) / log_q)
+        yield pos
+
+
+def bernoulli_sample(items: Iterable[T], fraction: float,
+                     rng: random.Random) -> Iterator[T]:
+    """ items selected independently with probability fraction """
+    it = iter(items)
+    last = -1
+    for pos in bernoulli_positions(fraction, rng):
+        item = next(itertools.islice(it, pos - last - 1, None), None)
+        if item is None:
+            return
+        last = pos
+        yield item
+
+
+class SampledMolInputStream(BaseMolInputStream):
+    """Return a random sample of the molecules in a file."""
+
+    def __init__(self, file_path: str, size: int = None, fraction: float = None,
+                 seed=None, index: bool = False, toolkit: str = TOOLKIT, **kwargs):
+        """
+        Parameters
+        ----------
+        file_path
+            file to sample
+        size
+            number of molecules of a reservoir sample
+        fraction
+            probability of a molecule to be selected for a Bernoulli sample
+        seed
+            seed of the random number generator
+        index
+            build the record index of an uncompressed sd file if it does not
+            exist, an existing index is always used
+        toolkit
+            openeye or rdkit
+        kwargs
+            passed on to the input stream
+        """
+        BaseMolInputStream.__init__(self, file_path)
+        if (size is None) == (fraction is None):
+            raise ValueError("Exactly one of size and fraction must be given")
+        if size is not None and size < 0:
+            raise ValueError(f"size must not be negative: {size}")
+        if fraction is not None and not 0 <= fraction <= 1:
+            raise ValueError(f"fraction must be between 0 and 1: {fraction}")
+
+        self._size = size
+        self._fraction = fraction
+        self._rng = random.Random(seed)
+        self._in = self._open(file_path, index, toolkit, kwargs)
+        if self._is_random_access:
+            self._mols = self._sample_random_access()
+        elif self._is_record_scan:
+            self._mols = self._sample_records(toolkit, kwargs)
+        else:
+            self._mols = self._sample(self._in)
+        self.next_mol = None
+
+    def _open(self, file_path: str, index: bool, toolkit: str, kwargs: dict):
+        from cddlib.chem.cddb import CDDBMolInputStream, is_cddb_path
+        from cddlib.chem.lazy_mol import LazyMolInputStream
+
+        self._is_random_access = False
+        self._is_record_scan = False
+        if is_cddb_path(file_path):
+            in_stream = CDDBMolInputStream(file_path, toolkit)
+            try:
+                len(in_stream)
+                self._is_random_access = True
+            except TypeError:
+                pass    # incomplete file without offset table
+            return in_stream
+
+        if sdfRE.search(file_path) is None or is_stdin_path(file_path):
+            from cddlib.chem.io import get_mol_input_stream
+            return get_mol_input_stream(file_path, **kwargs)
+
+        self._is_record_scan = True
+        if compression_of(file_path) is None and \
+           (index or SDFIndex.load(file_path, file_path + INDEX_SUFFIX) is not None):
+            self._is_random_access = True
+            return LazyMolInputStream(file_path, toolkit, **kwargs).open_index()
+        return None
+
+    def _positions(self, count: int) -> Iterator[int]:
+        if self._size is not None:
+            return iter(sorted(self._rng.sample(range(count), min(self._size, count))))
+        return itertools.takewhile(lambda pos: pos < count,
+                                   bernoulli_positions(self._fraction, self._rng))
+
+    def _sample(self, items: Iterable[T]) -> Iterator[T]:
+        if self._size is None:
+            yield from bernoulli_sample(items, self._fraction, self._rng)
+            return
+        for _, item in reservoir_sample(items, self._size, self._rng):
+            yield item
+
+    def _sample_random_access(self) -> Iterator[BaseMol]:
+        for pos in self._positions(len(self._in)):
+            yield self._in[pos]
+
+    def _sample_records(self, toolkit: str, kwargs: dict) -> Iterator[BaseMol]:
+        from cddlib.chem.lazy_mol import LazyMol
+
+        with open_input(self.file_path, kwargs.get("decompress_threads")) as in_s:
+            parser_args = {k: v for k, v in kwargs.items() if k != "decompress_threads"}
+            for record in self._sample(iter_records(in_s)):
+                yield LazyMol(record, toolkit, **parser_args)
+
+    def has_next(self) -> bool:
+        if self.next_mol is not None:
+            return True
+        if self._mols is None:
+            return False
+        self.next_mol = next(self._mols, None)
+        return self.next_mol is not None
+
+    def __next__(self) -> BaseMol:
+        if not self.has_next():
+            raise StopIteration()
+
+        res = self.next_mol
+        self.next_mol = None
+        return res
+
+    def close(self):
+        if self._mols is None:
+            return
+        self._mols.close()
+        self._mols = None
+        if self._in is not None:
+            self._in.close()
+            self._in = None
@@ -0,0 +1,214 @@
+'''Extract and filter sd data directly from the text of sd files.
+
+The scanner never parses molecules: it only locates the record
+boundaries and the '> <tag>' blocks of the requested tags, which makes
+it suitable for filtering or extracting columns from very large files.
+
+    scanner = SDDataScanner("lib.sdf.gz", tags=["ID"], where=["IC50 < 100"])
+    for values in scanner.values():
+        print(values["ID"])
+'''
+
+import operator
+import re
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+from cddlib.chem.sdf import iter_record_chunks, open_input, record_ends
+
+
+class Condition(object):
+    """Simple predicate on the value of one sd tag: tag op value.
+
+       If value is numeric the tag value is compared as float, records
+       with missing or non numeric values do not match. Otherwise the
+       stripped tag value is compared as string.
+    """
+    _OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt,
+            ">=": operator.ge, "==": operator.eq, "!=": operator.ne}
+    _conditionRE = re.compile(r"^\s*(.+?)\s*(<=|>=|==|!=|<|>)\s*(.*?)\s*$")
+
+    def __init__(self, tag: str, op: str, value):
+        """
+        Parameters
+        ----------
+        tag
+            name of the sd tag
+        op
+            one of <, <=, >, >=, ==, !=
+        value
+            number or string to compare against
+        """
+        if op not in Condition._OPS:
+            raise ValueError(f"Unknown operator: {op}")
+        self.tag = tag
+        self.op = op
+        self._op = Condition._OPS[op]
+        try:
+            self.value = float(value)
+            self._numeric = True
+        except ValueError:
+            self.value = str(value)
+            self._numeric = False
+
+    @classmethod
+    def parse(cls, text: str) -> 'Condition':
+        """ Create Condition from a string like "IC50 < 100" """
+        m = cls._conditionRE.match(text)
+        if m is None:
+            raise ValueError(f"Invalid condition: {text!r}")
+        return cls(*m.groups())
+
+    def __call__(self, tags: Dict[str, Optional[str]]) -> bool:
+        val = tags.get(self.tag)
+        if val is None:
+            return False
+        if self._numeric:
+            try:
+                val = float(val)
+            except ValueError:
+                return False
+        else:
+            val = val.strip()
+        return self._op(val, self.value)
+
+    def __repr__(self):
+        return f"Condition({self.tag!r}, {self.op!r}, {self.value!r})"
+
+
+Predicate = Union[str, Condition, Callable[[Dict[str, Optional[str]]], bool]]
+
+
+class SDDataScanner(object):
+    """Scan the sd data of an sd file without parsing molecules."""
+
+    def __init__(self, file_path: str, tags: Sequence[str] = (),
+                 where: Iterable[Predicate] = (), extra_tags: Sequence[str] = (),
+                 decompress_threads: int = None):
+        """
+        Parameters
+        ----------
+        file_path
+            sd file, may be gzipped, ".sdf" or ".sdf.gz" reads stdin
+        tags
+            names of the tags to extract
+        where
+            predicates which all need to be true for a record to match.
+            Strings are parsed with Condition.parse(), callables receive
+            the dictionary of extracted tag values.
+        extra_tags
+            additional tags needed by callable predicates
+        decompress_threads
+            number of threads used to decompress BGZF files
+        """
+        self.file_path = file_path
+        self.tags = list(tags)
+        self.where = [Condition.parse(p) if isinstance(p, str) else p for p in where]
+        self.decompress_threads = decompress_threads
+
+        needed = list(self.tags) + list(extra_tags)
+        needed += [p.tag for p in self.where if isinstance(p, Condition)]
+        self._needed = list(dict.fromkeys(needed))
+        self._tagRE = _tag_block_re(self._needed) if self._needed else None
+
+    def scan(self) -> Iterator[Tuple[int, int, bytes, Dict[str, Optional[str]]]]:
+        """Iterate over the matching records.
+
+        Returns
+        -------
+        Iterator[Tuple[int, int, bytes, Dict[str, Optional[str]]]]
+            start and end offset of the record in the uncompressed file,
+            text of the record and the values of the extracted tags
+        """
+        pos = 0
+        with open_input(self.file_path, self.decompress_threads) as in_s:
+            for chunk in iter_record_chunks(in_s):
+                start = 0
+                for end in record_ends(chunk):
+                    values = self._extract(chunk, start, end)
+                    if all(pred(values) for pred in self.where):
+                        yield pos + start, pos + end, chunk[start:end], values
+                    start = end
+                pos += len(chunk)
+
+    def values(self) -> Iterator[Dict[str, Optional[str]]]:
+        """ Values of the requested tags for each matching record, None
+            for missing tags.
+        """
+        for _, _, _, values in self.scan():
+            yield {tag: values[tag] for tag in self.tags}
+
+    def ranges(self) -> Iterator[Tuple[int, int]]:
+        """ Byte ranges of the matching records in the uncompressed file """
+        for start, end, _, _ in self.scan():
+            yield start, end
+
+    def records(self) -> Iterator[bytes]:
+        """ Text of the matching records, see MolOutputStream.write_sdf_record() """
+        for _, _, record, _ in self.scan():
+            yield record
+
+    def _extract(self, chunk: bytes, start: int, end: int) -> Dict[str, Optional[str]]:
+        values = dict.fromkeys(self._needed)
+        if self._tagRE is None:
+            return values
+        for m in self._tagRE.finditer(chunk, start, end):
+            tag = str(m.group(1), "utf-8", "replace")
+            if values[tag] is None:
+                values[tag] = str(m.group(2), "utf-8", "replace") \
+                    .replace("\r\n", "\n").rstrip("\n")
+        return values
+
+
+def copy_ranges(file_path: str, ranges: Iterable[Tuple[int, int]], out,
+                decompress_threads: int = None) -> int:
+    """Copy byte ranges of an sd file verbatim to a molecule output stream.
+
+    Parameters
+    ----------
+    file_path
+        sd file the ranges were obtained from, may be gzipped
+    ranges
+        ascending, non overlapping (start, end) byte ranges eg. from
+        SDDataScanner.ranges()
+    out
+        MolOutputStream of an sd file
+
+    Returns
+    -------
+    int
+        number of ranges copied
+    """
+    count = 0
+    pos = 0
+    with open_input(file_path, decompress_threads) as in_s:
+        for start, end in ranges:
+            if start < pos:
+                raise ValueError("ranges must be ascending and not overlap")
+            if hasattr(in_s, "seekable") and in_s.seekable() and start - pos > 1 << 16:
+                in_s.seek(start)
+            else:
+                _skip(in_s, start - pos)
+            data = in_s.read(end - start)
+            if len(data) != end - start:
+                raise EOFError(f"Range {start}-{end} exceeds {file_path}")
+            out.write_sdf_record(data)
+            pos = end
+            count += 1
+    return count
+
+
+def _skip(in_s, n: int):
+    while n > 0:
+        data = in_s.read(min(n, 1 << 20))
+        if not data:
+            raise EOFError("Unexpected end of file")
+        n -= len(data)
+
+
+def _tag_block_re(tags: Sequence[str]):
+    """ regular expression matching the data blocks of tags, group 1 is the
+        tag name group 2 the value lines.
+    """
+    names = b"|".join(re.escape(t.encode("utf-8")) for t in tags)
+    return re.compile(rb"^>[^<\n]*<(" + names + rb")>[^\n]*\n"
+                      rb"((?:(?!\$\$\$\$)[ \t]*\S[^\n]*\n)*)", re.M)
@@ -0,0 +1,375 @@
+'''Toolkit independent helpers working on the raw text of sd files.
+
+None of the functions in this module parse molecules, they only locate
+the '$$$$' lines that terminate the records of an sd file.
+'''
+
+import io
+import mmap
+import os
+import re
+import sys
+from typing import BinaryIO, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from cddlib.util import bgzf, compress
+
+RECORD_END = b"$$$$"
+"""bytes: line terminating each record in an sd file."""
+
+sdfRE = re.compile(".sdf(.gz|.zst|.lz4)?$", re.I)
+smiRE = re.compile(".smi(.gz|.zst|.lz4)?$", re.I)
+_recordEndRE = re.compile(rb"^\$\$\$\$[^\n]*\n", re.M)
+_molEndRE = re.compile(rb"^M  END[^\n]*(\n|$)", re.M)
+_dataHeaderRE = re.compile(r">[^<]*<([^>]*)>")
+
+
+def is_stdin_path(file_path: str) -> bool:
+    """True if file_path is only a file extension (eg. ".sdf") which by
+       convention means stdin/stdout is used.
+    """
+    return sdfRE.match(file_path) is not None or \
+        smiRE.match(file_path) is not None
+
+
+def open_input(file_path: str, decompress_threads: int = None) -> BinaryIO:
+    """Open file_path for binary reading.
+
+    Parameters
+    ----------
+    file_path
+        path to the file, if it consists only of an extension (eg. ".sdf.gz")
+        stdin is used. Files ending in gz, zst or lz4 are decompressed on
+        the fly, see cddlib.util.compress
+    decompress_threads
+        number of threads used to decompress BGZF files, see cddlib.util.bgzf
+
+    Returns
+    -------
+    BinaryIO
+        binary stream, closing it will not close stdin.
+    """
+    if is_stdin_path(file_path):
+        in_s = io.BufferedReader(io.FileIO(sys.stdin.fileno(), "rb",
+                                           closefd=False))
+    else:
+        in_s = io.open(file_path, "rb")
+
+    compression = compress.compression_of(file_path)
+    if compression is not None:
+        in_s = compress.open_input(in_s, compression, decompress_threads)
+    return in_s
+
+
+def find_record_end(buf: bytes, start: int = 0, end: int = None) -> int:
+    """Return the position following the last '$$$$' line in buf[start:end]
+       or -1 if buf[start:end] does not contain a complete record.
+    """
+    if end is None:
+        end = len(buf)
+    pos = buf.rfind(RECORD_END, start, end)
+    while pos >= 0:
+        if pos == 0 or buf[pos - 1] in b"\r\n":
+            nl = buf.find(b"\n", pos, end)
+            if nl >= 0:
+                return nl + 1
+        pos = buf.rfind(RECORD_END, start, pos)
+    return -1
+
+
+def _find_sd_end(buf: bytes) -> int:
+    # a '$$$$' at the start of buf may be preceded by other text on its line
+    return find_record_end(buf, 1)
+
+
+def _find_line_end(buf: bytes) -> int:
+    return buf.rfind(b"\n") + 1 or -1
+
+
+def truncate_after_last_record(file_path: str) -> bytes:
+    """Remove an incomplete record from the end of an sd or smiles file.
+
+       Used before appending to a file, eg. after the writer was killed.
+
+    Parameters
+    ----------
+    file_path
+        uncompressed or BGZF compressed (.gz) sd or smiles file, modified in
+        place. Other gzip files can not be truncated and are left as they
+        are, appending adds a new gzip member.
+
+    Returns
+    -------
+    bytes
+        uncompressed data which was removed with the last block of a BGZF
+        file and has to be written again before appending, b"" for
+        uncompressed files, see cddlib.util.bgzf.truncate
+    """
+    if sdfRE.search(file_path) is not None:
+        find_end = _find_sd_end
+    elif smiRE.search(file_path) is not None:
+        find_end = _find_line_end
+    else:
+        raise ValueError(f"Can only append to sd and smiles files: {file_path}")
+
+    compression = compress.compression_of(file_path)
+    if compression == "gz":
+        if os.path.getsize(file_path) > 0 and not bgzf.is_bgzf_file(file_path):
+            return b""
+        return bgzf.truncate(file_path, find_end)
+    if compression is not None:
+        raise ValueError(f"Can not append to {compression} compressed files: {file_path}")
+
+    with io.open(file_path, "r+b") as f:
+        size = os.fstat(f.fileno()).st_size
+        n_bytes = 1 << 16
+        while True:
+            start = max(0, size - n_bytes)
+            f.seek(start)
+            end = find_end(f.read(size - start))
+            if end >= 0 or start == 0:
+                f.truncate(start + max(end, 0))
+                return b""
+            n_bytes *= 4
+
+
+def iter_record_chunks(in_s: BinaryIO, chunk_bytes: int = 1 << 20) -> Iterator[bytes]:
+    """Split an sd file into chunks of complete records.
+
+    Parameters
+    ----------
+    in_s
+        binary input stream positioned at the start of a record
+    chunk_bytes
+        approximate size of each chunk, chunks are extended to the end of
+        the record that crosses this boundary.
+
+    Returns
+    -------
+    Iterator[bytes]
+        each chunk contains one or more records in file order
+    """
+    pending = b""
+    while True:
+        block = in_s.read(chunk_bytes)
+        if not block:
+            break
+        buf = pending + block if pending else block
+        # only search the new data plus the tail of the record split
+        # across the previous read
+        cut = find_record_end(buf, max(0, len(pending) - len(RECORD_END) - 2))
+        if cut < 0:
+            pending = buf
+            continue
+        yield buf[:cut]
+        pending = buf[cut:]
+
+    if pending.strip():
+        yield pending
+
+
+def record_ends(chunk: bytes) -> Iterator[int]:
+    """Iterate over the end offsets of the records in a chunk of complete records."""
+    end = 0
+    for m in _recordEndRE.finditer(chunk):
+        end = m.end()
+        yield end
+    if chunk[end:].strip():
+        # last record is not terminated by $$$$
+        yield len(chunk)
+
+
+def split_records(chunk: bytes) -> Iterator[bytes]:
+    """Split a chunk of complete records into the individual records."""
+    start = 0
+    for end in record_ends(chunk):
+        yield chunk[start:end]
+        start = end
+
+
+def iter_records(in_s: BinaryIO, chunk_bytes: int = 1 << 20) -> Iterator[bytes]:
+    """Iterate over the text of the records of an sd file.
+
+    Parameters
+    ----------
+    in_s
+        binary input stream positioned at the start of a record
+    chunk_bytes
+        size of the blocks read from in_s
+    """
+    for chunk in iter_record_chunks(in_s, chunk_bytes):
+        yield from split_records(chunk)
+
+
+def scan_record_offsets(in_s: BinaryIO, block_bytes: int = 1 << 24) -> np.ndarray:
+    """Find the byte offsets of all records in an sd file without parsing.
+
+    Parameters
+    ----------
+    in_s
+        binary input stream positioned at the start of the file
+
+    Returns
+    -------
+    np.ndarray
+        uint64 array of n+1 offsets for n records, record i is stored in
+        bytes [offsets[i], offsets[i+1]).
+    """
+    offsets = [np.zeros(1, dtype=np.uint64)]
+    pos = 0
+    for chunk in iter_record_chunks(in_s, block_bytes):
+        ends = list(record_ends(chunk))
+        offsets.append(np.array(ends, dtype=np.uint64) + np.uint64(pos))
+        pos += len(chunk)
+    return np.concatenate(offsets)
+
+
+def record_title(record: bytes) -> str:
+    """ Return the title (first line) of an sd record """
+    nl = record.find(b"\n")
+    line = record if nl < 0 else record[:nl]
+    return str(line, "utf-8", "replace").rstrip("\r")
+
+
+def molblock_end(record: bytes) -> int:
+    """Return the offset following the 'M  END' line of an sd record,
+       this is where the sd data section starts, or -1 if not found.
+    """
+    m = _molEndRE.search(record)
+    return -1 if m is None else m.end()
+
+
+def parse_sd_data(record: bytes) -> List[Tuple[str, str]]:
+    """Parse the sd data section of a record without creating a molecule.
+
+    Parameters
+    ----------
+    record
+        text of one record
+
+    Returns
+    -------
+    List[Tuple[str, str]]
+        list of (tag, value) in file order, multi line values are joined
+        with newlines.
+    """
+    start = molblock_end(record)
+    if start < 0:
+        return []
+
+    data = []
+    tag = None
+    value = []
+    for line in str(record[start:], "utf-8", "replace").split("\n"):
+        line = line.rstrip("\r")
+        if tag is None:
+            m = _dataHeaderRE.match(line)
+            if m is not None:
+                tag = m.group(1)
+            elif line.startswith("$$$$"):
+                break
+        elif line.strip() == "" or line.startswith("$$$$"):
+            data.append((tag, "\n".join(value)))
+            tag = None
+            value = []
+            if line.startswith("$$$$"):
+                break
+        else:
+            value.append(line)
+    if tag is not None:
+        data.append((tag, "\n".join(value)))
+    return data
+
+
+def format_sd_data(items: Iterable[Tuple[str, str]]) -> bytes:
+    """ Format (tag, value) pairs as sd data section """
+    return "".join(f">  <{tag}>\n{value}\n\n" for tag, value in items).encode("utf-8")
+
+
+class SDFileMap(object):
+    """Read only memory map of an uncompressed sd file.
+
+    Record boundaries are located with mmap.find() which searches the
+    mapped pages in C, records are returned as memoryview slices of the
+    map so their text is not copied by python.
+    """
+
+    def __init__(self, file_path: str):
+        if is_stdin_path(file_path) or compress.compression_of(file_path) is not None:
+            raise ValueError(f"Only uncompressed sd files can be memory mapped: {file_path}")
+        self.file_path = file_path
+        self._fh = io.open(file_path, "rb")
+        if os.fstat(self._fh.fileno()).st_size == 0:
+            # empty files can not be mapped
+            self._mm = b""
+        else:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+    def __len__(self) -> int:
+        """ size of the file in bytes """
+        return len(self._mm)
+
+    def record_end(self, pos: int) -> int:
+        """Return the offset following the record starting at pos or -1
+           if there is no record at pos.
+        """
+        mm = self._mm
+        size = len(mm)
+        if pos >= size:
+            return -1
+        if mm[pos:pos + len(RECORD_END)] == RECORD_END:
+            dollar = pos
+        else:
+            dollar = mm.find(b"\n" + RECORD_END, pos)
+            if dollar >= 0:
+                dollar += 1
+        if dollar < 0:
+            # last record without $$$$
+            return size if mm[pos:].strip() else -1
+        nl = mm.find(b"\n", dollar)
+        return size if nl < 0 else nl + 1
+
+    def chunks(self, pos: int = 0, chunk_bytes: int = 1 << 20) -> Iterator[memoryview]:
+        """Iterate over slices of about chunk_bytes holding complete records,
+           starting at byte offset pos.
+        """
+        mm = self._mm
+        size = len(mm)
+        while pos < size:
+            end = size
+            if pos + chunk_bytes < size:
+                dollar = mm.find(b"\n" + RECORD_END, pos + chunk_bytes)
+                if dollar >= 0:
+                    nl = mm.find(b"\n", dollar + 1)
+                    end = size if nl < 0 else nl + 1
+            if end == size and not mm[pos:].strip():
+                return
+            yield self._view[pos:end]
+            pos = end
+
+    def records(self, pos: int = 0) -> Iterator[memoryview]:
+        """Iterate over the records starting at byte offset pos."""
+        while True:
+            end = self.record_end(pos)
+            if end < 0:
+                return
+            yield self._view[pos:end]
+            pos = end
+
+    def close(self):
+        if self._fh is None:
+            return
+        self._view.release()
+        if isinstance(self._mm, mmap.mmap):
+            try:
+                self._mm.close()
+            except BufferError:
+                # record views are still referenced, the map is released
+                # when they are garbage collected
+                pass
+        self._mm = None
+        self._fh.close()
+        self._fh = None
+
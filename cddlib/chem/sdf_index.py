@@ -0,0 +1,136 @@
+'''Persistent index of the record offsets in an sd file.
+
+The index is stored in a sidecar file next to the sd file
+(eg. lib.sdf.cddidx) and is rebuilt automatically when the modification
+time or the size of the sd file changes.
+'''
+
+import io
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from cddlib.chem.sdf import is_stdin_path, scan_record_offsets
+from cddlib.util.compress import compression_of
+
+INDEX_SUFFIX = ".cddidx"
+_MAGIC = b"CDDIDX01"
+_HEADER = struct.Struct("<8sqqq")   # magic, mtime_ns, size, number of records
+
+
+class SDFIndex(object):
+    """Byte offsets of the records in an uncompressed sd file."""
+
+    def __init__(self, file_path: str, offsets: np.ndarray,
+                 mtime_ns: int, size: int):
+        """
+        Parameters
+        ----------
+        file_path
+            the indexed sd file
+        offsets
+            n+1 offsets for n records, see sdf.scan_record_offsets()
+        mtime_ns, size
+            modification time and size of file_path when it was indexed
+        """
+        self.file_path = file_path
+        self.offsets = offsets
+        self.mtime_ns = mtime_ns
+        self.size = size
+
+    @classmethod
+    def open(cls, file_path: str, index_path: str = None,
+             persist: bool = True) -> 'SDFIndex':
+        """Load the index of file_path or build it if missing or outdated.
+
+        Parameters
+        ----------
+        file_path
+            uncompressed sd file
+        index_path
+            sidecar file, default: file_path + ".cddidx"
+        persist
+            if True a new index is written to index_path, failure to
+            write it (eg. read only directory) is ignored.
+        """
+        if index_path is None:
+            index_path = file_path + INDEX_SUFFIX
+
+        idx = cls.load(file_path, index_path)
+        if idx is None:
+            idx = cls.build(file_path)
+            if persist:
+                try:
+                    idx.save(index_path)
+                except OSError:
+                    pass
+        return idx
+
+    @classmethod
+    def build(cls, file_path: str) -> 'SDFIndex':
+        """Scan file_path and create a new index."""
+        _check_indexable(file_path)
+        st = os.stat(file_path)
+        with io.open(file_path, "rb") as in_s:
+            offsets = scan_record_offsets(in_s)
+        return cls(file_path, offsets, st.st_mtime_ns, st.st_size)
+
+    @classmethod
+    def load(cls, file_path: str, index_path: str) -> 'SDFIndex':
+        """Read index_path, return None if it does not exist or does not
+           match the current state of file_path.
+        """
+        _check_indexable(file_path)
+        if not os.path.exists(index_path):
+            return None
+
+        st = os.stat(file_path)
+        with io.open(index_path, "rb") as in_s:
+            header = in_s.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                return None
+            magic, mtime_ns, size, count = _HEADER.unpack(header)
+            if magic != _MAGIC or mtime_ns != st.st_mtime_ns or size != st.st_size:
+                return None
+            offsets = np.frombuffer(in_s.read(), dtype="<u8")
+        if len(offsets) != count + 1:
+            return None
+        return cls(file_path, offsets.astype(np.uint64), mtime_ns, size)
+
+    def save(self, index_path: str) -> None:
+        """Atomically write this index to index_path."""
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp",
+                                        dir=os.path.dirname(os.path.abspath(index_path)))
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(_HEADER.pack(_MAGIC, self.mtime_ns, self.size, len(self)))
+                out.write(self.offsets.astype("<u8").tobytes())
+            os.replace(tmp_path, index_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def is_valid(self) -> bool:
+        """True if the sd file was not modified since it was indexed."""
+        st = os.stat(self.file_path)
+        return st.st_mtime_ns == self.mtime_ns and st.st_size == self.size
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def read(self, start: int, stop: int) -> bytes:
+        """Return the text of records start to stop-1."""
+        if not self.is_valid():
+            raise ValueError(f"{self.file_path} was modified after it was indexed")
+
+        first = int(self.offsets[start])
+        with io.open(self.file_path, "rb") as in_s:
+            in_s.seek(first)
+            return in_s.read(int(self.offsets[stop]) - first)
+
+
+def _check_indexable(file_path: str):
+    if is_stdin_path(file_path) or compression_of(file_path) is not None:
+        raise ValueError(f"Only uncompressed sd files can be indexed: {file_path}")
@@ -0,0 +1,191 @@
+'''Write molecules to multiple output files (shards).
+
+The shard files are named by a path template with a {shard} field, eg.
+"out.{shard:04d}.sdf.gz". Molecules are assigned to shards by:
+
+    round_robin   molecule i goes to shard i % num_shards
+    hash          stable hash of a tag value or of the canonical smiles,
+                  all molecules with the same key go to the same shard
+    bytes         shards are filled in order until they reach shard_bytes
+                  uncompressed bytes (sd and cddb files only)
+
+Compressed shards are compressed on their own thread. When the stream is
+closed a json manifest with the record count of each shard is written.
+
+    with get_mol_output_stream("out.{shard:04d}.sdf.gz", num_shards=16) as out:
+        for mol in inf:
+            out.write_mol(mol)
+'''
+
+import json
+import os
+import re
+import zlib
+from typing import List
+
+from cddlib.chem.mol import BaseMol, _import_molmodule, to_molblock
+from cddlib.chem.sdf import RECORD_END, format_sd_data, sdfRE
+from cddlib.chem.toolkit import TOOLKIT
+from cddlib.util.compress import compression_of
+
+ROUTES = ("round_robin", "hash", "bytes")
+_shardFieldRE = re.compile(r"\{shard(:[^}]*)?\}")
+
+
+def is_sharded_path(file_path: str) -> bool:
+    """ True if file_path is a shard path template """
+    return _shardFieldRE.search(file_path) is not None
+
+
+def default_manifest_path(path_template: str) -> str:
+    """ out.{shard:04d}.sdf.gz -> out.manifest.json """
+    prefix = _shardFieldRE.split(path_template, 1)[0].rstrip("._-")
+    if prefix == "" or prefix.endswith(os.sep):
+        prefix += "shards"
+    return prefix + ".manifest.json"
+
+
+class ShardedMolOutputStream(object):
+    """Write molecules to the files of a shard path template."""
+
+    def __init__(self, path_template: str, num_shards: int = None,
+                 route: str = "round_robin", key: str = None,
+                 shard_bytes: int = None, manifest_path: str = None,
+                 toolkit: str = TOOLKIT, **kwargs):
+        """
+        Parameters
+        ----------
+        path_template
+            file name with a {shard} field, eg. out.{shard:04d}.sdf.gz
+        num_shards
+            number of shards, required for the round_robin and hash routes,
+            for the bytes route the maximum number of shards
+        route
+            round_robin, hash or bytes
+        key
+            tag used by the hash route, default: canonical smiles
+        shard_bytes
+            target number of uncompressed bytes per shard for the bytes route
+        manifest_path
+            json file listing the shards, default: derived from path_template,
+            eg. out.manifest.json
+        toolkit
+            openeye or rdkit
+        kwargs
+            passed on to get_mol_output_stream() for each shard
+        """
+        if not is_sharded_path(path_template):
+            raise ValueError(f"path template has no {{shard}} field: {path_template}")
+        if route not in ROUTES:
+            raise ValueError(f"route must be one of {ROUTES}: {route}")
+        if route == "bytes":
+            if shard_bytes is None or shard_bytes <= 0:
+                raise ValueError("shard_bytes is required for the bytes route")
+            self._is_sdf = sdfRE.search(path_template) is not None
+            if not self._is_sdf and not path_template.lower().endswith(".cddb"):
+                raise ValueError(f"bytes route needs sd or cddb files: {path_template}")
+        elif num_shards is None or num_shards < 1:
+            raise ValueError(f"num_shards is required for the {route} route")
+
+        if compression_of(path_template) is not None:
+            # each shard compresses on its own thread, this also selects the
+            # BGZF writer for gz shards with the openeye toolkit
+            kwargs.setdefault("compress_threads", 1)
+
+        self.file_path = path_template
+        self.manifest_path = manifest_path or default_manifest_path(path_template)
+        self._num_shards = num_shards
+        self._route = route
+        self._key = key
+        self._shard_bytes = shard_bytes
+        self._toolkit = toolkit
+        self._kwargs = kwargs
+        self._count = 0
+        self._shards: List = []
+        self._paths: List[str] = []
+        self._records: List[int] = []
+        self._bytes: List[int] = []
+        if route != "bytes":
+            for _ in range(num_shards):
+                self._open_shard()
+
+    def _open_shard(self):
+        from cddlib.chem.io import get_mol_output_stream
+        path = self.file_path.format(shard=len(self._shards))
+        self._shards.append(get_mol_output_stream(path, **self._kwargs))
+        self._paths.append(path)
+        self._records.append(0)
+        self._bytes.append(0)
+
+    def _hash_shard(self, mol: BaseMol) -> int:
+        if self._key is None:
+            value = mol.canonical_smiles
+        else:
+            value = mol[self._key]
+        return zlib.crc32(str(value).encode("utf-8")) % self._num_shards
+
+    def write_mol(self, mol: BaseMol):
+        if self._route == "round_robin":
+            shard = self._count % self._num_shards
+        elif self._route == "hash":
+            shard = self._hash_shard(mol)
+        else:
+            self._write_sized(mol)
+            self._count += 1
+            return
+
+        self._shards[shard].write_mol(mol)
+        self._records[shard] += 1
+        self._count += 1
+
+    def _write_sized(self, mol: BaseMol):
+        if not self._shards or self._bytes[-1] >= self._shard_bytes:
+            if self._num_shards is not None and len(self._shards) == self._num_shards:
+                raise ValueError(f"all {self._num_shards} shards reached {self._shard_bytes} bytes")
+            self._open_shard()
+
+        out = self._shards[-1]
+        if self._is_sdf:
+            data = _sdf_record(mol)
+            out.write_sdf_record(data)
+        else:
+            data = _import_molmodule(self._toolkit).to_binary(mol)
+            out.write_binary(data)
+        self._records[-1] += 1
+        self._bytes[-1] += len(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self._shards is None:
+            return
+        shards, self._shards = self._shards, None
+        _close_all(shards)
+
+        shards = [{"path": path, "records": n} for path, n in zip(self._paths, self._records)]
+        manifest = {"route": self._route, "records": self._count, "shards": shards}
+        with open(self.manifest_path, "wt") as out:
+            json.dump(manifest, out, indent=2)
+
+
+def _close_all(streams: List) -> None:
+    """ close every stream, even if closing an earlier one raises """
+    if not streams:
+        return
+    try:
+        streams[0].close()
+    finally:
+        _close_all(streams[1:])
+
+
+def _sdf_record(mol: BaseMol) -> bytes:
+    """ text of the sd record of mol """
+    record = mol.sdf_record()
+    if record is not None:
+        return record
+    data = format_sd_data((kee, mol[kee]) for kee in mol.keys())
+    return b"".join((to_molblock(mol).encode("utf-8"), data, RECORD_END, b"\n"))
@@ -0,0 +1,231 @@
+'''Sort molecule streams which do not fit into memory.
+
+Molecules are read in runs of run_size molecules, each run is sorted and
+spilled to a temporary file in a compact binary format (unchanged sd
+records as text, other molecules in the toolkit binary format). The runs
+are then merged with a k-way merge, in several passes if there are more
+than merge_width runs so that only merge_width run files are open at a
+time. The sort is stable, molecules with equal keys keep their input order,
+and molecules without a key value (or with a NaN value) are sorted last. Run files store the keys as json, so the values returned by
+key functions must be numbers, strings or lists or tuples of these.
+
+    with get_mol_input_stream("poses.sdf.gz", lazy=True) as inf, \\
+         get_mol_output_stream("top.sdf.gz") as out:
+        sort_mols_to(inf, out, "docking_score", top_n=1000)
+
+    for mol in sort_mols(inf, by_title):
+        ...
+
+With top_n only the best top_n molecules of each run are kept, if
+top_n <= run_size no temporary files are written at all.
+'''
+
+import heapq
+import itertools
+import json
+import math
+import os
+import shutil
+import struct
+import tempfile
+from typing import Any, Callable, Iterable, Iterator, List, Tuple, Union
+
+from cddlib.chem.mol import BaseMol, _import_molmodule
+from cddlib.chem.toolkit import TOOLKIT
+
+SortKey = Union[str, Callable[[BaseMol], Any]]
+
+_FRAME = struct.Struct("<IIB")  # length of key, length of data, is sd record
+
+
+def by_title(mol: BaseMol) -> str:
+    """ sort key function sorting by title """
+    return mol.title
+
+
+def sort_mols(mols: Iterable[BaseMol], key: SortKey,
+              key_type: Callable[[str], Any] = float, reverse: bool = False,
+              top_n: int = None, run_size: int = 100000, tmp_dir: str = None,
+              merge_width: int = 64, toolkit: str = TOOLKIT) -> Iterator[BaseMol]:
+    """Sort molecules by a tag or a key function.
+
+    Parameters
+    ----------
+    mols
+        any molecule input stream or iterable of molecules
+    key
+        name of a tag or function returning the key of a molecule,
+        eg. by_title. Molecules for which the key is missing, can not be
+        converted by key_type, is None or NaN are sorted last.
+    key_type
+        conversion of tag values, eg. float, int or str
+    reverse
+        sort in descending order
+    top_n
+        only return the first top_n molecules
+    run_size
+        number of molecules sorted in memory
+    tmp_dir
+        directory for the run files, default: system temp directory
+    merge_width
+        maximum number of run files merged at once
+    toolkit
+        openeye or rdkit
+
+    Returns
+    -------
+    Iterator[BaseMol]
+        the sorted molecules
+    """
+    if merge_width < 2:
+        raise ValueError(f"merge_width must be at least 2: {merge_width}")
+    return _sort(mols, _key_function(key, key_type, reverse), reverse,
+                 top_n, run_size, tmp_dir, merge_width, toolkit)
+
+
+def sort_mols_to(mols: Iterable[BaseMol], out_stream, key: SortKey, **kwargs) -> int:
+    """Sort molecules and write them to out_stream.
+
+    Parameters
+    ----------
+    mols
+        any molecule input stream or iterable of molecules
+    out_stream
+        molecule output stream receiving the sorted molecules
+    key
+        name of a tag or key function
+    kwargs
+        passed on to sort_mols()
+
+    Returns
+    -------
+    int
+        number of molecules written
+    """
+    n_written = 0
+    for mol in sort_mols(mols, key, **kwargs):
+        out_stream.write_mol(mol)
+        n_written += 1
+    return n_written
+
+
+def _key_function(key: SortKey, key_type, reverse: bool) -> Callable[[BaseMol], Tuple]:
+    """ key function returning (has_value, value) tuples which sort
+        missing values last in either direction
+    """
+    missing = (1, 0) if not reverse else (0, 0)
+    present = 0 if not reverse else 1
+
+    if callable(key):
+        def key_func(mol):
+            value = key(mol)
+            return missing if _is_missing(value) else (present, value)
+    else:
+        def key_func(mol):
+            if key not in mol:
+                return missing
+            try:
+                value = key_type(mol[key])
+            except (TypeError, ValueError):
+                return missing
+            return missing if _is_missing(value) else (present, value)
+    return key_func
+
+
+def _is_missing(value) -> bool:
+    # NaN compares false to everything and would break the order
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _sort(mols: Iterable[BaseMol], key_func, reverse: bool, top_n: int,
+          run_size: int, tmp_dir: str, merge_width: int,
+          toolkit: str) -> Iterator[BaseMol]:
+    mol_module = _import_molmodule(toolkit)
+    run_dir = None
+    run_paths: List[str] = []
+    best: List[Tuple] = []      # in memory result if top_n <= run_size
+    try:
+        it = iter(mols)
+        while True:
+            run = [(key_func(mol), mol) for mol in itertools.islice(it, run_size)]
+            if not run:
+                break
+            run.sort(key=_entry_key, reverse=reverse)
+            if top_n is not None:
+                del run[top_n:]
+                if top_n <= run_size:
+                    best = list(itertools.islice(
+                        heapq.merge(best, run, key=_entry_key, reverse=reverse), top_n))
+                    continue
+
+            if run_dir is None:
+                run_dir = tempfile.mkdtemp(prefix="cddlib_sort", dir=tmp_dir)
+            path = os.path.join(run_dir, f"run{len(run_paths)}.bin")
+            _write_run(path, run, mol_module)
+            run_paths.append(path)
+
+        if not run_paths:
+            for _, mol in best:
+                yield mol
+            return
+
+        while len(run_paths) > merge_width:
+            run_paths = [_merge_runs(run_paths[i:i + merge_width], reverse, top_n,
+                                     mol_module, toolkit)
+                         for i in range(0, len(run_paths), merge_width)]
+
+        runs = [_read_run(path, mol_module, toolkit) for path in run_paths]
+        merged = heapq.merge(*runs, key=_entry_key, reverse=reverse)
+        for _, mol in itertools.islice(merged, top_n):
+            yield mol
+    finally:
+        if run_dir is not None:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def _entry_key(entry: Tuple):
+    # list.sort() and heapq.merge() are stable, also with reverse=True
+    return entry[0]
+
+
+def _merge_runs(run_paths: List[str], reverse: bool, top_n: int,
+                mol_module, toolkit: str) -> str:
+    """ merge run files into a new run file and remove them """
+    if len(run_paths) == 1:
+        return run_paths[0]
+    path = run_paths[0][:-len(".bin")] + "m.bin"
+    runs = [_read_run(run_path, mol_module, toolkit) for run_path in run_paths]
+    merged = heapq.merge(*runs, key=_entry_key, reverse=reverse)
+    _write_run(path, itertools.islice(merged, top_n), mol_module)
+    for run in runs:
+        run.close()
+    for run_path in run_paths:
+        os.remove(run_path)
+    return path
+
+
+def _write_run(path: str, run: Iterable[Tuple], mol_module):
+    with open(path, "wb") as out:
+        for kee, mol in run:
+            record = mol.sdf_record()
+            is_sdf = record is not None
+            data = record if is_sdf else mol_module.to_binary(mol)
+            kee = json.dumps(kee).encode("utf-8")
+            out.write(_FRAME.pack(len(kee), len(data), is_sdf))
+            out.write(kee)
+            out.write(data)
+
+
+def _read_run(path: str, mol_module, toolkit: str) -> Iterator[Tuple]:
+    from cddlib.chem.lazy_mol import LazyMol
+
+    with open(path, "rb") as in_s:
+        while True:
+            header = in_s.read(_FRAME.size)
+            if not header:
+                return
+            key_len, data_len, is_sdf = _FRAME.unpack(header)
+            kee = json.loads(in_s.read(key_len))
+            data = in_s.read(data_len)
+            mol = LazyMol(data, toolkit) if is_sdf else mol_module.from_binary(data)
+            yield kee, mol
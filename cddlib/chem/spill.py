@@ -0,0 +1,149 @@
+'''Molecule buffer with a memory budget that spills to a temporary file.
+
+SpillingMolStream has the add_mol() / has_next() / iteration interface of
+MemMolStream. Molecules are kept in memory as binary blobs (the sd record
+text of molecules read from sd files, the binary format of the toolkit for
+all others) until max_bytes is exceeded, then all buffered molecules are
+appended to a temporary file. Molecules are returned in the order they
+were added, first from the file then from memory. The file is emptied
+whenever all spilled molecules were read.
+
+    with SpillingMolStream(max_bytes=1 << 28) as buf:
+        for mol in upstream:
+            buf.add_mol(mol)
+        for mol in buf:
+            ...
+'''
+
+import os
+import struct
+import tempfile
+from collections import deque
+from typing import Iterable
+
+from cddlib.chem.mol import BaseMol, _import_molmodule
+from cddlib.chem.toolkit import TOOLKIT
+
+_FRAME = struct.Struct("<BI")   # is sd record, length of data
+_ENTRY_OVERHEAD = 100           # approximate memory of a buffered entry besides its data
+
+
+class SpillingMolStream(object):
+    """First in first out buffer of molecules with bounded memory."""
+
+    def __init__(self, init_list: Iterable[BaseMol] = None, max_bytes: int = 1 << 28,
+                 tmp_dir: str = None, toolkit: str = TOOLKIT):
+        """
+        Parameters
+        ----------
+        init_list
+            molecules to add
+        max_bytes
+            approximate memory used for buffered molecules
+        tmp_dir
+            directory of the spill file, default: system temp directory
+        toolkit
+            openeye or rdkit, the toolkit of the molecules
+        """
+        self._toolkit = toolkit
+        self._mol_module = _import_molmodule(toolkit)
+        self._max_bytes = max_bytes
+        self._tmp_dir = tmp_dir
+        self._mem = deque()
+        self._mem_bytes = 0
+        self._path = None
+        self._out = None
+        self._in = None
+        self._unflushed = False
+        self._num_unread = 0
+        self.num_spilled = 0
+        if init_list is not None:
+            for mol in init_list:
+                self.add_mol(mol)
+
+    def add_mol(self, mol: BaseMol) -> None:
+        """ Append a copy of mol """
+        record = mol.sdf_record()
+        if record is not None:
+            entry = (True, record)
+        else:
+            entry = (False, self._mol_module.to_binary(mol))
+        self._mem.append(entry)
+        self._mem_bytes += len(entry[1]) + _ENTRY_OVERHEAD
+        if self._mem_bytes > self._max_bytes:
+            self._spill()
+
+    def _spill(self):
+        if self._out is None:
+            fd, self._path = tempfile.mkstemp(prefix="cddlib_spill", suffix=".bin",
+                                              dir=self._tmp_dir)
+            self._out = os.fdopen(fd, "wb")
+            self._in = open(self._path, "rb")
+        for is_sdf, data in self._mem:
+            self._out.write(_FRAME.pack(is_sdf, len(data)))
+            self._out.write(data)
+        self._num_unread += len(self._mem)
+        self.num_spilled += len(self._mem)
+        self._unflushed = True
+        self._mem.clear()
+        self._mem_bytes = 0
+
+    @property
+    def memory_bytes(self) -> int:
+        """ approximate memory used by the molecules held in memory """
+        return self._mem_bytes
+
+    def __len__(self) -> int:
+        return self._num_unread + len(self._mem)
+
+    def __enter__(self):
+        return self
+
+    def has_next(self) -> bool:
+        return self._num_unread > 0 or len(self._mem) > 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> BaseMol:
+        if self._num_unread > 0:
+            return self._read_spilled()
+        if not self._mem:
+            raise StopIteration()
+        is_sdf, data = self._mem.popleft()
+        self._mem_bytes -= len(data) + _ENTRY_OVERHEAD
+        return self._to_mol(is_sdf, data)
+
+    def _read_spilled(self) -> BaseMol:
+        if self._unflushed:
+            self._out.flush()
+            self._unflushed = False
+        is_sdf, length = _FRAME.unpack(self._in.read(_FRAME.size))
+        data = self._in.read(length)
+        self._num_unread -= 1
+        if self._num_unread == 0:
+            # all spilled molecules were read, reuse the file from the start
+            self._out.seek(0)
+            self._out.truncate()
+            self._in.seek(0)
+        return self._to_mol(is_sdf, data)
+
+    def _to_mol(self, is_sdf: bool, data: bytes) -> BaseMol:
+        if is_sdf:
+            from cddlib.chem.lazy_mol import LazyMol
+            return LazyMol(data, self._toolkit)
+        return self._mol_module.from_binary(data)
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        """ Free the buffered molecules and remove the spill file """
+        self._mem.clear()
+        self._mem_bytes = 0
+        self._num_unread = 0
+        if self._out is not None:
+            self._out.close()
+            self._in.close()
+            os.remove(self._path)
+            self._out = self._in = self._path = None
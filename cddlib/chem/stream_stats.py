@@ -0,0 +1,245 @@
+'''Throughput instrumentation of molecule streams.
+
+The wrappers count records and measure the time spent reading (parsing) or
+writing (serializing) molecules. To keep the overhead low only every
+sample_every-th call is timed and the total time is extrapolated, byte
+counts and rates are only updated at the sampled calls.
+
+    with get_mol_input_stream("in.sdf.gz", instrument=True) as inf:
+        for mol in inf:
+            ...
+        print(inf.stats())
+
+    inf = InstrumentedMolInputStream(get_mol_input_stream("in.sdf.gz"),
+                                     log_interval=60, logger=logging.getLogger("job"))
+'''
+
+import logging
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from cddlib.chem.io import BaseMolInputStream
+from cddlib.chem.mol import BaseMol
+
+
+class StreamStats(object):
+    """Counters of one stream, updated by the instrumented streams."""
+
+    def __init__(self, name: str, sample_every: int = 64, window: float = 10.,
+                 log_interval: float = None, logger: logging.Logger = None,
+                 callback: Callable[[Dict], None] = None):
+        """
+        Parameters
+        ----------
+        name
+            reported with the statistics, eg. the file name
+        sample_every
+            time every sample_every-th record
+        window
+            length in seconds of the window for the rolling records/sec
+        log_interval
+            if given the statistics are emitted every log_interval seconds
+            to the logger and the callback
+        logger
+            logger receiving an info message, default: the cddlib.chem
+            stream_stats logger if log_interval is given and no callback
+        callback
+            function receiving the stats() dictionary
+        """
+        self.name = name
+        self.sample_every = max(1, sample_every)
+        self.records = 0
+        self.bytes = None
+        self._samples = 0
+        self._sampled_time = 0.
+        self._window = window
+        self._start = time.perf_counter()
+        self._history = deque([(self._start, 0)])
+        self._log_interval = log_interval
+        self._last_emit = self._start
+        if log_interval is not None and logger is None and callback is None:
+            logger = logging.getLogger(__name__)
+        self._logger = logger
+        self._callback = callback
+
+    def sampled(self) -> bool:
+        """ True if the next record is to be timed """
+        return self.records % self.sample_every == 0
+
+    def add_sample(self, seconds: float, n_bytes: Optional[int]):
+        """ record the time of a sampled call, called after count() """
+        self._samples += 1
+        self._sampled_time += seconds
+        self.bytes = n_bytes
+        now = time.perf_counter()
+        self._history.append((now, self.records))
+        while len(self._history) > 2 and self._history[1][0] < now - self._window:
+            self._history.popleft()
+        if self._log_interval is not None and now - self._last_emit >= self._log_interval:
+            self._last_emit = now
+            self.emit()
+
+    def count(self):
+        self.records += 1
+
+    def stats(self) -> Dict:
+        """Return the current statistics.
+
+        Returns
+        -------
+        dict with
+            name, records, bytes (None if not known to the stream),
+            seconds (elapsed), io_seconds (estimated time spent in the
+            stream), records_per_sec (overall) and rolling_records_per_sec
+            (over the last window seconds)
+        """
+        now = time.perf_counter()
+        elapsed = now - self._start
+        io_seconds = 0. if self._samples == 0 else \
+            self._sampled_time / self._samples * self.records
+        first_t, first_n = self._history[0]
+        last_t, last_n = self._history[-1]
+        rolling = (last_n - first_n) / (last_t - first_t) if last_t > first_t else 0.
+        return {"name": self.name, "records": self.records, "bytes": self.bytes,
+                "seconds": elapsed, "io_seconds": io_seconds,
+                "records_per_sec": self.records / elapsed if elapsed > 0 else 0.,
+                "rolling_records_per_sec": rolling}
+
+    def emit(self):
+        """ send the statistics to the logger and the callback """
+        stats = self.stats()
+        if self._logger is not None:
+            self._logger.info("%(name)s: %(records)d records, %(rolling_records_per_sec).1f rec/s,"
+                              " %(io_seconds).1f of %(seconds).1f sec in io", stats)
+        if self._callback is not None:
+            self._callback(stats)
+
+
+class InstrumentedMolInputStream(BaseMolInputStream):
+    """Molecule input stream counting records and sampling the parse time."""
+
+    def __init__(self, in_stream: BaseMolInputStream, **kwargs):
+        """
+        Parameters
+        ----------
+        in_stream
+            stream to read from, closed with this stream
+        kwargs
+            passed on to StreamStats
+        """
+        BaseMolInputStream.__init__(self, in_stream.file_path)
+        self._in = in_stream
+        self._stats = StreamStats(in_stream.file_path, **kwargs)
+        # time spent in has_next() before a sampled __next__(), the
+        # streams read and parse the next record in has_next()
+        self._has_next_time = 0.
+
+    def stats(self) -> Dict:
+        if self._in is not None:
+            self._stats.bytes = self._in.bytes_read
+        return self._stats.stats()
+
+    def has_next(self) -> bool:
+        if not self._stats.sampled():
+            return self._in.has_next()
+
+        start = time.perf_counter()
+        res = self._in.has_next()
+        self._has_next_time += time.perf_counter() - start
+        return res
+
+    def __next__(self) -> BaseMol:
+        stats = self._stats
+        if not stats.sampled():
+            mol = self._in.__next__()
+            stats.count()
+            return mol
+
+        start = time.perf_counter()
+        mol = self._in.__next__()
+        stats.count()
+        seconds = time.perf_counter() - start + self._has_next_time
+        self._has_next_time = 0.
+        stats.add_sample(seconds, self._in.bytes_read)
+        return mol
+
+    @property
+    def bytes_read(self) -> Optional[int]:
+        return self._in.bytes_read
+
+    @property
+    def supports_resume(self) -> bool:
+        return self._in.supports_resume
+
+    def position(self) -> Dict:
+        return self._in.position()
+
+    def resume(self, position: Dict) -> None:
+        self._in.resume(position)
+
+    def __len__(self) -> int:
+        return len(self._in)
+
+    def close(self):
+        if self._in is None:
+            return
+        self._stats.bytes = self._in.bytes_read
+        self._in.close()
+        self._in = None
+
+
+class InstrumentedMolOutputStream(object):
+    """Molecule output stream counting records and sampling the
+       serialization time.
+    """
+
+    def __init__(self, out_stream, **kwargs):
+        """
+        Parameters
+        ----------
+        out_stream
+            stream to write to, closed with this stream
+        kwargs
+            passed on to StreamStats
+        """
+        self.file_path = getattr(out_stream, "file_path", None)
+        self._out = out_stream
+        self._stats = StreamStats(self.file_path, **kwargs)
+
+    def stats(self) -> Dict:
+        if self._out is not None:
+            self._stats.bytes = self.bytes_written
+        return self._stats.stats()
+
+    def write_mol(self, mol: BaseMol):
+        stats = self._stats
+        if not stats.sampled():
+            self._out.write_mol(mol)
+            stats.count()
+            return
+
+        start = time.perf_counter()
+        self._out.write_mol(mol)
+        stats.count()
+        stats.add_sample(time.perf_counter() - start, self.bytes_written)
+
+    @property
+    def bytes_written(self) -> Optional[int]:
+        return getattr(self._out, "bytes_written", None)
+
+    def sync(self) -> Optional[int]:
+        return self._out.sync()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self._out is None:
+            return
+        self._out.close()
+        self._stats.bytes = self.bytes_written
+        self._out = None
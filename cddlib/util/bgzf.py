@@ -0,0 +1,412 @@
+"""
+Multithreaded block gzip (BGZF) compression and decompression.
+
+Data is split into blocks of at most 64KB which are compressed as
+independent gzip members carrying the BGZF 'BC' extra field with the size
+of the compressed block. The output is a valid gzip file readable by any
+gzip implementation, but since the blocks are independent they can be
+compressed and decompressed on multiple threads; zlib releases the GIL.
+"""
+
+import gzip
+import io
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Tuple
+
+MAX_BLOCK_INPUT = 0xff00
+"""int: max number of uncompressed bytes per block, guarantees that the
+        compressed block fits the 16 bit BGZF size field."""
+
+_HEADER = struct.Struct("<4BI2BH2BHH")   # magic, CM, FLG, MTIME, XFL, OS, XLEN, SI1, SI2, SLEN, BSIZE
+_TRAILER = struct.Struct("<II")          # CRC32, ISIZE
+_EOF_BLOCK = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+_MAX_TRACKED_BLOCKS = 4096
+
+
+def default_threads() -> int:
+    """ number of compression threads used if not specified """
+    return os.cpu_count() or 1
+
+
+def compress_block(data: bytes, level: int = 6) -> bytes:
+    """Compress data (at most MAX_BLOCK_INPUT bytes) into one BGZF block."""
+    comp = zlib.compressobj(level, zlib.DEFLATED, -15)
+    deflated = comp.compress(data) + comp.flush()
+    bsize = _HEADER.size + len(deflated) + _TRAILER.size
+    return b"".join((
+        _HEADER.pack(0x1f, 0x8b, 8, 4, 0, 0, 0xff, 6, ord("B"), ord("C"), 2, bsize - 1),
+        deflated,
+        _TRAILER.pack(zlib.crc32(data), len(data) & 0xffffffff)))
+
+
+def decompress_block(block: bytes) -> bytes:
+    """Decompress one BGZF block as returned by read_raw_block()."""
+    data = zlib.decompress(block[_HEADER.size:-_TRAILER.size], -15)
+    crc, isize = _TRAILER.unpack(block[-_TRAILER.size:])
+    if zlib.crc32(data) != crc or len(data) & 0xffffffff != isize:
+        raise IOError("BGZF block failed crc check")
+    return data
+
+
+def is_bgzf_header(header: bytes) -> bool:
+    """ True if header (at least 18 bytes) starts a BGZF block """
+    return len(header) >= _HEADER.size and \
+        header[0:4] == b"\x1f\x8b\x08\x04" and header[12:14] == b"BC"
+
+
+def is_bgzf_file(file_path: str) -> bool:
+    """ True if file_path starts with a BGZF block """
+    with io.open(file_path, "rb") as f:
+        return is_bgzf_header(f.read(_HEADER.size))
+
+
+def read_raw_block(in_s: BinaryIO) -> bytes:
+    """Read the next compressed BGZF block from in_s without decompressing.
+
+    Returns
+    -------
+    bytes
+        the complete block or b"" at the end of the file
+    """
+    header = in_s.read(_HEADER.size)
+    if not header:
+        return b""
+    if not is_bgzf_header(header):
+        raise IOError("Not a BGZF block, can not decompress in parallel")
+    xlen = struct.unpack_from("<H", header, 10)[0]
+    bsize = struct.unpack_from("<H", header, 16)[0] + 1
+    if xlen != 6:
+        # other extra subfields in addition to BC
+        raise IOError("Unsupported BGZF extra field")
+    rest = in_s.read(bsize - _HEADER.size)
+    if len(rest) != bsize - _HEADER.size:
+        raise EOFError("Truncated BGZF block")
+    return header + rest
+
+
+class BlockGzipWriter(io.RawIOBase):
+    """Binary output stream compressing BGZF blocks on a thread pool.
+
+       Blocks are written in order, at most 2*threads blocks are held in
+       memory.
+    """
+
+    def __init__(self, fileobj: BinaryIO, level: int = 6, threads: int = None,
+                 close_fileobj: bool = True):
+        """
+        Parameters
+        ----------
+        fileobj
+            binary stream receiving the compressed data
+        level
+            zlib compression level 0-9
+        threads
+            number of compression threads, default: number of cpus,
+            0 compresses in the calling thread
+        close_fileobj
+            if True fileobj is closed when this stream is closed
+        """
+        io.RawIOBase.__init__(self)
+        if threads is None:
+            threads = default_threads()
+        self._out = fileobj
+        self._level = level
+        self._close_fileobj = close_fileobj
+        self._buf = bytearray()
+        self._max_pending = 2 * max(threads, 1)
+        self._pending = deque()
+        self._pool = ThreadPoolExecutor(threads) if threads > 0 else None
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._buf += b
+        while len(self._buf) >= MAX_BLOCK_INPUT:
+            self._submit(bytes(self._buf[:MAX_BLOCK_INPUT]))
+            del self._buf[:MAX_BLOCK_INPUT]
+        return len(b)
+
+    def _submit(self, data: bytes):
+        if self._pool is None:
+            self._out.write(compress_block(data, self._level))
+            return
+        self._pending.append(self._pool.submit(compress_block, data, self._level))
+        while len(self._pending) > self._max_pending:
+            self._out.write(self._pending.popleft().result())
+
+    def flush(self):
+        """Write the blocks that finished compressing.
+
+           Partial blocks are only compressed when they are full or on
+           close(), so that frequent flushes, eg. by io.TextIOWrapper, do
+           not produce many small blocks.
+        """
+        if self.closed:
+            return
+        while self._pending and self._pending[0].done():
+            self._out.write(self._pending.popleft().result())
+
+    def sync(self):
+        """Compress the partial block and write all blocks to the file object.
+
+           Unlike flush() this ends the current block, the data written so
+           far is a sequence of complete blocks (without the EOF marker)
+           which can be continued after truncating the file at this point.
+        """
+        if self._buf:
+            self._submit(bytes(self._buf))
+            self._buf.clear()
+        while self._pending:
+            self._out.write(self._pending.popleft().result())
+        self._out.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buf:
+                self._submit(bytes(self._buf))
+                self._buf.clear()
+            while self._pending:
+                self._out.write(self._pending.popleft().result())
+            self._out.write(_EOF_BLOCK)
+            self._out.flush()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+            io.RawIOBase.close(self)
+            if self._close_fileobj:
+                self._out.close()
+
+
+class BlockGzipReader(io.RawIOBase):
+    """Binary input stream decompressing BGZF blocks on a thread pool."""
+
+    def __init__(self, fileobj: BinaryIO, threads: int = None,
+                 close_fileobj: bool = True):
+        """
+        Parameters
+        ----------
+        fileobj
+            binary stream of a BGZF file
+        threads
+            number of decompression threads, default: number of cpus
+        close_fileobj
+            if True fileobj is closed when this stream is closed
+        """
+        io.RawIOBase.__init__(self)
+        if threads is None:
+            threads = default_threads()
+        self._in = fileobj
+        self._close_fileobj = close_fileobj
+        self._max_pending = 2 * threads
+        self._pending = deque()
+        self._pool = ThreadPoolExecutor(threads)
+        self._eof = False
+        self._data = memoryview(b"")
+        # (compressed offset, uncompressed offset) of the recently read blocks
+        self._blocks = deque(maxlen=_MAX_TRACKED_BLOCKS)
+        self._usize = 0
+        try:
+            self._comp_pos = fileobj.tell()
+        except (OSError, io.UnsupportedOperation):
+            self._comp_pos = None
+
+    def readable(self) -> bool:
+        return True
+
+    def _submit_blocks(self):
+        while not self._eof and len(self._pending) < self._max_pending:
+            block = read_raw_block(self._in)
+            if not block:
+                self._eof = True
+                break
+            if self._comp_pos is not None:
+                self._blocks.append((self._comp_pos, self._usize))
+                self._comp_pos += len(block)
+                self._usize += _TRAILER.unpack_from(block, len(block) - _TRAILER.size)[1]
+            self._pending.append(self._pool.submit(decompress_block, block))
+
+    def block_offset(self, pos: int) -> Tuple[int, int]:
+        """Locate an uncompressed position in the compressed file.
+
+           Only the last blocks read are known, information about the
+           blocks before pos is discarded.
+
+        Parameters
+        ----------
+        pos
+            uncompressed position counted from the start of this reader,
+            at or after the position of earlier calls
+
+        Returns
+        -------
+        Tuple[int, int]
+            offset of the compressed block containing pos in the file and
+            the offset of pos in the uncompressed block
+        """
+        blocks = self._blocks
+        while len(blocks) > 1 and blocks[1][1] <= pos:
+            blocks.popleft()
+        if self._comp_pos is None or not blocks or blocks[0][1] > pos:
+            raise ValueError(f"position {pos} is not in the recently read blocks")
+        comp_pos, block_start = blocks[0]
+        return comp_pos, pos - block_start
+
+    def readinto(self, b) -> int:
+        while not self._data:
+            self._submit_blocks()
+            if not self._pending:
+                return 0
+            self._data = memoryview(self._pending.popleft().result())
+        n = min(len(b), len(self._data))
+        b[:n] = self._data[:n]
+        self._data = self._data[n:]
+        return n
+
+    def close(self):
+        if self.closed:
+            return
+        for fut in self._pending:
+            fut.cancel()
+        self._pending.clear()
+        self._pool.shutdown()
+        io.RawIOBase.close(self)
+        if self._close_fileobj:
+            self._in.close()
+
+
+def truncate(file_path: str, find_end: Callable[[bytes], int]) -> bytes:
+    """Cut a BGZF file after the end of its last complete record.
+
+       Incomplete blocks at the end of the file, eg. from a writer that was
+       killed, and the EOF marker are removed as well. The file can then be
+       continued by appending blocks.
+
+    Parameters
+    ----------
+    file_path
+        BGZF file, modified in place
+    find_end
+        function returning the position following the last complete record
+        in a buffer of uncompressed data or -1 if it contains none
+
+    Returns
+    -------
+    bytes
+        if the last record ends within a block that block is removed and
+        its data up to the end of the record is returned, it has to be
+        written again before appending
+    """
+    offsets = []
+    with io.open(file_path, "r+b") as f:
+        size = os.fstat(f.fileno()).st_size
+        pos = 0
+        while pos + _HEADER.size <= size:
+            f.seek(pos)
+            header = f.read(_HEADER.size)
+            if not is_bgzf_header(header):
+                raise IOError(f"Not a BGZF file, can not append: {file_path}")
+            bsize = struct.unpack_from("<H", header, 16)[0] + 1
+            if pos + bsize > size:
+                break
+            offsets.append(pos)
+            pos += bsize
+        offsets.append(pos)
+
+        # search backwards for the last record end
+        data = b""
+        sizes = deque()
+        cut, tail = 0, b""
+        for i in range(len(offsets) - 2, -1, -1):
+            f.seek(offsets[i])
+            block_data = decompress_block(f.read(offsets[i + 1] - offsets[i]))
+            data = block_data + data
+            sizes.appendleft(len(block_data))
+            end = find_end(data)
+            if end < 0:
+                continue
+            start = 0
+            for j, block_size in enumerate(sizes, i):
+                if end == start:
+                    cut = offsets[j]
+                    break
+                if end <= start + block_size:
+                    if end == start + block_size:
+                        cut = offsets[j + 1]
+                    else:
+                        cut, tail = offsets[j], data[start:end]
+                    break
+                start += block_size
+            break
+        f.truncate(cut)
+    return tail
+
+
+def open_input(fileobj: BinaryIO, threads: int = None,
+               close_fileobj: bool = True) -> BinaryIO:
+    """Open a gzip compressed binary stream for reading.
+
+       BGZF files are decompressed on multiple threads, other gzip files
+       sequentially with the gzip module.
+
+    Parameters
+    ----------
+    fileobj
+        binary stream of a gzip file, it must support peek() or seek()
+    threads
+        number of decompression threads, default: number of cpus
+    close_fileobj
+        if True fileobj is closed when the returned stream is closed
+    """
+    if hasattr(fileobj, "peek"):
+        header = fileobj.peek(_HEADER.size)[:_HEADER.size]
+    else:
+        pos = fileobj.tell()
+        header = fileobj.read(_HEADER.size)
+        fileobj.seek(pos)
+
+    if is_bgzf_header(header) and (threads is None or threads > 1):
+        return io.BufferedReader(BlockGzipReader(fileobj, threads, close_fileobj), 1 << 16)
+    if close_fileobj:
+        return _ClosingGzipFile(fileobj)
+    return gzip.GzipFile(fileobj=fileobj, mode="rb")
+
+
+def open_output(fileobj: BinaryIO, level: int = None, threads: int = None,
+                close_fileobj: bool = True) -> BinaryIO:
+    """Open a binary stream writing BGZF compressed data to fileobj.
+
+    Parameters
+    ----------
+    fileobj
+        binary output stream
+    level
+        zlib compression level 0-9, default 6
+    threads
+        number of compression threads, default: number of cpus
+    close_fileobj
+        if True fileobj is closed when the returned stream is closed
+    """
+    if level is None:
+        level = 6
+    return BlockGzipWriter(fileobj, level, threads, close_fileobj)
+
+
+class _ClosingGzipFile(gzip.GzipFile):
+    """GzipFile that also closes the wrapped file object."""
+
+    def __init__(self, fileobj):
+        gzip.GzipFile.__init__(self, fileobj=fileobj, mode="rb")
+        self._wrapped = fileobj
+
+    def close(self):
+        try:
+            gzip.GzipFile.close(self)
+        finally:
+            self._wrapped.close()
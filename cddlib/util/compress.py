@@ -0,0 +1,157 @@
+'''Open compressed binary streams by file extension.
+
+    .gz    BGZF (block gzip) compressed on multiple threads, see cddlib.util.bgzf
+    .zst   zstandard, compressed on multiple threads (pip install zstandard)
+    .lz4   lz4 frame format (pip install lz4)
+
+zstandard and lz4 are optional dependencies which are only imported when
+such a file is opened.
+'''
+
+import io
+from importlib import import_module
+from typing import BinaryIO, Optional
+
+from cddlib.util import bgzf
+
+COMPRESSIONS = ("gz", "zst", "lz4")
+"""Tuple[str]: supported compression file extensions."""
+
+DEFAULT_LEVELS = {"gz": 6, "zst": 3, "lz4": 0}
+
+
+def compression_of(file_path: str) -> Optional[str]:
+    """ gz, zst or lz4 if file_path has the corresponding extension else None """
+    ext = file_path.rsplit(".", 1)[-1].lower()
+    return ext if ext in COMPRESSIONS else None
+
+
+def strip_compression(file_path: str) -> str:
+    """ file_path without the compression extension, eg. a.sdf.zst -> a.sdf """
+    if compression_of(file_path) is None:
+        return file_path
+    return file_path.rsplit(".", 1)[0]
+
+
+def open_input(fileobj: BinaryIO, compression: str, threads: int = None,
+               close_fileobj: bool = True) -> BinaryIO:
+    """Open a binary stream decompressing fileobj.
+
+    Parameters
+    ----------
+    fileobj
+        binary input stream
+    compression
+        gz, zst or lz4
+    threads
+        number of decompression threads for BGZF files, zstandard and lz4
+        frames are decompressed sequentially
+    close_fileobj
+        if True fileobj is closed when the returned stream is closed
+    """
+    if compression == "gz":
+        return bgzf.open_input(fileobj, threads, close_fileobj)
+    if compression == "zst":
+        zstandard = _import_optional("zstandard", "zstandard")
+        reader = zstandard.ZstdDecompressor().stream_reader(fileobj, closefd=close_fileobj)
+        return io.BufferedReader(reader, 1 << 16)
+    if compression == "lz4":
+        lz4_frame = _import_optional("lz4.frame", "lz4")
+        return _FileClosingWrapper(lz4_frame.LZ4FrameFile(fileobj, "rb"),
+                                   fileobj if close_fileobj else None)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def open_output(fileobj: BinaryIO, compression: str, level: int = None,
+                threads: int = None, close_fileobj: bool = True) -> BinaryIO:
+    """Open a binary stream compressing data written to fileobj.
+
+    Parameters
+    ----------
+    fileobj
+        binary output stream
+    compression
+        gz, zst or lz4
+    level
+        compression level, default: 6 for gz, 3 for zst and 0 for lz4
+    threads
+        number of compression threads for gz and zst files,
+        default: number of cpus, 0 compresses in the calling thread
+    close_fileobj
+        if True fileobj is closed when the returned stream is closed
+
+    flush() on the returned stream does not end the current compressed
+    block, the data is only guaranteed to be written after close().
+    """
+    if level is None:
+        level = DEFAULT_LEVELS.get(compression)
+    if compression == "gz":
+        return bgzf.open_output(fileobj, level, threads, close_fileobj)
+    if threads is None:
+        threads = bgzf.default_threads()
+    if compression == "zst":
+        zstandard = _import_optional("zstandard", "zstandard")
+        writer = zstandard.ZstdCompressor(level=level, threads=threads) \
+            .stream_writer(fileobj, closefd=close_fileobj)
+        return _FileClosingWrapper(writer, None)
+    if compression == "lz4":
+        lz4_frame = _import_optional("lz4.frame", "lz4")
+        return _FileClosingWrapper(lz4_frame.LZ4FrameFile(fileobj, "wb", compression_level=level),
+                                   fileobj if close_fileobj else None)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+class _FileClosingWrapper(io.RawIOBase):
+    """Wraps a (de)compressing stream.
+
+       flush() is ignored so that frequent flushes, eg. by io.TextIOWrapper,
+       do not end compressed blocks. The wrapped file object is closed after
+       the stream if given.
+    """
+
+    def __init__(self, stream, fileobj: BinaryIO = None):
+        io.RawIOBase.__init__(self)
+        self._stream = stream
+        self._fileobj = fileobj
+
+    def readable(self) -> bool:
+        return self._stream.readable()
+
+    def writable(self) -> bool:
+        return self._stream.writable()
+
+    def readinto(self, b) -> int:
+        data = self._stream.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._stream.read(size)
+
+    def readline(self, size: int = -1) -> bytes:
+        return self._stream.readline(size)
+
+    def write(self, b) -> int:
+        self._stream.write(b)
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+        io.RawIOBase.close(self)
+        try:
+            self._stream.close()
+        finally:
+            if self._fileobj is not None:
+                self._fileobj.close()
+
+
+def _import_optional(module: str, package: str):
+    try:
+        return import_module(module)
+    except ModuleNotFoundError:
+        raise ModuleNotFoundError(f"{package} is required for this compression format:"
+                                  f" pip install {package}")
@@ -17,6 +17,12 @@ setup_requirements = ['pytest-runner', ]
 
 test_requirements = ['pytest', 'pytest-datadir']
 
+extras_requirements = {
+    'arrow': ['pyarrow'],
+    'zstd': ['zstandard'],
+    'lz4': ['lz4'],
+}
+
 setup(
     author="/",
     author_email='zheng.hao@gene.com',
@@ -35,6 +41,7 @@ setup(
         ],
     },
     install_requires=requirements,
+    extras_require=extras_requirements,
     long_description=readme + '\n\n' + history,
     include_package_data=True,
     keywords='cddlib',
@@ -0,0 +1,34 @@
+import gzip
+import pytest
+
+
+@pytest.fixture
+def smi_file(tmp_path):
+    """Factory writing a test file of n small molecules to tmp_path.
+
+       Line i holds the smiles of an alcohol with chain(i) carbons, the
+       title mol<i> (zero padded to 4 digits) and, if col2 is given, the
+       value col2(i). Names ending in .smi or .smi.gz are written directly,
+       other formats (eg. .sdf.gz or .cddb) are converted from a smiles file
+       with get_mol_output_stream.
+    """
+    def write(name: str, n: int, chain=lambda i: i % 5 + 1, col2=None) -> str:
+        from cddlib.chem.io import get_mol_input_stream, get_mol_output_stream
+
+        is_smi = name.endswith((".smi", ".smi.gz"))
+        smi = str(tmp_path/(name if is_smi else name + ".smi"))
+        opn = gzip.open if smi.endswith(".gz") else open
+        with opn(smi, "wt") as out:
+            for i in range(n):
+                extra = "" if col2 is None else f" {col2(i)}"
+                out.write(f"{'C' * chain(i)}O mol{i:04d}{extra}\n")
+        if is_smi:
+            return smi
+
+        fname = str(tmp_path/name)
+        with get_mol_input_stream(smi) as inf, get_mol_output_stream(fname) as out:
+            for mol in inf:
+                out.write_mol(mol)
+        return fname
+
+    return write
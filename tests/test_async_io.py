@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from cddlib.chem.io import get_mol_input_stream, get_mol_output_stream
+
+
+def test_async_write(shared_datadir, tmp_path):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    out_name = str(tmp_path/'out.sdf.gz')
+    with get_mol_input_stream(fname) as inf:
+        mols = list(inf)
+
+    with get_mol_output_stream(out_name, async_write=True, queue_size=2) as out:
+        for mol in mols:
+            out.write_mol(mol)
+        out.flush()
+        assert 1 <= out.high_water_mark <= 2
+
+    with get_mol_input_stream(out_name) as inf:
+        mols2 = list(inf)
+    assert len(mols2) == 5
+    np.testing.assert_almost_equal(mols2[4].coordinates, mols[4].coordinates)
+
+
+class _Failing(object):
+    def write_mol(self, mol):
+        raise IOError("disk full")
+
+    def close(self):
+        pass
+
+
+def test_async_error(shared_datadir):
+    from cddlib.chem.async_io import AsyncMolOutputStream
+    out = AsyncMolOutputStream(_Failing())
+    out.write_mol(None)
+    with pytest.raises(IOError):
+        out.flush()
+    with pytest.raises(IOError):
+        out.write_mol(None)
+    out.close()
+
+    out = AsyncMolOutputStream(_Failing())
+    out.write_mol(None)
+    with pytest.raises(IOError):
+        out.close()
+
+
+def test_prefetch(shared_datadir):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    with get_mol_input_stream(fname) as inf:
+        coords = [mol.coordinates for mol in inf]
+
+    with get_mol_input_stream(fname, prefetch=2) as inf:
+        coords2 = [mol.coordinates for mol in inf]
+        assert not inf.has_next()
+    np.testing.assert_almost_equal(np.array(coords2), np.array(coords))
+
+    # close before the end
+    with get_mol_input_stream(fname, prefetch=1) as inf:
+        assert inf.has_next()
+
+
+class _FailingInput(object):
+    file_path = "failing.sdf"
+
+    def __init__(self):
+        self.closed = False
+        self._mols = iter(["m1", "m2"])
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        mol = next(self._mols, None)
+        if mol is None:
+            raise ValueError("bad record")
+        return mol
+
+    def close(self):
+        self.closed = True
+
+
+def test_prefetch_error():
+    from cddlib.chem.async_io import PrefetchMolInputStream
+    in_stream = _FailingInput()
+    inf = PrefetchMolInputStream(in_stream, 5)
+    assert inf.__next__() == "m1"
+    assert inf.__next__() == "m2"
+    with pytest.raises(ValueError):
+        inf.has_next()
+    inf.close()
+    assert in_stream.closed
@@ -0,0 +1,26 @@
+import numpy as np
+from cddlib.chem.io import get_mol_input_stream
+
+
+def test_batches(shared_datadir):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    with get_mol_input_stream(fname) as inf:
+        coords = [mol.coordinates for mol in inf]
+
+    with get_mol_input_stream(fname) as inf:
+        batches = list(inf.batches(2, tags=["Total_energy", "missing"]))
+
+    assert [len(b) for b in batches] == [2, 2, 1]
+    b = batches[0]
+    assert b.coordinates.shape == (24, 3)
+    assert b.atomic_nums.sum() == 68
+    np.testing.assert_array_equal(b.atom_offsets, [0, 12, 24])
+    np.testing.assert_array_equal(b.num_atoms, [12, 12])
+    np.testing.assert_array_equal(b.mol_index[10:14], [0, 0, 1, 1])
+    np.testing.assert_almost_equal(b.mol_coordinates(1), coords[1])
+    np.testing.assert_almost_equal(batches[2].coordinates, coords[4])
+
+    assert b.tags["Total_energy"][0].strip() == "-6.4528"
+    assert b.tags["missing"][1] is None
+    assert np.isnan(b.tag_as_float("missing")).all()
+    np.testing.assert_almost_equal(b.tag_as_float("Total_energy")[0], -6.4528)
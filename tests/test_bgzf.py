@@ -0,0 +1,99 @@
+import gzip
+import io
+import os
+import pytest
+from cddlib.util import bgzf
+from cddlib.chem.io import get_mol_input_stream, get_mol_output_stream
+
+
+def test_roundtrip(tmp_path):
+    data = os.urandom(50000) + b"abc" * 100000
+    fname = str(tmp_path/'data.gz')
+    with bgzf.open_output(io.open(fname, "wb"), threads=3) as out:
+        out.write(data[:1000])
+        out.write(data[1000:])
+
+    with gzip.open(fname, "rb") as inf:
+        assert inf.read() == data
+
+    with bgzf.open_input(io.open(fname, "rb"), threads=3) as inf:
+        assert isinstance(inf.raw, bgzf.BlockGzipReader)
+        assert inf.read() == data
+
+
+def test_plain_gzip_input(tmp_path):
+    fname = str(tmp_path/'data.gz')
+    with gzip.open(fname, "wb") as out:
+        out.write(b"abc" * 1000)
+
+    with bgzf.open_input(io.open(fname, "rb")) as inf:
+        assert inf.read() == b"abc" * 1000
+
+
+def test_write_read_sdf_gz(shared_datadir, tmp_path):
+    fname = str(tmp_path/'out.sdf.gz')
+    with get_mol_input_stream(str(shared_datadir/'test_CCCO_confs.sdf')) as inf, \
+         get_mol_output_stream(fname, compress_threads=2) as out:
+        for mol in inf:
+            out.write_mol(mol)
+
+    with gzip.open(fname, "rb") as inf:
+        assert inf.read().count(b"$$$$") == 5
+
+    sm = 0.
+    with get_mol_input_stream(fname, decompress_threads=2) as inf:
+        for mol in inf:
+            sm += sum(at.atomic_num for at in mol.atoms)
+    assert 170 == sm
+
+
+def test_flush_keeps_blocks(tmp_path):
+    fname = str(tmp_path/'out.gz')
+    with bgzf.open_output(io.open(fname, "wb"), threads=2) as out:
+        for i in range(100):
+            out.write(b"line %d\n" % i)
+            out.flush()
+    n_blocks = 0
+    with io.open(fname, "rb") as in_s:
+        while bgzf.read_raw_block(in_s):
+            n_blocks += 1
+    assert n_blocks == 2    # data + eof
+
+
+def test_append_plain_gzip(shared_datadir, tmp_path):
+    fname = str(tmp_path/'out.sdf.gz')
+    with open(str(shared_datadir/'test_CCCO_confs.sdf'), "rb") as inf, \
+         gzip.open(fname, "wb") as out:
+        out.write(inf.read())
+    # plain gzip files are continued with a new gzip member
+    with get_mol_input_stream(str(shared_datadir/'C5.sdf')) as inf, \
+         get_mol_output_stream(fname, append=True) as out:
+        for mol in inf:
+            out.write_mol(mol)
+    with get_mol_input_stream(fname) as inf:
+        assert 6 == len(list(inf))
+
+
+@pytest.mark.parametrize("threads", [None, 1, 2])
+def test_write_read_sdf_gz_openeye(shared_datadir, tmp_path, threads):
+    pytest.importorskip("openeye.oechem")
+    from cddlib.chem.oechem.io import MolInputStream, MolOutputStream
+    fname = str(tmp_path/'out.sdf.gz')
+    with MolInputStream(str(shared_datadir/'test_CCCO_confs.sdf')) as inf, \
+         MolOutputStream(fname, compress_threads=threads) as out:
+        for mol in inf:
+            out.write_mol(mol)
+
+    with gzip.open(fname, "rb") as inf:
+        assert inf.read().count(b"$$$$") == 5
+    # oemolostream writes plain gzip, an explicit compress_threads the BGZF writer
+    assert bgzf.is_bgzf_file(fname) == (threads is not None)
+
+    with MolInputStream(fname) as inf:
+        assert 170 == sum(at.atomic_num for mol in inf for at in mol.atoms)
+
+    with MolOutputStream(fname, append=True) as out:
+        with MolInputStream(str(shared_datadir/'test_CCCO_confs.sdf')) as inf:
+            out.write_mol(next(inf))
+    with MolInputStream(fname) as inf:
+        assert 6 == len(list(inf))
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from cddlib.chem.io import get_mol_input_stream, get_mol_output_stream
+from cddlib.chem.cddb import CDDBMolInputStream
+
+
+def test_write_read(shared_datadir, tmp_path):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    out_name = str(tmp_path/'out.cddb')
+    with get_mol_input_stream(fname) as inf, \
+         get_mol_output_stream(out_name) as out:
+        expected = []
+        for mol in inf:
+            expected.append((mol.title, mol["Total_energy"], mol.coordinates))
+            out.write_mol(mol)
+
+    with get_mol_input_stream(out_name) as inf:
+        assert isinstance(inf, CDDBMolInputStream)
+        res = [(mol.title, mol["Total_energy"], mol.coordinates) for mol in inf]
+    assert len(res) == 5
+    for (tit, e, xyz), (etit, ee, exyz) in zip(res, expected):
+        assert (tit, e) == (etit, ee)
+        np.testing.assert_almost_equal(xyz, exyz)
+
+    with get_mol_input_stream(out_name, index=True) as inf:
+        assert len(inf) == 5
+        np.testing.assert_almost_equal(inf[3].coordinates, expected[3][2])
+        assert [m.title for m in inf[-2:]] == ["omega_1"] * 2
+        inf.seek(4)
+        assert len(list(inf)) == 1
+        with pytest.raises(IndexError):
+            inf[5]
+
+
+def test_unclosed(shared_datadir, tmp_path):
+    out_name = str(tmp_path/'out.cddb')
+    out = get_mol_output_stream(out_name)
+    with get_mol_input_stream(str(shared_datadir/'test_CCCO_confs.sdf')) as inf:
+        for mol in inf:
+            out.write_mol(mol)
+    out._out.flush()
+
+    with get_mol_input_stream(out_name) as inf:
+        assert len(list(inf)) == 5
+        with pytest.raises(TypeError):
+            len(inf)
+        with pytest.raises(ValueError):
+            inf[0]
+    out.close()
@@ -0,0 +1,104 @@
+import os
+import pytest
+from cddlib.chem.io import get_mol_input_stream, get_mol_output_stream
+from cddlib.chem.lazy_mol import LazyMolInputStream
+from cddlib.chem.checkpoint import CheckpointedRun, load_checkpoint
+
+
+def _titles(fname):
+    with get_mol_input_stream(fname) as inf:
+        return [mol.title for mol in inf]
+
+
+@pytest.mark.parametrize("threads", [None, 1])
+def test_position_resume(smi_file, threads):
+    fname = smi_file("in.sdf.gz", 2000)
+    with LazyMolInputStream(fname, decompress_threads=threads) as inf:
+        for _ in range(1234):
+            next(inf)
+        inf.has_next()
+        pos = inf.position()
+        rest = [mol.title for mol in inf]
+    assert pos["records"] == 1234
+    # the BGZF reader stores the block of the position
+    assert ("block" in pos) == (threads is None)
+
+    with LazyMolInputStream(fname, decompress_threads=threads) as inf:
+        inf.resume(pos)
+        assert [mol.title for mol in inf] == rest
+        assert inf.position()["records"] == 2000
+
+
+@pytest.mark.parametrize("in_name", ["in.sdf", "in.sdf.gz"])
+@pytest.mark.parametrize("out_name", ["out.sdf", "out.sdf.gz", "out.cddb"])
+def test_checkpointed_run(smi_file, tmp_path, in_name, out_name):
+    in_path = smi_file(in_name, 1000)
+    out_path = str(tmp_path/out_name)
+    ckpt = str(tmp_path/'job.json')
+
+    with pytest.raises(KeyboardInterrupt):
+        with CheckpointedRun(ckpt, in_path, out_path, every=300) as run:
+            for i, mol in enumerate(run):
+                run.out_stream.write_mol(mol)
+                if i == 700:
+                    raise KeyboardInterrupt()
+    assert load_checkpoint(ckpt)["input"]["records"] == 600
+
+    with CheckpointedRun(ckpt, in_path, out_path, every=300) as run:
+        assert run.resumed_at == 600
+        for mol in run:
+            run.out_stream.write_mol(mol)
+    assert not os.path.exists(ckpt)
+    assert _titles(out_path) == _titles(in_path)
+
+
+def test_checkpoint_other_files(smi_file, tmp_path):
+    in_path = smi_file("in.sdf", 10)
+    ckpt = str(tmp_path/'job.json')
+    with pytest.raises(KeyboardInterrupt):
+        with CheckpointedRun(ckpt, in_path, str(tmp_path/'out.sdf'), every=2) as run:
+            for i, mol in enumerate(run):
+                if i == 5:
+                    raise KeyboardInterrupt()
+    with pytest.raises(ValueError):
+        CheckpointedRun(ckpt, in_path, str(tmp_path/'other.sdf'))
+
+
+@pytest.mark.parametrize("out_name", ["out.sdf", "out.sdf.gz"])
+@pytest.mark.parametrize("synced", [True, False])
+def test_append_incomplete_record(smi_file, tmp_path, out_name, synced):
+    in_path = smi_file("in.sdf", 5)
+    out_path = str(tmp_path/out_name)
+    mols = list(get_mol_input_stream(in_path, lazy=True))
+
+    # writer killed while writing the 4th record
+    out = get_mol_output_stream(out_path)
+    for mol in mols[:3]:
+        out.write_mol(mol)
+    if synced:
+        out.sync()
+    out.write_sdf_record(mols[3].sdf_record()[:40])
+    out.sync()
+    with open(out_path, "rb") as in_s:
+        killed = in_s.read()
+    out.close()
+    with open(out_path, "wb") as f:
+        f.write(killed)
+
+    with get_mol_output_stream(out_path, append=True) as out:
+        for mol in mols[3:]:
+            out.write_mol(mol)
+    assert _titles(out_path) == [mol.title for mol in mols]
+
+
+def test_checkpoint_unsupported_stream(smi_file, tmp_path):
+    in_path = smi_file("in.sdf", 10)
+    ckpt = str(tmp_path/'job.json')
+    inf = get_mol_input_stream(in_path)
+    with pytest.raises(ValueError, match="MolInputStream .* does not support checkpoints"):
+        CheckpointedRun(ckpt, inf, str(tmp_path/'out.sdf'))
+
+    with CheckpointedRun(ckpt, get_mol_input_stream(in_path, lazy=True, instrument=True),
+                         every=3) as run:
+        assert len(list(run)) == 10
+        assert run.in_stream.stats()["records"] == 10
@@ -1,3 +1,4 @@
+import numpy as np
 from cddlib.chem import atom
 from cddlib.chem import mol
 from pytest import fixture
@@ -78,6 +79,47 @@ def test_mol_sd_properties_with_openeye(shared_datadir):
             ('Total_energy', '  -6.4528')])
 
     
+def test_mol_coordinates_with_openeye(shared_datadir):
+    ifs = oechem.oemolistream(str(shared_datadir / "test_CCCO_confs.sdf"))
+    new_mol = oechem.OEGraphMol()
+    oechem.OEReadMolecule(ifs, new_mol)
+    tk_mol = new_molecule_for_testing(new_mol)
+    xyz = tk_mol.coordinates
+    assert(xyz.shape == (12, 3))
+    assert(tk_mol.get_coordinates(np.float32).dtype == np.float32)
+    buf = np.zeros((14, 3), dtype=np.float32)
+    view = buf[1:13]
+    assert(tk_mol.get_coordinates(out=view) is view)
+    assert(np.allclose(buf[1:13], xyz, atol=1e-4))
+    assert(not buf[0].any() and not buf[13].any())
+
+    tk_mol.set_coordinates(xyz + 1.5)
+    assert(np.allclose(tk_mol.coordinates, xyz + 1.5))
+    tk_mol.coordinates = xyz.astype(np.float32)
+    assert(np.allclose(tk_mol.coordinates, xyz, atol=1e-4))
+    with raises(ValueError):
+        tk_mol.set_coordinates(xyz[:5])
+
+
+def test_binary_round_trip_conformers_with_openeye(shared_datadir):
+    mol_module = import_module("cddlib.chem.oechem.mol")
+    ifs = oechem.oemolistream(str(shared_datadir / "test_CCCO_confs.sdf"))
+    mols = [new_molecule_for_testing(oechem.OEGraphMol(m)) for m in ifs.GetOEGraphMols()]
+    merged = mol_module.merge_conformers(mols)
+
+    res = mol_module.from_binary(mol_module.to_binary(merged))
+    assert(res.num_conformers == 5)
+    assert(np.allclose(res.conformer_coordinates, merged.conformer_coordinates))
+    assert(res.title == "omega_1")
+
+    single = mol_module.from_binary(mol_module.to_binary(mols[0]))
+    assert(isinstance(single._mol, oechem.OEGraphMol))
+    assert(single.num_conformers == 1)
+    assert(np.allclose(single.coordinates, mols[0].coordinates))
+    assert(single.title == "omega_1")
+    assert(single["Total_energy"].strip() == "-6.4528")
+
+
 def new_molecule_for_testing(*args, **kwargs) -> BaseMol:
     """ To be used for testing only as the TOOLKIT global var needs to be set"""
     # TODO: think about making toolkit a parameter and removing global var
@@ -1,3 +1,4 @@
+import numpy as np
 from cddlib.chem import atom
 from cddlib.chem import mol
 from pytest import fixture
@@ -80,6 +81,27 @@ def test_mol_sd_properties_with_rdkit(shared_datadir):
 
 
 
+def test_mol_coordinates_with_rdkit(shared_datadir):
+    sdf_mol_supplier = Chem.SDMolSupplier(str(shared_datadir /
+                                              "test_CCCO_confs.sdf"), removeHs=False)
+    tk_mol = new_molecule_for_testing(sdf_mol_supplier[0])
+    xyz = tk_mol.coordinates
+    assert(xyz.shape == (12, 3))
+    assert(tk_mol.get_coordinates(np.float32).dtype == np.float32)
+    buf = np.zeros((14, 3), dtype=np.float32)
+    view = buf[1:13]
+    assert(tk_mol.get_coordinates(out=view) is view)
+    assert(np.allclose(buf[1:13], xyz, atol=1e-4))
+    assert(not buf[0].any() and not buf[13].any())
+
+    tk_mol.set_coordinates(xyz + 1.5)
+    assert(np.allclose(tk_mol.coordinates, xyz + 1.5))
+    tk_mol.coordinates = xyz.astype(np.float32)
+    assert(np.allclose(tk_mol.coordinates, xyz, atol=1e-4))
+    with raises(ValueError):
+        tk_mol.set_coordinates(xyz[:5])
+
+
 def new_molecule_for_testing(*args, **kwargs) -> BaseMol:
     """ To be used for testing only as the TOOLKIT global var needs to be set"""
     # TODO: think about making toolkit a parameter and removing global var
@@ -0,0 +1,54 @@
+import pytest
+from cddlib.chem.io import get_mol_input_stream
+from cddlib.chem.columnar import export_table
+
+pa = pytest.importorskip("pyarrow")
+
+
+def test_export_parquet(shared_datadir, tmp_path):
+    import pyarrow.parquet as pq
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    out_name = str(tmp_path/'out.parquet')
+    with get_mol_input_stream(fname) as inf:
+        assert 5 == export_table(inf, out_name, molblock=True, row_group_size=2)
+
+    pfile = pq.ParquetFile(out_name)
+    assert pfile.num_row_groups == 3
+    table = pfile.read()
+    assert table.column_names[:4] == ["title", "smiles", "num_atoms", "molblock"]
+    assert table.schema.field("Total_energy").type == pa.float64()
+    assert table.column("Total_energy").to_pylist()[0] == -6.4528
+    assert table.column("num_atoms").to_pylist() == [12] * 5
+    assert table.column("title").to_pylist()[0] == "omega_1"
+    assert table.column("molblock").to_pylist()[0].rstrip().endswith("M  END")
+
+
+def test_export_arrow(shared_datadir, tmp_path):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    out_name = str(tmp_path/'out.arrow')
+    with get_mol_input_stream(fname, lazy=True) as inf:
+        assert 5 == export_table(inf, out_name, tags=["MMFF Bond"], smiles=False,
+                                 num_atoms=False)
+
+    table = pa.ipc.open_file(out_name).read_all()
+    assert table.column_names == ["title", "MMFF Bond"]
+    assert table.column("MMFF Bond").to_pylist()[0] == 0.1421
+
+
+def test_export_tag_names(shared_datadir, tmp_path):
+    import pyarrow.parquet as pq
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    out_name = str(tmp_path/'out.parquet')
+    mols = list(get_mol_input_stream(fname, lazy=True))
+    mols[0]["title"] = "tagged"
+    with pytest.raises(ValueError, match="tag_prefix"):
+        export_table(mols, out_name)
+
+    mols[3]["late"] = "1"
+    with pytest.warns(UserWarning, match="late"):
+        assert 5 == export_table(mols, out_name, smiles=False, row_group_size=2,
+                                 tag_prefix="sd_")
+    table = pq.read_table(out_name)
+    assert table.column("title").to_pylist()[0] == "omega_1"
+    assert table.column("sd_title").to_pylist()[:2] == ["tagged", None]
+    assert "sd_late" not in table.column_names
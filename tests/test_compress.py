@@ -0,0 +1,50 @@
+import io
+import numpy as np
+import pytest
+from cddlib.chem.io import get_mol_input_stream, get_mol_output_stream
+from cddlib.util import compress
+
+
+@pytest.mark.parametrize("ext", ["zst", "lz4"])
+def test_roundtrip(ext, tmp_path):
+    pytest.importorskip({"zst": "zstandard", "lz4": "lz4"}[ext])
+    data = b"abc\n" * 100000
+    fname = str(tmp_path/('data.' + ext))
+    with compress.open_output(io.open(fname, "wb"), ext, level=1, threads=2) as out:
+        for i in range(0, len(data), 1000):
+            out.write(data[i:i + 1000])
+            out.flush()
+    with compress.open_input(io.open(fname, "rb"), ext) as inf:
+        assert inf.read() == data
+
+
+@pytest.mark.parametrize("ext", ["sdf.zst", "sdf.lz4"])
+@pytest.mark.parametrize("lazy", [False, True])
+def test_mol_streams(shared_datadir, tmp_path, ext, lazy):
+    pytest.importorskip({"sdf.zst": "zstandard", "sdf.lz4": "lz4"}[ext])
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    out_name = str(tmp_path/('out.' + ext))
+    with get_mol_input_stream(fname, lazy=lazy) as inf, \
+         get_mol_output_stream(out_name, compress_level=5) as out:
+        coords = []
+        for mol in inf:
+            coords.append(mol.coordinates)
+            out.write_mol(mol)
+
+    with get_mol_input_stream(out_name) as inf:
+        coords2 = [mol.coordinates for mol in inf]
+    np.testing.assert_almost_equal(np.array(coords2), np.array(coords))
+
+
+def test_smiles_zst(tmp_path):
+    pytest.importorskip("zstandard")
+    in_name = str(tmp_path/'in.smi')
+    with open(in_name, "wt") as out:
+        out.write("CCO eth\nCCCO prop\n")
+    fname = str(tmp_path/'test.smi.zst')
+    with get_mol_input_stream(in_name) as inf, \
+         get_mol_output_stream(fname) as out:
+        for mol in inf:
+            out.write_mol(mol)
+    with get_mol_input_stream(fname) as inf:
+        assert [mol.title for mol in inf] == ["eth", "prop"]
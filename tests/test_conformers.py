@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from cddlib.chem.io import get_mol_input_stream, get_mol_output_stream
+
+
+@pytest.mark.parametrize("group_by,lazy", [("title", False), ("connection_table", False),
+                                           ("title", True)])
+def test_group_conformers(shared_datadir, group_by, lazy):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    with get_mol_input_stream(fname) as inf:
+        coords = np.array([mol.coordinates for mol in inf])
+
+    with get_mol_input_stream(fname, group_conformers=group_by, lazy=lazy) as inf:
+        mols = list(inf)
+    assert len(mols) == 1
+    mol = mols[0]
+    assert mol.num_conformers == 5
+    assert mol.title == "omega_1"
+    assert float(mol["Total_energy"]) == -6.4528
+    xyz = mol.conformer_coordinates
+    assert xyz.shape == (5, 12, 3)
+    np.testing.assert_almost_equal(xyz, coords)
+
+
+def test_group_conformers_distinct(shared_datadir):
+    fname = str(shared_datadir/'C5.sdf')
+    with get_mol_input_stream(fname, group_conformers="title") as inf:
+        mols = list(inf)
+    assert len(mols) == 1
+    assert mols[0].num_conformers == 1
+    assert mols[0].conformer_coordinates.shape == (1, mols[0].num_atoms, 3)
+
+    with pytest.raises(ValueError):
+        get_mol_input_stream(fname, group_conformers="smiles")
+
+
+def test_group_by_title_lazy(shared_datadir, tmp_path):
+    fname = str(tmp_path/'two.sdf')
+    with open(str(shared_datadir/'test_CCCO_confs.sdf'), "rb") as in_s, \
+         open(str(shared_datadir/'C5.sdf'), "rb") as c5, open(fname, "wb") as out:
+        out.write(c5.read() + in_s.read())
+    with get_mol_input_stream(fname, group_conformers="title", lazy=True) as inf:
+        single = next(inf)
+        # single record groups are not parsed to compare the title
+        assert not single.is_parsed
+        assert next(inf).num_conformers == 5
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_set_conformer_coordinates(shared_datadir, tmp_path, lazy):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    with get_mol_input_stream(fname, group_conformers="title") as inf:
+        xyz = next(inf).conformer_coordinates
+    with get_mol_input_stream(fname, lazy=lazy) as inf:
+        mol = next(inf)
+    assert mol.num_conformers == 1
+
+    mol.conformer_coordinates = xyz[:3]
+    assert mol.num_conformers == 3
+    np.testing.assert_almost_equal(mol.conformer_coordinates, xyz[:3])
+    np.testing.assert_almost_equal(mol.coordinates, xyz[0])
+
+    out = np.zeros((3, 12, 3), dtype=np.float32)
+    assert mol.get_conformer_coordinates(out=out) is out
+    np.testing.assert_almost_equal(out, xyz[:3], decimal=4)
+    assert mol.get_conformer_coordinates(np.float32).dtype == np.float32
+
+    mol.set_conformer_coordinates(xyz[1:2] + 1.)
+    assert mol.num_conformers == 1
+    np.testing.assert_almost_equal(mol.coordinates, xyz[1] + 1.)
+
+    with pytest.raises(ValueError):
+        mol.set_conformer_coordinates(xyz[:, :5])
+    with pytest.raises(ValueError):
+        mol.get_conformer_coordinates(out=out)
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_group_by_title_distinct_molecules(tmp_path, lazy):
+    smi = str(tmp_path/'in.smi')
+    with open(smi, "wt") as out:
+        # blank titles, and equal titles with equal atom counts but other atoms
+        out.write("CCO\nCCCN\nCCO\nCCO x\nCCN x\n")
+    fname = str(tmp_path/'in.sdf')
+    with get_mol_input_stream(smi) as inf, get_mol_output_stream(fname) as out:
+        for mol in inf:
+            out.write_mol(mol)
+
+    with get_mol_input_stream(fname, group_conformers="title", lazy=lazy) as inf:
+        mols = list(inf)
+    assert [mol.num_conformers for mol in mols] == [1] * 5
+    assert [mol.num_atoms for mol in mols] == [3, 4, 3, 3, 3]
@@ -0,0 +1,89 @@
+import random
+import numpy as np
+import pytest
+from cddlib.chem.io import get_mol_input_stream
+from cddlib.chem.dedup import DedupMolInputStream, BloomFilter, \
+    _HashSet, _merge_runs, _MERGE_FANOUT
+
+
+def _write_smi(smi_file, n):
+    rng = random.Random(42)
+    return smi_file('test.smi', n, chain=lambda i: rng.randint(1, 29),
+                    col2=lambda i: rng.random())
+
+
+@pytest.mark.parametrize("hash_bits,memory_bytes,bloom", [(128, 1 << 20, None),
+                                                          (64, 500, None),
+                                                          (128, 500, 100)])
+def test_keep_first(smi_file, hash_bits, memory_bytes, bloom):
+    fname = _write_smi(smi_file, 300)
+    with get_mol_input_stream(fname) as inf:
+        expected = {}
+        for mol in inf:
+            expected.setdefault(mol.canonical_smiles, mol.title)
+
+    with DedupMolInputStream(get_mol_input_stream(fname), hash_bits=hash_bits,
+                             memory_bytes=memory_bytes, bloom_capacity=bloom) as inf:
+        titles = [mol.title for mol in inf]
+        assert inf.num_read == 300
+        assert inf.num_duplicates == 300 - len(expected)
+    assert titles == list(expected.values())
+
+
+@pytest.mark.parametrize("best", ["min", "max"])
+def test_keep_best(smi_file, best):
+    fname = _write_smi(smi_file, 300)
+    choose = min if best == "min" else max
+    with get_mol_input_stream(fname) as inf:
+        groups = {}
+        for mol in inf:
+            groups.setdefault(mol.canonical_smiles, []).append((float(mol["col2"]), mol.title))
+    expected = sorted(choose(g)[1] for g in groups.values())
+
+    with DedupMolInputStream(get_mol_input_stream(fname), policy="best", best_tag="col2",
+                             best=best, memory_bytes=1000) as inf:
+        titles = [mol.title for mol in inf]
+    assert sorted(titles) == expected
+    # input order
+    assert titles == sorted(titles, key=lambda t: int(t[3:]))
+
+
+def test_keep_best_ties(shared_datadir):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    with DedupMolInputStream(get_mol_input_stream(fname), policy="best",
+                             best_tag="Total_energy", best="max") as inf:
+        mols = list(inf)
+    assert len(mols) == 1
+    assert float(mols[0]["MMFF VdW"]) == pytest.approx(float(_nth(fname, 3)["MMFF VdW"]))
+
+
+def _nth(fname, i):
+    with get_mol_input_stream(fname) as inf:
+        return list(inf)[i]
+
+
+def test_bloom():
+    bloom = BloomFilter(1000)
+    assert not bloom.add(b"0123456789abcdef")
+    assert bloom.add(b"0123456789abcdef")
+
+
+def test_merge_runs(tmp_path):
+    rng = np.random.default_rng(3)
+    values = rng.permutation(10000).astype("S8")
+    runs = [np.sort(part) for part in np.array_split(values, 5)]
+    runs.append(values[:0])
+    path = str(tmp_path/'merged.npy')
+    _merge_runs(runs, path, chunk=100)
+    np.testing.assert_array_equal(np.load(path), np.sort(values))
+
+
+def test_hash_set_levels(tmp_path):
+    hashes = _HashSet(16, 2000, str(tmp_path))
+    digests = [i.to_bytes(16, "little") for i in range(5000)]
+    assert not any(hashes.add(d) for d in digests)
+    assert hashes.memory_bytes < 2000
+    # 5000 hashes in runs of < 50 merged by levels
+    assert 1 < hashes.num_runs < 3 * _MERGE_FANOUT
+    assert all(hashes.add(d) for d in digests[::7])
+    assert not hashes.add((5000).to_bytes(16, "little"))
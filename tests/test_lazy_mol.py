@@ -0,0 +1,56 @@
+import gzip
+import numpy as np
+from cddlib.chem.io import get_mol_input_stream, get_mol_output_stream
+
+
+def test_lazy_tags(shared_datadir):
+    with get_mol_input_stream(str(shared_datadir/'test_CCCO_confs.sdf'), lazy=True) as inf:
+        mols = list(inf)
+
+    assert 5 == len(mols)
+    mol = mols[0]
+    assert mol.title == "omega_1"
+    assert mol["Total_energy"].strip() == "-6.4528"
+    assert "MMFF Bond" in mol
+    assert mol.keys() == ("MMFF VdW", "MMFF Bond", "MMFF Bend", "MMFF StretchBend",
+                          "MMFF Torsion", "Sheffield Solvation",
+                          "Ligand MMFF Intramol. Energy", "Total_energy")
+    assert not mol.is_parsed
+
+    assert mol.num_atoms == 12
+    assert mol.is_parsed
+    assert sum(mol.atom_types) == 34
+
+
+def test_lazy_passthrough(shared_datadir, tmp_path):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    out_name = str(tmp_path/'out.sdf')
+    with get_mol_input_stream(fname, lazy=True) as inf, \
+         get_mol_output_stream(out_name) as out:
+        for mol in inf:
+            out.write_mol(mol)
+    assert open(out_name, "rb").read() == open(fname, "rb").read()
+
+
+def test_lazy_modified(shared_datadir, tmp_path):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    out_name = str(tmp_path/'out.sdf.gz')
+    with get_mol_input_stream(fname, lazy=True) as inf, \
+         get_mol_output_stream(out_name) as out:
+        for i, mol in enumerate(inf):
+            mol["idx"] = i
+            if i == 2:
+                mol.coordinates = mol.coordinates + 1.
+            out.write_mol(mol)
+
+    with gzip.open(out_name, "rb") as inf:
+        assert inf.read().count(b"$$$$") == 5
+
+    with get_mol_input_stream(fname) as inf:
+        coords = [mol.coordinates for mol in inf]
+    with get_mol_input_stream(out_name, lazy=True) as inf:
+        for i, mol in enumerate(inf):
+            assert mol["idx"] == str(i)
+            assert mol["Total_energy"].strip() != ""
+            delta = 1. if i == 2 else 0.
+            np.testing.assert_almost_equal(mol.coordinates, coords[i] + delta, 4)
@@ -0,0 +1,54 @@
+import numpy as np
+from cddlib.chem.io import get_mol_input_stream
+from cddlib.chem.sdf import SDFileMap
+
+
+def test_records(shared_datadir):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    fmap = SDFileMap(fname)
+    recs = [bytes(r) for r in fmap.records()]
+    fmap.close()
+    assert 5 == len(recs)
+    assert b"".join(recs) == open(fname, "rb").read()
+    assert all(r.startswith(b"omega_1") for r in recs)
+
+
+def test_chunks(shared_datadir):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    fmap = SDFileMap(fname)
+    rec_len = len(next(fmap.records()))
+    chunks = [bytes(c) for c in fmap.chunks(chunk_bytes=rec_len + 1)]
+    fmap.close()
+    assert 3 == len(chunks)
+    assert b"".join(chunks) == open(fname, "rb").read()
+    assert all(c.rstrip().endswith(b"$$$$") for c in chunks)
+
+
+def test_read_small_chunks(shared_datadir):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    with get_mol_input_stream(fname, use_mmap=True, chunk_bytes=100) as inf:
+        energies = [mol["Total_energy"] for mol in inf]
+    with get_mol_input_stream(fname) as inf:
+        assert energies == [mol["Total_energy"] for mol in inf]
+
+
+def test_read(shared_datadir):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    with get_mol_input_stream(fname) as inf:
+        expected = [(mol.title, mol["Total_energy"], mol.coordinates) for mol in inf]
+
+    with get_mol_input_stream(fname, use_mmap=True) as inf:
+        res = [(mol.title, mol["Total_energy"], mol.coordinates) for mol in inf]
+
+    assert len(res) == len(expected)
+    for (tit, e, xyz), (etit, ee, exyz) in zip(res, expected):
+        assert (tit, e) == (etit, ee)
+        np.testing.assert_almost_equal(xyz, exyz)
+
+
+def test_readC5(shared_datadir):
+    sm = 0.
+    with get_mol_input_stream(str(shared_datadir/'C5.sdf'), use_mmap=True) as inf:
+        for mol in inf:
+            sm += sum(at.atomic_num for at in mol.atoms)
+    assert 11 == sm
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from cddlib.chem.io import get_mol_input_stream, MemMolStream
+from cddlib.chem.mol import BaseMol
+from cddlib.chem.mol_store import MolStore
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_mol_store(shared_datadir, lazy):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    with get_mol_input_stream(fname, lazy=lazy) as inf:
+        store = MolStore(inf)
+    energies = [float(mol["Total_energy"]) for mol in get_mol_input_stream(fname)]
+
+    assert len(store) == 5
+    assert isinstance(store[0], BaseMol)
+    assert store[0].num_atoms == 12
+    assert float(store[-1]["Total_energy"]) == energies[-1]
+    # repeated iteration
+    assert [float(m["Total_energy"]) for m in store] == energies
+    assert [float(m["Total_energy"]) for m in store] == energies
+
+    part = store[1:4]
+    assert [float(m["Total_energy"]) for m in part] == energies[1:4]
+    assert [float(m["Total_energy"]) for m in store[::2]] == energies[::2]
+    assert len(store[3:1]) == 0
+
+    mask = np.array(energies) < -6.1
+    selected = store[mask]
+    assert [float(m["Total_energy"]) for m in selected] == list(np.array(energies)[mask])
+    assert [float(m["Total_energy"]) for m in store[[4, 0]]] == [energies[4], energies[0]]
+
+    store.add_mol(store[0])
+    assert len(store) == 6
+    assert len(part) == 3
+    with pytest.raises(IndexError):
+        store[6]
+    with pytest.raises(IndexError):
+        store[mask]
+
+
+def test_mem_mol_stream_default():
+    s1 = MemMolStream()
+    s1.add_mol("x")
+    assert not MemMolStream().has_next()
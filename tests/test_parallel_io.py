@@ -0,0 +1,76 @@
+import gzip
+import numpy as np
+import pytest
+from cddlib.chem.io import get_mol_input_stream
+from cddlib.chem.sdf import iter_record_chunks
+
+
+def _read_all(file_path, **kwargs):
+    with get_mol_input_stream(file_path, **kwargs) as inf:
+        return [(mol.title, mol.num_atoms, mol.coordinates, mol["Total_energy"])
+                for mol in inf]
+
+
+def test_record_chunks(shared_datadir):
+    with open(str(shared_datadir/'test_CCCO_confs.sdf'), "rb") as inf:
+        txt = inf.read()
+        inf.seek(0)
+        chunks = list(iter_record_chunks(inf, 100))
+    assert b"".join(chunks) == txt
+    assert 5 == len(chunks)
+    assert all(c.rstrip().endswith(b"$$$$") for c in chunks)
+
+
+def test_parallel_read(shared_datadir):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    expected = _read_all(fname)
+    res = _read_all(fname, workers=2, chunk_bytes=3000)
+
+    assert len(expected) == len(res) == 5
+    for (tit, nat, xyz, e), (etit, enat, exyz, ee) in zip(res, expected):
+        assert (tit, nat, e) == (etit, enat, ee)
+        np.testing.assert_almost_equal(xyz, exyz)
+
+
+def test_parallel_read_gz(shared_datadir, tmp_path):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    gzname = str(tmp_path/'test_CCCO_confs.sdf.gz')
+    with open(fname, "rb") as inf, gzip.open(gzname, "wb") as out:
+        out.write(inf.read())
+
+    sm = 0.
+    with get_mol_input_stream(gzname, workers=2, chunk_bytes=100) as inf:
+        for mol in inf:
+            sm += sum(at.atomic_num for at in mol.atoms)
+    assert 170 == sm
+
+
+def test_conflicting_readers(shared_datadir):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    with pytest.raises(ValueError, match="workers and lazy"):
+        get_mol_input_stream(fname, workers=8, lazy=True)
+    with pytest.raises(ValueError, match="use_mmap and lazy"):
+        get_mol_input_stream(fname, use_mmap=True, lazy=True)
+    with pytest.raises(ValueError, match="sample"):
+        get_mol_input_stream(fname, workers=2, sample=2)
+    with pytest.raises(ValueError, match="cddb"):
+        get_mol_input_stream("x.cddb", use_mmap=True, prefetch=10)
+    # workers=1 is the default single process reader
+    with get_mol_input_stream(fname, workers=1, lazy=True) as inf:
+        assert 5 == len(list(inf))
+
+
+def test_parallel_seek_record_number(shared_datadir, tmp_path):
+    with open(str(shared_datadir/'test_CCCO_confs.sdf'), "rb") as inf:
+        records = inf.read().split(b"$$$$\n")[:-1]
+    # bond to a missing atom in the fourth record
+    records[3] = records[3].replace(b"\n  1  2  1", b"\n  1 99  1", 1)
+    fname = str(tmp_path/'broken.sdf')
+    with open(fname, "wb") as out:
+        out.write(b"".join(r + b"$$$$\n" for r in records))
+
+    with get_mol_input_stream(fname, workers=2, index=True) as inf:
+        inf.seek(2)
+        next(inf)
+        with pytest.raises(ValueError, match="record 4 of"):
+            next(inf)
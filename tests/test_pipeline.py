@@ -0,0 +1,56 @@
+import pytest
+from cddlib.chem.io import get_mol_input_stream, get_mol_output_stream
+from cddlib.chem.pipeline import parallel_map, WorkerError
+
+
+def _add_index(mol):
+    mol["num_atoms"] = mol.num_atoms
+    return mol
+
+
+def _duplicate_high(mol):
+    if float(mol["Total_energy"]) > -6.1:
+        return [mol, mol]
+    return None
+
+
+def _fail_on_third(mol):
+    if mol["Total_energy"].strip() == "-6.1650":
+        raise ValueError("bad molecule")
+    return mol
+
+
+@pytest.mark.parametrize("workers,lazy", [(1, False), (2, False), (2, True)])
+def test_parallel_map(shared_datadir, tmp_path, workers, lazy):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    out_name = str(tmp_path/'out.sdf')
+    with get_mol_input_stream(fname, lazy=lazy) as inf, \
+         get_mol_output_stream(out_name) as out:
+        assert 5 == parallel_map(_add_index, inf, out, workers=workers, chunk=2)
+
+    with get_mol_input_stream(fname) as inf:
+        energies = [mol["Total_energy"] for mol in inf]
+    with get_mol_input_stream(out_name) as inf:
+        mols = list(inf)
+    assert [mol["Total_energy"] for mol in mols] == energies
+    assert all(mol["num_atoms"] == "12" for mol in mols)
+
+
+def test_parallel_map_many(shared_datadir, tmp_path):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    out_name = str(tmp_path/'out.sdf')
+    with get_mol_input_stream(fname) as inf, \
+         get_mol_output_stream(out_name) as out:
+        assert 4 == parallel_map(_duplicate_high, inf, out, workers=2, chunk=1)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parallel_map_error(shared_datadir, tmp_path, workers):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    with get_mol_input_stream(fname) as inf, \
+         get_mol_output_stream(str(tmp_path/'out.sdf')) as out:
+        with pytest.raises(WorkerError) as err:
+            parallel_map(_fail_on_third, inf, out, workers=workers, chunk=2)
+    assert err.value.record_index == 2
+    assert "bad molecule" in str(err.value)
+    assert str(err.value).count("failed on record") == 1
@@ -41,3 +41,40 @@ def test_readC5(shared_datadir):
         for at in atms:
             sm += at.atomic_num
     assert 11 == sm
+
+
+@pytest.mark.parametrize("name", ['test.smi', 'test.smi.gz'])
+def test_read_smiles(smi_file, name):
+    fname = smi_file(name, 1000, col2=str)
+    with MolInputStream(fname, parse_threads=3, chunk_bytes=100) as inf:
+        mols = list(inf)
+    assert len(mols) == 1000
+    assert [mol.title for mol in mols[:3]] == ["mol0000", "mol0001", "mol0002"]
+    assert mols[7]["col2"] == "7"
+    assert mols[7].num_atoms == 4
+
+
+def test_read_smiles_error(tmp_path):
+    fname = str(tmp_path/'test.smi')
+    with open(fname, "wt") as out:
+        out.write("CCO\n\nc1ccc\nCC\n")
+    with MolInputStream(fname) as inf:
+        with pytest.raises(ValueError, match=":3:"):
+            list(inf)
+
+
+@pytest.mark.parametrize("name", ['out.smi', 'out.smi.gz'])
+def test_smiles_round_trip(shared_datadir, tmp_path, name):
+    from cddlib.chem.io import get_mol_input_stream, get_mol_output_stream
+    fname = str(tmp_path/name)
+    with get_mol_input_stream(str(shared_datadir/'test_CCCO_confs.sdf')) as inf, \
+         get_mol_output_stream(fname) as out:
+        titles = []
+        for mol in inf:
+            titles.append(mol.title)
+            out.write_mol(mol)
+    with get_mol_input_stream(fname) as inf:
+        mols = list(inf)
+    assert [mol.title for mol in mols] == titles
+    assert len(mols) == 5
+    assert mols[0].num_atoms == 12
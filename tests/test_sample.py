@@ -0,0 +1,62 @@
+import random
+import pytest
+from cddlib.chem.io import get_mol_input_stream
+from cddlib.chem.sample import reservoir_sample, bernoulli_sample
+
+
+def _titles(fname, **kwargs):
+    with get_mol_input_stream(fname, **kwargs) as inf:
+        return [mol.title for mol in inf]
+
+
+@pytest.mark.parametrize("name,index", [("in.sdf", False), ("in.sdf", True),
+                                        ("in.sdf.gz", False), ("in.cddb", False),
+                                        ("in.smi", False)])
+def test_reservoir(smi_file, name, index):
+    fname = smi_file(name, 300)
+    sample = _titles(fname, sample=25, seed=3, index=index)
+    assert len(sample) == 25
+    assert len(set(sample)) == 25
+    assert sample == sorted(sample)
+    assert sample == _titles(fname, sample=25, seed=3, index=index)
+    assert sample != _titles(fname, sample=25, seed=4, index=index)
+
+    assert _titles(fname, sample=1000, index=index) == _titles(fname)
+
+
+@pytest.mark.parametrize("name,index", [("in.sdf", False), ("in.sdf", True),
+                                        ("in.cddb", False)])
+def test_bernoulli(smi_file, name, index):
+    fname = smi_file(name, 1000)
+    sample = _titles(fname, sample_fraction=0.1, seed=5, index=index)
+    assert 50 < len(sample) < 150
+    assert sample == sorted(sample)
+    # random access and record scan select the same records
+    assert sample == _titles(smi_file("scan.sdf.gz", 1000),
+                             sample_fraction=0.1, seed=5)
+
+    assert _titles(fname, sample_fraction=0., index=index) == []
+    assert _titles(fname, sample_fraction=1., index=index) == _titles(fname)
+
+
+def test_sample_arguments(smi_file):
+    fname = smi_file("in.sdf", 10)
+    with pytest.raises(ValueError):
+        get_mol_input_stream(fname, sample=2, sample_fraction=.5)
+    with pytest.raises(ValueError):
+        get_mol_input_stream(fname, sample_fraction=1.5)
+
+
+def test_reservoir_uniform():
+    rng = random.Random(11)
+    counts = [0] * 10
+    for _ in range(3000):
+        for pos, _ in reservoir_sample(range(10), 3, rng):
+            counts[pos] += 1
+    assert all(800 < c < 1000 for c in counts)
+
+    counts = [0] * 10
+    for _ in range(3000):
+        for item in bernoulli_sample(range(10), 0.3, rng):
+            counts[item] += 1
+    assert all(800 < c < 1000 for c in counts)
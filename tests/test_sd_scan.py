@@ -0,0 +1,45 @@
+import pytest
+from cddlib.chem.io import get_mol_input_stream, get_mol_output_stream
+from cddlib.chem.sd_scan import Condition, SDDataScanner, copy_ranges
+
+
+def test_condition():
+    cond = Condition.parse("MMFF VdW <= 1.5")
+    assert cond.tag == "MMFF VdW"
+    assert cond({"MMFF VdW": " 1.2"})
+    assert not cond({"MMFF VdW": "abc"})
+    assert not cond({"MMFF VdW": None})
+    assert Condition.parse("ID == a 1")({"ID": " a 1 "})
+    with pytest.raises(ValueError):
+        Condition.parse("ID")
+
+
+def test_values(shared_datadir):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    with get_mol_input_stream(fname) as inf:
+        expected = [mol["Total_energy"] for mol in inf]
+
+    scanner = SDDataScanner(fname, tags=["Total_energy", "missing"])
+    vals = list(scanner.values())
+    assert [v["Total_energy"] for v in vals] == expected
+    assert all(v["missing"] is None for v in vals)
+
+    scanner = SDDataScanner(fname, tags=["Total_energy"],
+                            where=["Total_energy < -6.2", lambda v: v["MMFF VdW"] is not None],
+                            extra_tags=["MMFF VdW"])
+    assert [v["Total_energy"] for v in scanner.values()] == \
+        [e for e in expected if float(e) < -6.2]
+
+
+def test_copy_ranges(shared_datadir, tmp_path):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    out_name = str(tmp_path/'out.sdf')
+    scanner = SDDataScanner(fname, where=["Total_energy < -6.2"])
+    ranges = list(scanner.ranges())
+    assert len(ranges) == 2
+    with get_mol_output_stream(out_name) as out:
+        assert copy_ranges(fname, ranges, out) == len(ranges)
+
+    assert open(out_name, "rb").read() == b"".join(scanner.records())
+    with get_mol_input_stream(out_name) as inf:
+        assert all(float(mol["Total_energy"]) < -6.2 for mol in inf)
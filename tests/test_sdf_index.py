@@ -0,0 +1,80 @@
+import io
+import os
+import shutil
+import numpy as np
+import pytest
+from cddlib.chem.io import get_mol_input_stream
+from cddlib.chem.sdf_index import SDFIndex, INDEX_SUFFIX
+
+
+@pytest.fixture
+def sdf_copy(shared_datadir, tmp_path):
+    fname = str(tmp_path/'test_CCCO_confs.sdf')
+    shutil.copy(str(shared_datadir/'test_CCCO_confs.sdf'), fname)
+    return fname
+
+
+def test_index(sdf_copy):
+    idx = SDFIndex.open(sdf_copy)
+    assert len(idx) == 5
+    assert os.path.exists(sdf_copy + INDEX_SUFFIX)
+    assert idx.offsets[-1] == os.path.getsize(sdf_copy)
+
+    idx2 = SDFIndex.load(sdf_copy, sdf_copy + INDEX_SUFFIX)
+    np.testing.assert_array_equal(idx.offsets, idx2.offsets)
+
+    with open(sdf_copy, "ab") as out:
+        out.write(open(sdf_copy, "rb").read())
+    assert not idx.is_valid()
+    assert SDFIndex.load(sdf_copy, sdf_copy + INDEX_SUFFIX) is None
+    assert len(SDFIndex.open(sdf_copy)) == 10
+
+
+def test_len_requires_index(sdf_copy):
+    with get_mol_input_stream(sdf_copy) as inf:
+        with pytest.raises(TypeError):
+            len(inf)
+        assert 5 == len(list(inf))
+    assert not os.path.exists(sdf_copy + INDEX_SUFFIX)
+
+
+def test_random_access(sdf_copy):
+    with get_mol_input_stream(sdf_copy) as inf:
+        coords = [mol.coordinates for mol in inf]
+
+    with get_mol_input_stream(sdf_copy, index=True) as inf:
+        assert len(inf) == 5
+        np.testing.assert_almost_equal(inf[3].coordinates, coords[3])
+        np.testing.assert_almost_equal(inf[-1].coordinates, coords[4])
+        sl = inf[1:4]
+        assert len(sl) == 3
+        np.testing.assert_almost_equal(sl[2].coordinates, coords[3])
+        assert len(inf[::2]) == 3
+        with pytest.raises(IndexError):
+            inf[5]
+
+        inf.seek(2)
+        rest = [mol.coordinates for mol in inf]
+        assert len(rest) == 3
+        np.testing.assert_almost_equal(rest[0], coords[2])
+
+        inf.seek(0)
+        assert inf.has_next()
+        np.testing.assert_almost_equal(inf.__next__().coordinates, coords[0])
+
+
+def test_parallel_seek(sdf_copy):
+    with get_mol_input_stream(sdf_copy, workers=2, chunk_bytes=100) as inf:
+        inf.seek(3)
+        assert 2 == len(list(inf))
+
+
+def test_unsupported(sdf_copy):
+    with get_mol_input_stream(sdf_copy) as inf:
+        with pytest.raises(io.UnsupportedOperation, match="MolInputStream"):
+            inf.position()
+        with pytest.raises(io.UnsupportedOperation):
+            inf.resume({})
+    with get_mol_input_stream(sdf_copy, group_conformers="title") as inf:
+        with pytest.raises(io.UnsupportedOperation, match="ConformerGroupInputStream"):
+            inf.seek(1)
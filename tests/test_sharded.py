@@ -0,0 +1,66 @@
+import json
+import pytest
+from cddlib.chem.io import get_mol_input_stream, get_mol_output_stream
+
+
+def _read_energies(fname):
+    with get_mol_input_stream(fname) as inf:
+        return [mol["Total_energy"] for mol in inf]
+
+
+def _write(shared_datadir, template, **kwargs):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    with get_mol_input_stream(fname) as inf, \
+         get_mol_output_stream(template, **kwargs) as out:
+        for mol in inf:
+            out.write_mol(mol)
+
+
+def test_round_robin(shared_datadir, tmp_path):
+    template = str(tmp_path/'out.{shard:02d}.sdf.gz')
+    _write(shared_datadir, template, num_shards=2)
+    assert len(_read_energies(str(tmp_path/'out.00.sdf.gz'))) == 3
+    assert len(_read_energies(str(tmp_path/'out.01.sdf.gz'))) == 2
+
+    with open(str(tmp_path/'out.manifest.json')) as inf:
+        manifest = json.load(inf)
+    assert manifest["records"] == 5
+    assert [s["records"] for s in manifest["shards"]] == [3, 2]
+
+
+def test_hash(shared_datadir, tmp_path):
+    template = str(tmp_path/'out.{shard}.sdf')
+    _write(shared_datadir, template, num_shards=3, route="hash", key="Total_energy")
+    shards = [_read_energies(str(tmp_path/f'out.{i}.sdf')) for i in range(3)]
+    assert sum(len(s) for s in shards) == 5
+    # records with equal key are in the same shard
+    assert any(s.count("  -6.0262") == 2 for s in shards)
+
+
+def test_bytes(shared_datadir, tmp_path):
+    template = str(tmp_path/'out.{shard}.sdf')
+    _write(shared_datadir, template, route="bytes", shard_bytes=2000)
+    with open(str(tmp_path/'out.manifest.json')) as inf:
+        manifest = json.load(inf)
+    counts = [s["records"] for s in manifest["shards"]]
+    assert sum(counts) == 5 and len(counts) > 1
+    assert len(_read_energies(str(tmp_path/'out.0.sdf'))) == counts[0]
+
+    with pytest.raises(ValueError):
+        get_mol_output_stream(template, route="bytes")
+
+
+def test_close_all_shards(shared_datadir, tmp_path):
+    template = str(tmp_path/'out.{shard}.sdf.gz')
+    out = get_mol_output_stream(template, num_shards=2)
+    with get_mol_input_stream(str(shared_datadir/'test_CCCO_confs.sdf')) as inf:
+        for mol in inf:
+            out.write_mol(mol)
+
+    def fail():
+        raise OSError("disk full")
+    out._shards[0].close = fail
+    with pytest.raises(OSError):
+        out.close()
+    # the second shard is complete although closing the first one failed
+    assert len(_read_energies(str(tmp_path/'out.1.sdf.gz'))) == 2
@@ -0,0 +1,76 @@
+import random
+import pytest
+from cddlib.chem.io import get_mol_input_stream, get_mol_output_stream
+from cddlib.chem.sort import sort_mols, sort_mols_to, by_title
+
+
+def _write_smi(smi_file, n):
+    rng = random.Random(7)
+    return smi_file('test.smi', n, chain=lambda i: i % 4 + 1,
+                    col2=lambda i: "x" if i % 17 == 0 else rng.randint(0, 20))
+
+
+def _expected(fname, reverse):
+    with get_mol_input_stream(fname) as inf:
+        rows = [(mol["col2"], mol.title) for mol in inf]
+    valid = [r for r in rows if r[0] != "x"]
+    missing = [r[1] for r in rows if r[0] == "x"]
+    return [r[1] for r in sorted(valid, key=lambda r: int(r[0]), reverse=reverse)] + missing
+
+
+@pytest.mark.parametrize("reverse", [False, True])
+@pytest.mark.parametrize("run_size", [7, 1000])
+def test_sort(smi_file, reverse, run_size):
+    fname = _write_smi(smi_file, 200)
+    with get_mol_input_stream(fname) as inf:
+        titles = [mol.title for mol in sort_mols(inf, "col2", key_type=int,
+                                                 reverse=reverse, run_size=run_size)]
+    assert titles == _expected(fname, reverse)
+
+
+@pytest.mark.parametrize("run_size", [7, 50])
+def test_top_n(smi_file, run_size):
+    fname = _write_smi(smi_file, 200)
+    with get_mol_input_stream(fname) as inf:
+        titles = [mol.title for mol in sort_mols(inf, "col2", key_type=int,
+                                                 top_n=10, run_size=run_size)]
+    assert titles == _expected(fname, False)[:10]
+
+
+@pytest.mark.parametrize("top_n", [None, 10])
+def test_multi_pass_merge(smi_file, top_n):
+    fname = _write_smi(smi_file, 200)
+    with get_mol_input_stream(fname) as inf:
+        titles = [mol.title for mol in sort_mols(inf, "col2", key_type=int, top_n=top_n,
+                                                 run_size=7, merge_width=3)]
+    assert titles == _expected(fname, False)[:top_n]
+
+
+def test_nan_sorted_last(smi_file):
+    fname = smi_file('test.smi', 50, col2=lambda i: "nan" if i % 7 == 0 else 50 - i)
+    for reverse in (False, True):
+        with get_mol_input_stream(fname) as inf:
+            values = [mol["col2"] for mol in sort_mols(inf, "col2", reverse=reverse, run_size=9)]
+        assert values[-8:] == ["nan"] * 8
+        numbers = [float(v) for v in values[:-8]]
+        assert numbers == sorted(numbers, reverse=reverse)
+
+
+def test_sort_sdf(shared_datadir, tmp_path):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    out_name = str(tmp_path/'sorted.sdf')
+    with get_mol_input_stream(fname, lazy=True) as inf, \
+         get_mol_output_stream(out_name) as out:
+        assert 5 == sort_mols_to(inf, out, "Total_energy", reverse=True, run_size=2)
+    with get_mol_input_stream(out_name) as inf:
+        energies = [float(mol["Total_energy"]) for mol in inf]
+    assert energies == sorted(energies, reverse=True)
+
+    with get_mol_input_stream(fname) as inf:
+        assert 5 == len(list(sort_mols(inf, by_title, run_size=2)))
+
+    # tuple keys are stored in the run files
+    with get_mol_input_stream(fname) as inf:
+        by_bond = sort_mols(inf, lambda m: (m.num_atoms, float(m["MMFF Bond"])), run_size=2)
+        bonds = [float(mol["MMFF Bond"]) for mol in by_bond]
+    assert bonds == sorted(bonds)
@@ -0,0 +1,43 @@
+import os
+import pytest
+from cddlib.chem.io import get_mol_input_stream
+from cddlib.chem.spill import SpillingMolStream
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_spill(shared_datadir, tmp_path, lazy):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    mols = list(get_mol_input_stream(fname, lazy=lazy)) * 20
+    energies = [float(mol["Total_energy"]) for mol in mols]
+
+    spill_dir = tmp_path/'spill'
+    spill_dir.mkdir()
+    with SpillingMolStream(max_bytes=5000, tmp_dir=str(spill_dir)) as buf:
+        for mol in mols:
+            buf.add_mol(mol)
+            assert buf.memory_bytes <= 5000
+        assert buf.num_spilled > 0
+        assert len(os.listdir(spill_dir)) == 1
+        assert len(buf) == 100
+        res = [float(mol["Total_energy"]) for mol in buf]
+        assert not buf.has_next()
+    assert res == energies
+    assert os.listdir(spill_dir) == []
+
+
+def test_spill_interleaved(shared_datadir):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    mols = list(get_mol_input_stream(fname)) * 10
+    energies = [float(mol["Total_energy"]) for mol in mols]
+
+    res = []
+    with SpillingMolStream(max_bytes=3000) as buf:
+        for i, mol in enumerate(mols):
+            buf.add_mol(mol)
+            if i % 3 == 2:
+                res.append(float(next(buf)["Total_energy"]))
+        while buf.has_next():
+            res.append(float(next(buf)["Total_energy"]))
+        assert next(buf, None) is None
+        assert buf.num_spilled > 0
+    assert res == energies
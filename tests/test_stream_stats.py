@@ -0,0 +1,69 @@
+import os
+import time
+from cddlib.chem.io import BaseMolInputStream, get_mol_input_stream, get_mol_output_stream
+from cddlib.chem.stream_stats import InstrumentedMolInputStream
+
+
+def test_instrument(shared_datadir, tmp_path):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    out_name = str(tmp_path/'out.sdf.gz')
+    with get_mol_input_stream(fname, instrument={"sample_every": 2}) as inf, \
+         get_mol_output_stream(out_name, instrument=True) as out:
+        for mol in inf:
+            out.write_mol(mol)
+        in_stats = inf.stats()
+        assert in_stats["records"] == 5
+        assert in_stats["bytes"] == os.path.getsize(fname)
+        assert in_stats["io_seconds"] > 0
+        assert in_stats["rolling_records_per_sec"] > 0
+    out_stats = out.stats()
+    assert out_stats["records"] == 5
+    assert out_stats["bytes"] > 0
+
+
+def test_callback(shared_datadir):
+    fname = str(shared_datadir/'test_CCCO_confs.sdf')
+    emitted = []
+    inf = InstrumentedMolInputStream(get_mol_input_stream(fname, lazy=True), sample_every=1,
+                                     log_interval=0, callback=emitted.append)
+    with inf:
+        assert 5 == len(list(inf))
+    assert len(emitted) == 5
+    assert emitted[-1]["records"] == 5
+    assert emitted[-1]["name"] == fname
+
+
+class _SlowFetchStream(BaseMolInputStream):
+    """ reads the next record in has_next() like the toolkit streams """
+
+    def __init__(self, mols):
+        BaseMolInputStream.__init__(self, "slow.sdf")
+        self._mols = list(mols)
+        self._next = None
+
+    def has_next(self):
+        if self._next is None and self._mols:
+            time.sleep(0.01)
+            self._next = self._mols.pop(0)
+        return self._next is not None
+
+    def __next__(self):
+        if not self.has_next():
+            raise StopIteration()
+        mol, self._next = self._next, None
+        return mol
+
+    def close(self):
+        pass
+
+
+def test_has_next_timed(shared_datadir):
+    mols = list(get_mol_input_stream(str(shared_datadir/'test_CCCO_confs.sdf')))
+    with InstrumentedMolInputStream(_SlowFetchStream(mols), sample_every=1) as inf:
+        n = 0
+        while inf.has_next():
+            next(inf)
+            n += 1
+        stats = inf.stats()
+    assert n == stats["records"] == 5
+    assert stats["io_seconds"] >= 0.05